@@ -3,6 +3,7 @@ API para consultar contribuyentes de la DGII (Dirección General de Impuestos In
 Permite consultar información de contribuyentes por RNC.
 """
 import os
+import logging
 from dotenv import load_dotenv
 from flask import jsonify, request, g
 from flask_limiter import Limiter
@@ -10,6 +11,7 @@ from flask_limiter.util import get_remote_address
 import time
 from app import create_app, db
 from app.utils.logger import api_logger as logger
+from app.utils.esquema import actualizar_esquema
 
 # Cargar variables de entorno
 load_dotenv()
@@ -30,6 +32,26 @@ app.register_blueprint(api_bp, url_prefix='/api')
 app.register_blueprint(admin_bp, url_prefix='/admin')
 app.register_blueprint(usuarios_bp, url_prefix='/usuarios')
 
+# Hashes de los usuarios estáticos de desarrollo/pruebas (solo en TESTING o DEBUG)
+from app.auth import preparar_usuarios_estaticos
+preparar_usuarios_estaticos(app)
+
+# Cargar el índice de RNC en memoria (solo si MEMORY_INDEX=true)
+from app.indice_memoria import iniciar_indice
+iniciar_indice(app)
+
+# Permitir importar la aplicación antes del fork de un servidor con varios procesos
+from app.servidor import preparar_prefork
+preparar_prefork(app)
+
+# Escribir en segundo plano el último uso de tokens y la actividad de usuarios
+from app.actividad import iniciar_actividad
+iniciar_actividad(app)
+
+# Registro de acceso en JSON (solo si ACCESS_LOG=true)
+from app.acceso import iniciar_registro_acceso
+iniciar_registro_acceso(app)
+
 # Configurar CORS para permitir solicitudes desde otros dominios
 from flask_cors import CORS
 CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -40,15 +62,19 @@ app.start_time = time.time()
 # Configurar Swagger UI para la documentación de la API
 from flask_swagger_ui import get_swaggerui_blueprint
 from app.swagger import get_swagger_json
+from app.compresion import ContenidoEstatico
+
+# La especificación no cambia mientras el proceso está en marcha: se genera y comprime una vez
+documento_swagger = ContenidoEstatico(
+    get_swagger_json().encode('utf-8'),
+    'application/json',
+    max_age=int(os.getenv('SWAGGER_CACHE_MAX_AGE', 86400))
+)
 
 # Crear endpoint para el archivo swagger.json
 @app.route('/swagger.json')
 def swagger_json():
-    return app.response_class(
-        response=get_swagger_json(),
-        status=200,
-        mimetype='application/json'
-    )
+    return documento_swagger.respuesta()
 
 # Registrar blueprint de Swagger UI
 SWAGGER_URL = '/docs'  # URL para acceder a la documentación
@@ -63,34 +89,45 @@ swaggerui_blueprint = get_swaggerui_blueprint(
 )
 app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
 
-# Configurar el limitador de tasa
+# Configurar el limitador de tasa (RATELIMIT_ENABLED=false lo desactiva, por ejemplo en pruebas de carga).
+# Con varios procesos, RATELIMIT_STORAGE_URI debe apuntar a un almacenamiento compartido:
+# sqlite:///ruta.db (app/limites.py) o redis://host:puerto.
+# Con token se limita por usuario según su cuota; sin token, por IP.
+from app.limites import clave_limite, limite_solicitud  # Registra también el esquema sqlite:// en limits
+app.config['RATELIMIT_ENABLED'] = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+almacen_limites = os.getenv('RATELIMIT_STORAGE_URI', 'memory://')
 limiter = Limiter(
-    get_remote_address,
+    clave_limite,
     app=app,
-    default_limits=["30 per minute"],
-    storage_uri="memory://",
-    strategy="fixed-window",
-    retry_after="delta-seconds"
+    default_limits=[limite_solicitud],
+    storage_uri=almacen_limites,
+    strategy=os.getenv('RATELIMIT_STRATEGY', 'fixed-window'),
+    retry_after="delta-seconds",
+    # Si el almacenamiento compartido no responde, se limita por proceso en memoria
+    in_memory_fallback_enabled=not almacen_limites.startswith('memory://')
 )
 
 # Middleware para registrar todas las solicitudes
 @app.before_request
 def before_request():
     g.start_time = time.time()
-    logger.info(f"Solicitud recibida: {request.method} {request.path} - IP: {get_remote_address()}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Solicitud recibida: %s %s - IP: %s", request.method, request.path, get_remote_address())
 
 @app.after_request
 def after_request(response):
-    diff = time.time() - g.start_time
+    # Las solicitudes rechazadas por el limitador no pasan por before_request: sin inicio, duración 0
+    inicio = g.get('start_time')
+    diff = time.time() - inicio if inicio is not None else 0.0
     status_code = response.status_code
     
-    # Registrar información sobre la respuesta
+    # Registrar información sobre la respuesta (con nivel WARNING no se procesan las respuestas correctas)
     if status_code >= 500:
-        logger.error(f"Respuesta: {status_code} - Tiempo: {diff:.4f}s - Ruta: {request.path}")
+        logger.error("Respuesta: %s - Tiempo: %.4fs - Ruta: %s", status_code, diff, request.path)
     elif status_code >= 400:
-        logger.warning(f"Respuesta: {status_code} - Tiempo: {diff:.4f}s - Ruta: {request.path}")
-    else:
-        logger.info(f"Respuesta: {status_code} - Tiempo: {diff:.4f}s - Ruta: {request.path}")
+        logger.warning("Respuesta: %s - Tiempo: %.4fs - Ruta: %s", status_code, diff, request.path)
+    elif logger.isEnabledFor(logging.INFO):
+        logger.info("Respuesta: %s - Tiempo: %.4fs - Ruta: %s", status_code, diff, request.path)
     
     return response
 
@@ -98,19 +135,21 @@ def after_request(response):
 @app.errorhandler(429)
 def ratelimit_handler(e):
     """Manejador para errores de límite de tasa excedido."""
-    logger.warning(f"Límite de tasa excedido para IP: {get_remote_address()}")
+    # Segundos del periodo del límite excedido (minuto, segundo o día)
+    espera = e.limit.limit.get_expiry() if getattr(e, 'limit', None) else 60
+    logger.warning("Límite de tasa excedido para %s: %s", clave_limite(), e.description)
     return jsonify({
         'error': 'Límite de solicitudes excedido',
-        'mensaje': 'Has excedido el límite de solicitudes por minuto. Por favor, intenta de nuevo más tarde.',
+        'mensaje': f'Has excedido el límite de solicitudes ({e.description}). Por favor, intenta de nuevo más tarde.',
         'status': 'error',
-        'retry_after': 60
-    }), 429, {'Retry-After': '60'}
+        'retry_after': espera
+    }), 429, {'Retry-After': str(espera)}
 
 # Manejador de errores para rutas no encontradas (404)
 @app.errorhandler(404)
 def not_found(e):
     """Manejador para rutas no encontradas."""
-    logger.info(f"Ruta no encontrada: {request.url}")
+    logger.info("Ruta no encontrada: %s", request.url)
     return jsonify({
         'error': 'Endpoint no encontrado',
         'mensaje': 'La ruta solicitada no existe en esta API.',
@@ -122,7 +161,7 @@ def not_found(e):
 @app.errorhandler(500)
 def internal_error(e):
     """Manejador para errores internos del servidor."""
-    logger.error(f"Error interno del servidor: {str(e)}")
+    logger.error("Error interno del servidor: %s", e)
     return jsonify({
         'error': 'Error interno del servidor',
         'mensaje': 'Ha ocurrido un error interno en el servidor. Por favor, intenta de nuevo más tarde.',
@@ -142,20 +181,24 @@ def index():
             '/api/contribuyentes/actividad',
             '/api/estadisticas',
             '/api/validar/<rnc>',
+            '/api/validar/lote',
             '/api/busqueda-avanzada',
             '/api/status'
         ]
     })
 
 def run():
-    """Función para ejecutar la aplicación."""
-    # Crear todas las tablas si no existen
+    """
+    Función para ejecutar la aplicación con el servidor de desarrollo de Flask.
+    En producción se usa gunicorn con wsgi.py (ver gunicorn.conf.py).
+    """
+    # Crear todas las tablas, columnas e índices que no existan
     with app.app_context():
-        db.create_all()
+        actualizar_esquema(db)
         logger.info("Base de datos inicializada correctamente")
     
     # Ejecutar la aplicación
-    logger.info(f"API iniciada en {os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', 5001)}")
+    logger.info("API iniciada en %s:%s", os.getenv('API_HOST', '0.0.0.0'), os.getenv('API_PORT', 5001))
     app.run(host=os.getenv('API_HOST', '0.0.0.0'), 
             port=int(os.getenv('API_PORT', 5001)),
             debug=os.getenv('FLASK_DEBUG', 'False').lower() == 'true')
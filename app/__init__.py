@@ -18,6 +18,10 @@ def create_app():
     # Crear la aplicación Flask
     app = Flask(__name__)
     
+    # Serialización JSON con orjson si está instalado (app/serializacion.py)
+    from app.serializacion import ProveedorJSON
+    app.json = ProveedorJSON(app)
+    
     # Configuración de la base de datos
     if os.getenv('DB_TYPE') == 'sqlite':
         app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.getenv('DB_PATH', 'data/dgii_contribuyentes.db')}"
@@ -0,0 +1,101 @@
+"""
+Registro de acceso estructurado: una línea JSON por solicitud (ACCESS_LOG=true).
+
+Cada línea incluye la ruta (plantilla y ruta real), el estado, la duración, el
+tiempo y número de consultas a la base de datos, los aciertos de caché y el
+usuario o token que hizo la solicitud. Se escribe en la consola y en
+logs/access.log (ACCESS_LOG_FILE).
+
+Las respuestas correctas se registran con la proporción ACCESS_LOG_SAMPLE (1 por
+defecto, todas); los errores (4xx y 5xx) y las solicitudes lentas (más de
+ACCESS_LOG_SLOW_MS milisegundos) se registran siempre.
+"""
+import os
+import json
+import time
+import random
+import logging
+from datetime import datetime
+from flask import g, request, has_request_context
+from flask_limiter.util import get_remote_address
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.limites import usuario_limitado
+from app.utils.logger import setup_logger
+
+ACCESS_LOG = os.getenv('ACCESS_LOG', 'false').lower() == 'true'
+ACCESS_LOG_FILE = os.getenv('ACCESS_LOG_FILE', 'access.log')
+# Proporción de respuestas correctas (< 400) que se registran, entre 0 y 1
+ACCESS_LOG_SAMPLE = float(os.getenv('ACCESS_LOG_SAMPLE', 1))
+# Duración a partir de la cual una solicitud se registra siempre
+ACCESS_LOG_SLOW_MS = float(os.getenv('ACCESS_LOG_SLOW_MS', 1000))
+
+logger = None
+
+def anotar_cache(nombre, acierto):
+    """Cuenta en la solicitud actual un acierto o un fallo de una caché."""
+    if ACCESS_LOG and has_request_context():
+        cuentas = g.setdefault('acceso_cache', {}).setdefault(nombre, {'aciertos': 0, 'fallos': 0})
+        cuentas['aciertos' if acierto else 'fallos'] += 1
+
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    # Las consultas de una misma conexión no se solapan
+    conn.info['acceso_inicio'] = time.perf_counter()
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info.pop('acceso_inicio', None)
+    if inicio is not None and has_request_context():
+        g.acceso_db = g.get('acceso_db', 0.0) + time.perf_counter() - inicio
+        g.acceso_consultas = g.get('acceso_consultas', 0) + 1
+
+def _usuario_actual():
+    """Devuelve el id (o el nombre, para usuarios estáticos) de quien hizo la solicitud."""
+    # En los endpoints públicos el usuario sale del token, igual que para el límite de tasa
+    usuario = g.get('current_user') or usuario_limitado()
+    if usuario is None:
+        return None
+    if hasattr(usuario, 'id'):
+        return usuario.id
+    if isinstance(usuario, dict):
+        return usuario.get('username')
+    return usuario
+
+def registrar_acceso(response):
+    """Escribe la línea de acceso de la solicitud si corresponde según el muestreo."""
+    # Las solicitudes rechazadas por el limitador no pasan por before_request: sin duración
+    inicio = g.get('start_time')
+    duracion = (time.time() - inicio) * 1000 if inicio is not None else None
+    lenta = duracion is not None and duracion >= ACCESS_LOG_SLOW_MS
+    estado = response.status_code
+    if estado < 400 and not lenta and random.random() >= ACCESS_LOG_SAMPLE:
+        return response
+
+    logger.info(json.dumps({
+        'fecha': datetime.now().isoformat(timespec='milliseconds'),
+        'metodo': request.method,
+        'plantilla': request.url_rule.rule if request.url_rule else None,
+        'ruta': request.path,
+        'estado': estado,
+        'duracion_ms': round(duracion, 2) if duracion is not None else None,
+        'db_ms': round(g.get('acceso_db', 0.0) * 1000, 2),
+        'consultas_db': g.get('acceso_consultas', 0),
+        'cache': g.get('acceso_cache'),
+        'usuario': _usuario_actual(),
+        'token_id': g.get('token_id'),
+        'ip': get_remote_address(),
+        'lenta': lenta
+    }, ensure_ascii=False, default=str))
+    return response
+
+def iniciar_registro_acceso(app):
+    """Activa el registro de acceso en la aplicación si ACCESS_LOG=true."""
+    global logger
+    if not ACCESS_LOG:
+        return
+
+    # Siempre en INFO, sin depender de LOG_LEVEL: el volumen se controla con el muestreo
+    logger = setup_logger('acceso', ACCESS_LOG_FILE, level=logging.INFO, formato='%(message)s')
+    logger.propagate = False  # Solo líneas JSON, sin la copia del logger raíz
+    event.listen(Engine, 'before_cursor_execute', _antes_de_consulta)
+    event.listen(Engine, 'after_cursor_execute', _despues_de_consulta)
+    app.after_request(registrar_acceso)
@@ -0,0 +1,139 @@
+"""
+Registro diferido del último uso de los tokens y la última actividad de los usuarios.
+
+Autenticar una solicitud no escribe en la base de datos: las fechas se acumulan en
+memoria (solo la más reciente por token y por usuario) y un hilo en segundo plano
+las escribe en bloque cada AUTH_FLUSH_INTERVAL segundos (30 por defecto) y al
+terminar el proceso.
+"""
+import os
+import atexit
+import threading
+from datetime import datetime
+from sqlalchemy import update, bindparam
+from app import db
+from app.models import Usuario, Token
+from app.servidor import en_cada_proceso
+from app.utils.logger import api_logger as logger
+
+# Segundos entre escrituras de las fechas pendientes
+INTERVALO_VOLCADO = float(os.getenv('AUTH_FLUSH_INTERVAL', 30))
+
+# Fechas pendientes de escribir: id -> fecha más reciente
+_pendientes = {'tokens': {}, 'usuarios': {}}
+_lock = threading.Lock()
+
+def registrar_uso_token(token_id, usuario_id, fecha=None):
+    """
+    Registra el uso de un token y la actividad de su usuario.
+
+    Args:
+        token_id (int): Id del token.
+        usuario_id (int): Id del usuario dueño del token.
+        fecha (datetime, optional): Momento del uso (ahora por defecto).
+    """
+    fecha = fecha or datetime.now()
+    with _lock:
+        _pendientes['tokens'][token_id] = fecha
+        _pendientes['usuarios'][usuario_id] = fecha
+
+def registrar_actividad_usuario(usuario_id, fecha=None):
+    """
+    Registra la actividad de un usuario autenticado sin token.
+
+    Args:
+        usuario_id (int): Id del usuario.
+        fecha (datetime, optional): Momento de la actividad (ahora por defecto).
+    """
+    with _lock:
+        _pendientes['usuarios'][usuario_id] = fecha or datetime.now()
+
+def actividad_pendiente():
+    """Devuelve cuántos tokens y usuarios tienen fechas pendientes de escribir."""
+    with _lock:
+        return {nombre: len(fechas) for nombre, fechas in _pendientes.items()}
+
+def _reponer(tokens, usuarios):
+    """Devuelve a la cola las fechas que no se pudieron escribir, sin pisar otras más recientes."""
+    with _lock:
+        for pendientes, fechas in ((_pendientes['tokens'], tokens), (_pendientes['usuarios'], usuarios)):
+            for id_, fecha in fechas.items():
+                if id_ not in pendientes or pendientes[id_] < fecha:
+                    pendientes[id_] = fecha
+
+def volcar_actividad():
+    """
+    Escribe en bloque las fechas pendientes. Requiere contexto de aplicación.
+
+    Returns:
+        int: Número de fechas escritas.
+    """
+    with _lock:
+        tokens, usuarios = _pendientes['tokens'], _pendientes['usuarios']
+        if not tokens and not usuarios:
+            return 0
+        _pendientes['tokens'], _pendientes['usuarios'] = {}, {}
+
+    # UPDATE ... WHERE id = ? en una sola ejecución por tabla; los ids que ya no
+    # existen (tokens revocados, usuarios eliminados) simplemente no actualizan nada
+    tabla_tokens = Token.__table__
+    tabla_usuarios = Usuario.__table__
+    try:
+        if tokens:
+            db.session.execute(
+                update(tabla_tokens).where(tabla_tokens.c.id == bindparam('id_')).values(ultimo_uso=bindparam('fecha')),
+                [{'id_': id_, 'fecha': fecha} for id_, fecha in tokens.items()]
+            )
+        if usuarios:
+            db.session.execute(
+                update(tabla_usuarios).where(tabla_usuarios.c.id == bindparam('id_')).values(ultima_actividad=bindparam('fecha')),
+                [{'id_': id_, 'fecha': fecha} for id_, fecha in usuarios.items()]
+            )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        _reponer(tokens, usuarios)
+        logger.error(f"No se pudo escribir la actividad de tokens y usuarios: {e}")
+        return 0
+
+    return len(tokens) + len(usuarios)
+
+def iniciar_actividad(app):
+    """
+    Inicia el hilo que escribe las fechas pendientes cada AUTH_FLUSH_INTERVAL
+    segundos y las escribe también al terminar el proceso. Los procesos creados
+    con fork inician su propio hilo.
+
+    Args:
+        app (Flask): Aplicación Flask.
+    """
+    detener = threading.Event()
+
+    def volcar():
+        try:
+            with app.app_context():
+                volcar_actividad()
+        except Exception as e:
+            logger.error(f"Error al escribir la actividad de tokens y usuarios: {e}")
+
+    def ciclo():
+        while not detener.wait(INTERVALO_VOLCADO):
+            volcar()
+
+    def al_salir():
+        detener.set()
+        volcar()
+
+    def iniciar_hilo():
+        threading.Thread(target=ciclo, name='volcado-actividad', daemon=True).start()
+
+    @en_cada_proceso
+    def tras_fork():
+        # El lock pudo quedar tomado por un hilo del maestro que no existe aquí
+        global _lock
+        _lock = threading.Lock()
+        _pendientes['tokens'], _pendientes['usuarios'] = {}, {}
+        iniciar_hilo()
+
+    iniciar_hilo()
+    atexit.register(al_salir)
@@ -8,8 +8,11 @@ import time
 import logging
 from datetime import datetime
 from flask import Blueprint, jsonify, request, current_app
-from app.auth import basic_auth, token_auth, admin_required
+from app.auth import basic_auth, token_auth, admin_required, cache_tokens, cache_credenciales
 from app.models import db, ActualizacionDB
+from app.cache import limpiar_caches, estadisticas_caches
+from app.indice_memoria import indice_activo
+from app.actividad import actividad_pendiente
 
 # Agregar el directorio de scripts al path para poder importar update_db
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'scripts'))
@@ -46,6 +49,7 @@ def actualizar_db():
             "registros_procesados": resultado.get("registros_procesados", 0),
             "registros_nuevos": resultado.get("registros_nuevos", 0),
             "registros_actualizados": resultado.get("registros_actualizados", 0),
+            "registros_sin_cambios": resultado.get("registros_sin_cambios", 0),
             "fecha_actualizacion": datetime.now().isoformat()
         }
         
@@ -68,6 +72,9 @@ def estadisticas_sistema():
         # Obtener información sobre la última actualización
         ultima_actualizacion = db.session.query(ActualizacionDB).order_by(ActualizacionDB.fecha.desc()).first()
         
+        # Tamaño del índice de RNC en memoria (si está activo)
+        indice = indice_activo()
+        
         # Obtener información sobre el sistema
         respuesta = {
             "estado": "activo",
@@ -77,7 +84,15 @@ def estadisticas_sistema():
                 "fecha": ultima_actualizacion.fecha.isoformat() if ultima_actualizacion else None,
                 "registros_procesados": ultima_actualizacion.registros_procesados if ultima_actualizacion else 0,
                 "registros_nuevos": ultima_actualizacion.registros_nuevos if ultima_actualizacion else 0,
-                "registros_actualizados": ultima_actualizacion.registros_actualizados if ultima_actualizacion else 0
+                "registros_actualizados": ultima_actualizacion.registros_actualizados if ultima_actualizacion else 0,
+                "registros_sin_cambios": ultima_actualizacion.registros_sin_cambios if ultima_actualizacion else 0
+            },
+            "cache": estadisticas_caches(),
+            "indice_memoria": indice.estadisticas() if indice else None,
+            "autenticacion": {
+                "cache_tokens": cache_tokens.estadisticas(),
+                "cache_credenciales": cache_credenciales.estadisticas(),
+                "actividad_pendiente": actividad_pendiente()
             },
             "configuracion": {
                 "db_type": os.getenv("DB_TYPE", "sqlite"),
@@ -103,13 +118,13 @@ def estadisticas_sistema():
 def limpiar_cache():
     """Endpoint para limpiar el caché de la aplicación."""
     try:
-        # Aquí implementaríamos la lógica para limpiar el caché
-        # Por ahora es solo un ejemplo
+        entradas_eliminadas = limpiar_caches()
         
-        logger.info(f"Limpieza de caché solicitada por el usuario: {basic_auth.current_user()}")
+        logger.info(f"Limpieza de caché solicitada por el usuario: {basic_auth.current_user()}. Entradas eliminadas: {entradas_eliminadas}")
         return jsonify({
             "estado": "completado",
             "mensaje": "Caché limpiado correctamente",
+            "entradas_eliminadas": entradas_eliminadas,
             "fecha": datetime.now().isoformat()
         }), 200
     
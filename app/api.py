@@ -1,16 +1,154 @@
 """
 Endpoints de la API para consulta de contribuyentes DGII.
 """
+import os
 from flask import Blueprint, jsonify, request
-from sqlalchemy import func, desc
+from sqlalchemy import desc, select
 from app.models import Contribuyente, ActualizacionDB
 from app import db
+from app.cache import cache_contribuyentes, cache_excepciones_digito, snapshot_actual, FALTA
+from app.condicional import comprobar_condicional, agregar_cabeceras
+from app.compresion import respuesta_guardada, comprimir_respuesta
+from app.indice_memoria import indice_activo
+from app.busqueda_texto import filtrar_por_texto
+from app.estadisticas import obtener_estadisticas
+from app.serializacion import filas_a_dicts
+from app.paginacion import decodificar_cursor, ordenar_por_nombre, paginar, contar, MODOS_TOTAL, TOTAL_EXACTO, TOTAL_NINGUNO
+from app.utils.digito_verificador import validar_digito, validar_digitos
 from app.utils.logger import api_logger as logger
 
 api_bp = Blueprint('api', __name__)
 
 # Los decoradores de límite se aplicarán desde app.py
 
+@api_bp.before_request
+def verificar_actualizacion():
+    """
+    Invalida las cachés si se registró una nueva actualización de la base de datos
+    y responde 304 si el cliente ya tiene la respuesta de la actualización vigente
+    o desde la caché de respuestas si ya se generó.
+    """
+    return comprobar_condicional(snapshot_actual()) or respuesta_guardada()
+
+@api_bp.after_request
+def cabeceras_cache(response):
+    """
+    Agrega ETag, Last-Modified y Cache-Control a las respuestas de la API y
+    comprime las grandes según Accept-Encoding.
+    """
+    return comprimir_respuesta(agregar_cabeceras(response))
+
+# Columnas de las respuestas de contribuyentes, en el orden de Contribuyente.to_dict().
+# Las lecturas seleccionan solo estas columnas (o las pedidas con fields) en lugar
+# de cargar instancias ORM.
+COLUMNAS_CONTRIBUYENTE = {columna.key: columna for columna in (
+    Contribuyente.id, Contribuyente.rnc, Contribuyente.nombre, Contribuyente.nombre_comercial,
+    Contribuyente.categoria, Contribuyente.regimen_pagos, Contribuyente.estado,
+    Contribuyente.actividad_economica, Contribuyente.fecha_actualizacion
+)}
+
+def obtener_contribuyente_por_rnc(rnc):
+    """
+    Obtiene un contribuyente serializado por RNC, usando el índice o la caché en memoria.
+    
+    Args:
+        rnc (str): RNC ya limpio.
+        
+    Returns:
+        dict: Datos del contribuyente, o None si no está registrado.
+    """
+    # Con el índice en memoria activo no se consulta la base de datos
+    indice = indice_activo()
+    if indice is not None:
+        return indice.buscar(rnc)
+    
+    datos = cache_contribuyentes.obtener(rnc)
+    if datos is FALTA:
+        columnas = list(COLUMNAS_CONTRIBUYENTE.values())
+        filas = db.session.execute(select(*columnas).where(Contribuyente.rnc == rnc).limit(1)).all()
+        datos = filas_a_dicts(filas, columnas)[0] if filas else None
+        # Los RNC no registrados también se guardan para evitar consultas repetidas
+        cache_contribuyentes.guardar(rnc, datos)
+    return datos
+
+# Máximo de valores por consulta IN (...) (límite de variables de SQLite)
+MAX_PARAMETROS_IN = 500
+
+def obtener_contribuyentes_por_rnc(rncs):
+    """
+    Obtiene varios contribuyentes serializados por RNC. Los que no están en el
+    índice o la caché en memoria se consultan con IN (...) por bloques.
+    
+    Args:
+        rncs (list): RNC ya limpios.
+        
+    Returns:
+        dict: Datos de cada contribuyente por RNC (None si no está registrado).
+    """
+    indice = indice_activo()
+    if indice is not None:
+        return {rnc: indice.buscar(rnc) for rnc in rncs}
+    
+    resultado = {}
+    pendientes = []
+    for rnc in rncs:
+        datos = cache_contribuyentes.obtener(rnc)
+        if datos is FALTA:
+            pendientes.append(rnc)
+        else:
+            resultado[rnc] = datos
+    
+    columnas = list(COLUMNAS_CONTRIBUYENTE.values())
+    for i in range(0, len(pendientes), MAX_PARAMETROS_IN):
+        bloque = pendientes[i:i + MAX_PARAMETROS_IN]
+        filas = db.session.execute(select(*columnas).where(Contribuyente.rnc.in_(bloque)))
+        encontrados = {datos['rnc']: datos for datos in filas_a_dicts(filas, columnas)}
+        for rnc in bloque:
+            resultado[rnc] = encontrados.get(rnc)
+            cache_contribuyentes.guardar(rnc, resultado[rnc])
+    
+    return resultado
+
+def excepciones_digito():
+    """
+    Devuelve los RNC registrados cuyo dígito verificador no es correcto (la DGII
+    ha emitido números así), leídos una vez por actualización.
+    
+    Returns:
+        set: RNC registrados con dígito no válido, o None si la comprobación está
+             desactivada (VALIDATE_CHECK_DIGIT=false) o la base de datos todavía no
+             tiene marcados los registros.
+    """
+    if os.getenv('VALIDATE_CHECK_DIGIT', 'true').lower() != 'true':
+        return None
+    
+    excepciones = cache_excepciones_digito.obtener('rnc')
+    if excepciones is FALTA:
+        if db.session.query(Contribuyente.id).filter(Contribuyente.digito_valido.is_(None)).first():
+            # Datos cargados antes de marcar el dígito: se marcan en la próxima actualización
+            logger.warning("Hay contribuyentes sin marca de dígito verificador; no se rechazarán RNC por su dígito")
+            excepciones = None
+        else:
+            excepciones = {rnc for rnc, in db.session.query(Contribuyente.rnc).filter(Contribuyente.digito_valido.is_(False))}
+        cache_excepciones_digito.guardar('rnc', excepciones)
+    return excepciones
+
+def digito_rechazado(rnc_limpio, digito_valido=None):
+    """
+    Indica si un RNC de 9 u 11 dígitos se puede descartar sin consultar la base de
+    datos porque su dígito verificador no es correcto y no es un RNC registrado.
+    
+    Args:
+        rnc_limpio (str): RNC con formato válido.
+        digito_valido (bool, optional): Resultado ya calculado de validar_digito.
+    """
+    if digito_valido is None:
+        digito_valido = validar_digito(rnc_limpio)
+    if digito_valido:
+        return False
+    excepciones = excepciones_digito()
+    return excepciones is not None and rnc_limpio not in excepciones
+
 @api_bp.route('/contribuyente/<rnc>', methods=['GET'])
 def get_contribuyente(rnc):
     """
@@ -25,25 +163,118 @@ def get_contribuyente(rnc):
     # Limpiar el RNC (eliminar guiones y espacios)
     rnc_limpio = rnc.replace('-', '').replace(' ', '')
     
-    logger.info(f"Consultando contribuyente con RNC: {rnc_limpio}")
+    logger.info("Consultando contribuyente con RNC: %s", rnc_limpio)
     
-    # Buscar el contribuyente en la base de datos
-    contribuyente = Contribuyente.query.filter_by(rnc=rnc_limpio).first()
+    # Buscar el contribuyente (caché en memoria o base de datos), salvo que el
+    # dígito verificador descarte que esté registrado
+    contribuyente = None
+    if rnc_limpio.isdigit() and len(rnc_limpio) in (9, 11) and digito_rechazado(rnc_limpio):
+        logger.info("RNC %s con dígito verificador no válido", rnc_limpio)
+    else:
+        contribuyente = obtener_contribuyente_por_rnc(rnc_limpio)
     
     if not contribuyente:
-        logger.info(f"Contribuyente con RNC {rnc_limpio} no encontrado")
+        logger.info("Contribuyente con RNC %s no encontrado", rnc_limpio)
         return jsonify({
             'error': 'Contribuyente no encontrado',
             'rnc': rnc_limpio
         }), 404
     
     # Devolver la información del contribuyente
-    logger.info(f"Contribuyente con RNC {rnc_limpio} encontrado: {contribuyente.nombre}")
+    logger.info("Contribuyente con RNC %s encontrado: %s", rnc_limpio, contribuyente['nombre'])
     return jsonify({
-        'contribuyente': contribuyente.to_dict(),
+        'contribuyente': contribuyente,
         'status': 'success'
     })
 
+# Criterios de orden de las búsquedas por nombre
+ORDENES_BUSQUEDA = ('nombre', 'relevancia')
+
+def error_orden(orden):
+    """
+    Valida el parámetro orden de las búsquedas por nombre.
+    
+    Returns:
+        tuple: Respuesta de error (JSON, 400), o None si el orden es válido.
+    """
+    if orden not in ORDENES_BUSQUEDA:
+        logger.warning("Orden de búsqueda desconocido: '%s'", orden)
+        return jsonify({
+            'error': f"El orden debe ser uno de: {', '.join(ORDENES_BUSQUEDA)}",
+            'status': 'error'
+        }), 400
+    return None
+
+def ordenar(query, orden, relevancia):
+    """
+    Ordena una búsqueda por relevancia (si se pidió y la búsqueda usó el índice
+    de texto completo) o por nombre.
+    """
+    if orden == 'relevancia' and relevancia is not None:
+        return query.order_by(relevancia, Contribuyente.nombre, Contribuyente.id)
+    return ordenar_por_nombre(query)
+
+def leer_cursor(orden='nombre'):
+    """
+    Lee el parámetro cursor de la solicitud.
+    
+    Returns:
+        tuple: ((nombre, id) o None, respuesta de error (JSON, 400) o None).
+    """
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return None, None
+    
+    error = None
+    if orden != 'nombre':
+        error = 'El cursor solo se puede usar con orden=nombre'
+    else:
+        try:
+            return decodificar_cursor(cursor), None
+        except ValueError as e:
+            error = str(e)
+    
+    logger.warning("Cursor rechazado: '%s' (%s)", cursor, error)
+    return None, (jsonify({'error': error, 'status': 'error'}), 400)
+
+def leer_modo_total():
+    """
+    Lee el parámetro total de la solicitud ('exact' por defecto).
+    
+    Returns:
+        tuple: (modo, respuesta de error (JSON, 400) o None).
+    """
+    modo = request.args.get('total', TOTAL_EXACTO).lower()
+    if modo not in MODOS_TOTAL:
+        logger.warning("Modo de total desconocido: '%s'", modo)
+        return None, (jsonify({
+            'error': f"El total debe ser uno de: {', '.join(MODOS_TOTAL)}",
+            'status': 'error'
+        }), 400)
+    return modo, None
+
+def leer_campos():
+    """
+    Lee el parámetro fields de la solicitud: columnas de cada contribuyente
+    separadas por comas (todas por defecto).
+    
+    Returns:
+        tuple: (lista de columnas en el orden de to_dict(), respuesta de error (JSON, 400) o None).
+    """
+    fields = request.args.get('fields')
+    if fields is None:
+        return list(COLUMNAS_CONTRIBUYENTE.values()), None
+    
+    campos = {campo.strip().lower() for campo in fields.split(',') if campo.strip()}
+    desconocidos = sorted(campos - COLUMNAS_CONTRIBUYENTE.keys())
+    if not campos or desconocidos:
+        logger.warning("Campos desconocidos: '%s'", fields)
+        return None, (jsonify({
+            'error': f"Los campos deben ser algunos de: {', '.join(COLUMNAS_CONTRIBUYENTE)}",
+            'status': 'error'
+        }), 400)
+    return [columna for campo, columna in COLUMNAS_CONTRIBUYENTE.items() if campo in campos], None
+
 @api_bp.route('/contribuyentes', methods=['GET'])
 def buscar_contribuyentes():
     """
@@ -51,47 +282,64 @@ def buscar_contribuyentes():
     
     Query params:
         nombre (str): Texto a buscar en el nombre o nombre comercial.
+        orden (str): 'nombre' (por defecto) o 'relevancia'.
         limit (int): Límite de resultados (por defecto 10, máximo 100).
         offset (int): Desplazamiento para paginación.
+        cursor (str): Cursor de paginación (next_cursor de la página anterior); reemplaza a offset.
+        total (str): 'exact' (por defecto), 'estimate' (cuenta hasta un tope y responde "1000+") o 'none'.
+        fields (str): Campos de cada contribuyente separados por comas (por ejemplo, rnc,nombre,estado); todos por defecto.
         
     Returns:
         JSON con la lista de contribuyentes que coinciden con la búsqueda.
     """
     # Obtener parámetros de la consulta
-    nombre = request.args.get('nombre', '')
-    limit = min(int(request.args.get('limit', 10)), 100)  # Máximo 100 resultados
+    nombre = request.args.get('nombre', '').strip()
+    orden = request.args.get('orden', 'nombre').lower()
+    limit = max(min(int(request.args.get('limit', 10)), 100), 0)  # Entre 0 y 100 resultados
     offset = int(request.args.get('offset', 0))
     
-    logger.info(f"Búsqueda de contribuyentes con nombre: '{nombre}', limit: {limit}, offset: {offset}")
+    logger.info("Búsqueda de contribuyentes con nombre: '%s', orden: %s, limit: %s, offset: %s", nombre, orden, limit, offset)
     
     if not nombre or len(nombre) < 3:
-        logger.warning(f"Búsqueda con texto muy corto: '{nombre}'")
+        logger.warning("Búsqueda con texto muy corto: '%s'", nombre)
         return jsonify({
             'error': 'El texto de búsqueda debe tener al menos 3 caracteres',
             'status': 'error'
         }), 400
     
-    # Construir la consulta
-    query = Contribuyente.query.filter(
-        (Contribuyente.nombre.ilike(f'%{nombre}%')) | 
-        (Contribuyente.nombre_comercial.ilike(f'%{nombre}%'))
-    ).order_by(Contribuyente.nombre).limit(limit).offset(offset)
+    error = error_orden(orden)
+    if error:
+        return error
+    
+    cursor, error = leer_cursor(orden)
+    if error:
+        return error
+    
+    modo_total, error = leer_modo_total()
+    if error:
+        return error
+    
+    columnas, error = leer_campos()
+    if error:
+        return error
+    
+    # Construir la consulta (índice de texto completo si está disponible)
+    query, relevancia = filtrar_por_texto(Contribuyente.query, nombre)
     
     # Ejecutar la consulta
-    contribuyentes = query.all()
-    total = Contribuyente.query.filter(
-        (Contribuyente.nombre.ilike(f'%{nombre}%')) | 
-        (Contribuyente.nombre_comercial.ilike(f'%{nombre}%'))
-    ).count()
+    contribuyentes, next_cursor = paginar(ordenar(query, orden, relevancia), limit, offset, cursor, columnas)
+    total = contar(query, modo_total, ('contribuyentes', nombre.upper()))
     
-    logger.info(f"Búsqueda completada. Se encontraron {len(contribuyentes)} de {total} resultados")
+    logger.info("Búsqueda completada. Se encontraron %s de %s resultados", len(contribuyentes), total)
     
     # Devolver los resultados
     return jsonify({
-        'contribuyentes': [c.to_dict() for c in contribuyentes],
+        'contribuyentes': filas_a_dicts(contribuyentes, columnas),
         'total': total,
         'limit': limit,
         'offset': offset,
+        'next_cursor': next_cursor if orden == 'nombre' else None,
+        'orden': orden,
         'status': 'success'
     })
 
@@ -115,10 +363,10 @@ def get_status():
             'status': 'warning'
         })
     
-    # Contar el total de contribuyentes
-    total_contribuyentes = Contribuyente.query.count()
+    # Total de contribuyentes precalculado en la última actualización
+    estadisticas = obtener_estadisticas()
     
-    logger.info(f"Última actualización: {ultima_actualizacion.fecha}")
+    logger.info("Última actualización: %s", ultima_actualizacion.fecha)
     
     # Devolver la información de estado
     return jsonify({
@@ -127,10 +375,12 @@ def get_status():
             'registros_procesados': ultima_actualizacion.registros_procesados,
             'registros_nuevos': ultima_actualizacion.registros_nuevos,
             'registros_actualizados': ultima_actualizacion.registros_actualizados,
+            'registros_sin_cambios': ultima_actualizacion.registros_sin_cambios,
             'estado': ultima_actualizacion.estado,
             'mensaje': ultima_actualizacion.mensaje
         },
-        'total_contribuyentes': total_contribuyentes,
+        'total_contribuyentes': estadisticas['total'],
+        'snapshot': estadisticas['snapshot'],
         'status': 'success'
     })
 
@@ -145,6 +395,9 @@ def contribuyentes_por_estado(estado):
     Query params:
         limit (int): Límite de resultados (por defecto 10, máximo 100).
         offset (int): Desplazamiento para paginación.
+        cursor (str): Cursor de paginación (next_cursor de la página anterior); reemplaza a offset.
+        total (str): 'exact' (por defecto), 'estimate' (cuenta hasta un tope y responde "1000+") o 'none'.
+        fields (str): Campos de cada contribuyente separados por comas (por ejemplo, rnc,nombre,estado); todos por defecto.
         
     Returns:
         JSON con la lista de contribuyentes que tienen el estado especificado.
@@ -152,42 +405,54 @@ def contribuyentes_por_estado(estado):
     # Normalizar el estado (convertir a mayúsculas)
     estado = estado.upper()
     
-    logger.info(f"Buscando contribuyentes con estado: {estado}")
+    logger.info("Buscando contribuyentes con estado: %s", estado)
     
     # Validar que el estado sea uno de los valores permitidos
     estados_validos = ['ACTIVO', 'SUSPENDIDO', 'INACTIVO']
     if estado not in estados_validos:
-        logger.warning(f"Estado no válido: {estado}")
+        logger.warning("Estado no válido: %s", estado)
         return jsonify({
             'error': f'Estado no válido. Los valores permitidos son: {", ".join(estados_validos)}',
             'status': 'error'
         }), 400
     
     # Obtener parámetros de paginación
-    limit = min(int(request.args.get('limit', 10)), 100)
+    limit = max(min(int(request.args.get('limit', 10)), 100), 0)
     offset = int(request.args.get('offset', 0))
+    cursor, error = leer_cursor()
+    if error:
+        return error
     
-    logger.info(f"Buscando contribuyentes con estado {estado}, limit: {limit}, offset: {offset}")
+    modo_total, error = leer_modo_total()
+    if error:
+        return error
     
-    # Buscar contribuyentes por estado
-    query = Contribuyente.query.filter_by(estado=estado).order_by(Contribuyente.nombre)
+    columnas, error = leer_campos()
+    if error:
+        return error
     
-    # Obtener el total de resultados
-    total = query.count()
+    logger.info("Buscando contribuyentes con estado %s, limit: %s, offset: %s", estado, limit, offset)
+    
+    # Buscar contribuyentes por estado (índice estado, nombre, id)
+    query = Contribuyente.query.filter_by(estado=estado)
     
-    logger.info(f"Se encontraron {total} contribuyentes con estado {estado}")
+    # Total precalculado en la última actualización (exacto, sin conteo)
+    total = obtener_estadisticas()['estado'].get(estado, 0) if modo_total != TOTAL_NINGUNO else None
+    
+    logger.info("Se encontraron %s contribuyentes con estado %s", total, estado)
     
     # Aplicar paginación
-    contribuyentes = query.limit(limit).offset(offset).all()
+    contribuyentes, next_cursor = paginar(ordenar_por_nombre(query), limit, offset, cursor, columnas)
     
-    logger.info(f"Se devuelven {len(contribuyentes)} contribuyentes con estado {estado}")
+    logger.info("Se devuelven %s contribuyentes con estado %s", len(contribuyentes), estado)
     
     # Devolver los resultados
     return jsonify({
-        'contribuyentes': [c.to_dict() for c in contribuyentes],
+        'contribuyentes': filas_a_dicts(contribuyentes, columnas),
         'total': total,
         'limit': limit,
         'offset': offset,
+        'next_cursor': next_cursor,
         'estado': estado,
         'status': 'success'
     })
@@ -201,18 +466,32 @@ def contribuyentes_por_actividad():
         actividad (str): Texto a buscar en la actividad económica.
         limit (int): Límite de resultados (por defecto 10, máximo 100).
         offset (int): Desplazamiento para paginación.
+        cursor (str): Cursor de paginación (next_cursor de la página anterior); reemplaza a offset.
+        total (str): 'exact' (por defecto), 'estimate' (cuenta hasta un tope y responde "1000+") o 'none'.
+        fields (str): Campos de cada contribuyente separados por comas (por ejemplo, rnc,nombre,estado); todos por defecto.
         
     Returns:
         JSON con la lista de contribuyentes que coinciden con la actividad económica.
     """
-    actividad = request.args.get('actividad', '')
-    limit = min(int(request.args.get('limit', 10)), 100)
+    actividad = request.args.get('actividad', '').strip()
+    limit = max(min(int(request.args.get('limit', 10)), 100), 0)
     offset = int(request.args.get('offset', 0))
+    cursor, error = leer_cursor()
+    if error:
+        return error
+    
+    modo_total, error = leer_modo_total()
+    if error:
+        return error
     
-    logger.info(f"Buscando contribuyentes con actividad: {actividad}, limit: {limit}, offset: {offset}")
+    columnas, error = leer_campos()
+    if error:
+        return error
+    
+    logger.info("Buscando contribuyentes con actividad: %s, limit: %s, offset: %s", actividad, limit, offset)
     
     if not actividad or len(actividad) < 3:
-        logger.warning(f"Búsqueda con texto muy corto: '{actividad}'")
+        logger.warning("Búsqueda con texto muy corto: '%s'", actividad)
         return jsonify({
             'error': 'El parámetro "actividad" es requerido y debe tener al menos 3 caracteres',
             'status': 'error'
@@ -221,24 +500,25 @@ def contribuyentes_por_actividad():
     # Buscar contribuyentes que contengan el texto en la actividad económica
     query = Contribuyente.query.filter(
         Contribuyente.actividad_economica.like(f'%{actividad}%')
-    ).order_by(Contribuyente.nombre)
+    )
     
     # Obtener el total de resultados
-    total = query.count()
+    total = contar(query, modo_total, ('actividad', actividad.upper()))
     
-    logger.info(f"Se encontraron {total} contribuyentes con actividad {actividad}")
+    logger.info("Se encontraron %s contribuyentes con actividad %s", total, actividad)
     
     # Aplicar paginación
-    contribuyentes = query.limit(limit).offset(offset).all()
+    contribuyentes, next_cursor = paginar(ordenar_por_nombre(query), limit, offset, cursor, columnas)
     
-    logger.info(f"Se devuelven {len(contribuyentes)} contribuyentes con actividad {actividad}")
+    logger.info("Se devuelven %s contribuyentes con actividad %s", len(contribuyentes), actividad)
     
     # Devolver los resultados
     return jsonify({
-        'contribuyentes': [c.to_dict() for c in contribuyentes],
+        'contribuyentes': filas_a_dicts(contribuyentes, columnas),
         'total': total,
         'limit': limit,
         'offset': offset,
+        'next_cursor': next_cursor,
         'actividad': actividad,
         'status': 'success'
     })
@@ -254,44 +534,95 @@ def get_estadisticas():
     logger.info("Consultando estadísticas de contribuyentes")
     
     try:
-        # Estadísticas por estado
-        estados = Contribuyente.query.with_entities(
-            Contribuyente.estado, 
-            func.count(Contribuyente.id).label('total')
-        ).group_by(Contribuyente.estado).all()
-        
-        # Estadísticas por régimen de pagos
-        regimenes = Contribuyente.query.with_entities(
-            Contribuyente.regimen_pagos, 
-            func.count(Contribuyente.id).label('total')
-        ).group_by(Contribuyente.regimen_pagos).all()
+        # Conteos precalculados en la última actualización de la base de datos
+        estadisticas = obtener_estadisticas()
         
         # Top 10 actividades económicas más comunes
-        actividades = Contribuyente.query.with_entities(
-            Contribuyente.actividad_economica, 
-            func.count(Contribuyente.id).label('total')
-        ).group_by(Contribuyente.actividad_economica).order_by(desc('total')).limit(10).all()
+        actividades = sorted(estadisticas['actividad'].items(), key=lambda item: item[1], reverse=True)[:10]
         
         logger.info("Estadísticas obtenidas")
         
         # Devolver las estadísticas
         return jsonify({
             'estadisticas': {
-                'por_estado': {estado: total for estado, total in estados if estado},
-                'por_regimen': {regimen: total for regimen, total in regimenes if regimen},
-                'top_actividades': {actividad: total for actividad, total in actividades if actividad}
+                'por_estado': estadisticas['estado'],
+                'por_regimen': estadisticas['regimen'],
+                'por_categoria': estadisticas['categoria'],
+                'top_actividades': dict(actividades)
             },
-            'total_contribuyentes': Contribuyente.query.count(),
+            'total_contribuyentes': estadisticas['total'],
+            'snapshot': estadisticas['snapshot'],
+            'fecha_calculo': estadisticas['fecha'],
             'status': 'success'
         })
     except Exception as e:
-        logger.error(f"Error al obtener estadísticas: {str(e)}")
+        logger.error("Error al obtener estadísticas: %s", e)
         return jsonify({
             'error': 'Error al obtener estadísticas',
             'mensaje': str(e),
             'status': 'error'
         }), 500
 
+def error_formato_rnc(rnc_limpio, digito_valido=None):
+    """
+    Valida el formato de un RNC y su dígito verificador.
+    
+    Args:
+        rnc_limpio (str): RNC sin guiones ni espacios.
+        digito_valido (bool, optional): Resultado ya calculado de validar_digito.
+        
+    Returns:
+        str: Mensaje de error, o None si el formato es válido.
+    """
+    if not rnc_limpio.isdigit():
+        return 'El RNC debe contener solo dígitos'
+    
+    # Validar longitud del RNC (9 o 11 dígitos)
+    if len(rnc_limpio) not in [9, 11]:
+        return 'El RNC debe tener 9 u 11 dígitos'
+    
+    if digito_rechazado(rnc_limpio, digito_valido):
+        return 'El dígito verificador del RNC no es válido'
+    
+    return None
+
+def resultado_validacion(rnc_limpio, contribuyente, error=None):
+    """
+    Construye el resultado de la validación de un RNC.
+    
+    Args:
+        rnc_limpio (str): RNC sin guiones ni espacios.
+        contribuyente (dict): Datos del contribuyente, o None si no está registrado.
+        error (str, optional): Error de formato del RNC.
+        
+    Returns:
+        dict: Resultado con la misma estructura que devuelve /validar/<rnc>.
+    """
+    if error:
+        return {
+            'valido': False,
+            'registrado': False,
+            'error': error,
+            'rnc': rnc_limpio,
+            'status': 'error'
+        }
+    
+    if not contribuyente:
+        return {
+            'valido': True,
+            'registrado': False,
+            'mensaje': 'El RNC tiene un formato válido pero no está registrado en la DGII',
+            'rnc': rnc_limpio,
+            'status': 'warning'
+        }
+    
+    return {
+        'valido': True,
+        'registrado': True,
+        'contribuyente': contribuyente,
+        'status': 'success'
+    }
+
 @api_bp.route('/validar/<rnc>', methods=['GET'])
 def validar_rnc(rnc):
     """
@@ -306,49 +637,91 @@ def validar_rnc(rnc):
     # Limpiar el RNC (eliminar guiones y espacios)
     rnc_limpio = rnc.replace('-', '').replace(' ', '')
     
-    logger.info(f"Validando RNC: {rnc_limpio}")
+    logger.info("Validando RNC: %s", rnc_limpio)
     
     # Validar formato básico del RNC
-    if not rnc_limpio.isdigit():
-        logger.warning(f"RNC no válido: {rnc_limpio}")
+    error = error_formato_rnc(rnc_limpio)
+    if error:
+        logger.warning("RNC no válido: %s", rnc_limpio)
+        return jsonify(resultado_validacion(rnc_limpio, None, error))
+    
+    # Buscar el contribuyente (caché en memoria o base de datos)
+    contribuyente = obtener_contribuyente_por_rnc(rnc_limpio)
+    
+    if not contribuyente:
+        logger.info("RNC %s no encontrado", rnc_limpio)
+    else:
+        logger.info("RNC %s válido y registrado", rnc_limpio)
+    
+    return jsonify(resultado_validacion(rnc_limpio, contribuyente))
+
+@api_bp.route('/validar/lote', methods=['POST'])
+def validar_lote():
+    """
+    Endpoint para validar un lote de RNC en una sola solicitud.
+    
+    Body:
+        Arreglo JSON de RNC (o un objeto {"rncs": [...]}), o texto plano con un RNC por línea.
+        Se aceptan como máximo BATCH_MAX_RNC RNC (5000 por defecto).
+        
+    Returns:
+        JSON con el resultado de cada RNC, en el mismo orden y con la misma
+        estructura que /validar/<rnc>.
+    """
+    max_rnc = int(os.getenv('BATCH_MAX_RNC', 5000))
+    
+    # Obtener la lista de RNC del cuerpo de la solicitud
+    if request.is_json:
+        datos = request.get_json(silent=True)
+        if isinstance(datos, dict):
+            datos = datos.get('rncs')
+        if not isinstance(datos, list):
+            return jsonify({
+                'error': 'El cuerpo debe ser un arreglo JSON de RNC o un objeto {"rncs": [...]}',
+                'status': 'error'
+            }), 400
+        rncs = [str(rnc) for rnc in datos]
+    else:
+        rncs = [linea for linea in request.get_data(as_text=True).splitlines() if linea.strip()]
+    
+    if not rncs:
         return jsonify({
-            'valido': False,
-            'registrado': False,
-            'error': 'El RNC debe contener solo dígitos',
-            'rnc': rnc_limpio,
+            'error': 'Debe enviar al menos un RNC',
             'status': 'error'
-        })
+        }), 400
     
-    # Validar longitud del RNC (9 o 11 dígitos)
-    if len(rnc_limpio) not in [9, 11]:
-        logger.warning(f"RNC no válido: {rnc_limpio}")
+    if len(rncs) > max_rnc:
+        logger.warning("Lote de validación demasiado grande: %s RNC", len(rncs))
         return jsonify({
-            'valido': False,
-            'registrado': False,
-            'error': 'El RNC debe tener 9 u 11 dígitos',
-            'rnc': rnc_limpio,
+            'error': f'El lote no puede tener más de {max_rnc} RNC',
             'status': 'error'
-        })
+        }), 413
     
-    # Buscar el contribuyente en la base de datos
-    contribuyente = Contribuyente.query.filter_by(rnc=rnc_limpio).first()
+    logger.info("Validando lote de %s RNC", len(rncs))
     
-    if not contribuyente:
-        logger.info(f"RNC {rnc_limpio} no encontrado")
-        return jsonify({
-            'valido': True,
-            'registrado': False,
-            'mensaje': 'El RNC tiene un formato válido pero no está registrado en la DGII',
-            'rnc': rnc_limpio,
-            'status': 'warning'
-        })
+    # Limpiar los RNC y validar su formato (dígitos verificadores de todo el lote a la vez)
+    limpios = [rnc.strip().replace('-', '').replace(' ', '') for rnc in rncs]
+    unicos = list(set(limpios))
+    errores = {
+        rnc: error_formato_rnc(rnc, bool(valido))
+        for rnc, valido in zip(unicos, validar_digitos(unicos))
+    }
+    
+    # Buscar todos los RNC con formato válido de una sola vez
+    contribuyentes = obtener_contribuyentes_por_rnc([rnc for rnc, error in errores.items() if not error])
+    
+    resultados = [resultado_validacion(rnc, contribuyentes.get(rnc), errores[rnc]) for rnc in limpios]
+    registrados = sum(1 for r in resultados if r['registrado'])
+    invalidos = sum(1 for r in resultados if not r['valido'])
+    
+    logger.info("Lote validado: %s registrados, %s no registrados, %s no válidos", registrados, len(resultados) - registrados - invalidos, invalidos)
     
-    # Devolver la información del contribuyente
-    logger.info(f"RNC {rnc_limpio} válido y registrado")
     return jsonify({
-        'valido': True,
-        'registrado': True,
-        'contribuyente': contribuyente.to_dict(),
+        'resultados': resultados,
+        'total': len(resultados),
+        'registrados': registrados,
+        'no_registrados': len(resultados) - registrados - invalidos,
+        'invalidos': invalidos,
         'status': 'success'
     })
 
@@ -363,23 +736,28 @@ def busqueda_avanzada():
         actividad (str): Texto a buscar en la actividad económica.
         estado (str): Estado del contribuyente (ACTIVO, SUSPENDIDO, etc.).
         regimen (str): Régimen de pagos.
+        orden (str): 'nombre' (por defecto) o 'relevancia' (según nombre y nombre comercial).
         limit (int): Límite de resultados (por defecto 10, máximo 100).
         offset (int): Desplazamiento para paginación.
+        cursor (str): Cursor de paginación (next_cursor de la página anterior); reemplaza a offset.
+        total (str): 'exact' (por defecto), 'estimate' (cuenta hasta un tope y responde "1000+") o 'none'.
+        fields (str): Campos de cada contribuyente separados por comas (por ejemplo, rnc,nombre,estado); todos por defecto.
         
     Returns:
         JSON con la lista de contribuyentes que cumplen con los criterios de búsqueda.
     """
     # Obtener parámetros de búsqueda
-    nombre = request.args.get('nombre', '')
-    nombre_comercial = request.args.get('nombre_comercial', '')
-    actividad = request.args.get('actividad', '')
+    nombre = request.args.get('nombre', '').strip()
+    nombre_comercial = request.args.get('nombre_comercial', '').strip()
+    actividad = request.args.get('actividad', '').strip()
     estado = request.args.get('estado', '')
     regimen = request.args.get('regimen', '')
+    orden = request.args.get('orden', 'nombre').lower()
     
-    logger.info(f"Búsqueda avanzada con parámetros: nombre={nombre}, nombre_comercial={nombre_comercial}, actividad={actividad}, estado={estado}, regimen={regimen}")
+    logger.info("Búsqueda avanzada con parámetros: nombre=%s, nombre_comercial=%s, actividad=%s, estado=%s, regimen=%s, orden=%s", nombre, nombre_comercial, actividad, estado, regimen, orden)
     
     # Obtener parámetros de paginación
-    limit = min(int(request.args.get('limit', 10)), 100)
+    limit = max(min(int(request.args.get('limit', 10)), 100), 0)
     offset = int(request.args.get('offset', 0))
     
     # Validar que al menos un criterio de búsqueda esté presente
@@ -390,15 +768,36 @@ def busqueda_avanzada():
             'status': 'error'
         }), 400
     
+    error = error_orden(orden)
+    if error:
+        return error
+    
+    cursor, error = leer_cursor(orden)
+    if error:
+        return error
+    
+    modo_total, error = leer_modo_total()
+    if error:
+        return error
+    
+    columnas, error = leer_campos()
+    if error:
+        return error
+    
     # Construir la consulta base
     query = Contribuyente.query
+    relevancia = None
     
     # Aplicar filtros según los parámetros proporcionados
     if nombre and len(nombre) >= 3:
-        query = query.filter(Contribuyente.nombre.like(f'%{nombre}%'))
+        query, relevancia = filtrar_por_texto(query, nombre, columnas=('nombre',))
     
     if nombre_comercial and len(nombre_comercial) >= 3:
-        query = query.filter(Contribuyente.nombre_comercial.like(f'%{nombre_comercial}%'))
+        if relevancia is None:
+            query, relevancia = filtrar_por_texto(query, nombre_comercial, columnas=('nombre_comercial',))
+        else:
+            # La tabla de texto completo ya está unida a la consulta
+            query = query.filter(Contribuyente.nombre_comercial.like(f'%{nombre_comercial}%'))
     
     if actividad and len(actividad) >= 3:
         query = query.filter(Contribuyente.actividad_economica.like(f'%{actividad}%'))
@@ -409,25 +808,27 @@ def busqueda_avanzada():
     if regimen:
         query = query.filter(Contribuyente.regimen_pagos == regimen.upper())
     
-    # Ordenar por nombre
-    query = query.order_by(Contribuyente.nombre)
+    # Obtener el total de resultados (los criterios de menos de 3 caracteres no filtran)
+    criterios = tuple(valor.upper() if len(valor) >= 3 else '' for valor in (nombre, nombre_comercial, actividad))
+    total = contar(query, modo_total, ('busqueda-avanzada',) + criterios + (estado.upper(), regimen.upper()))
     
-    # Obtener el total de resultados
-    total = query.count()
+    # Ordenar por relevancia o por nombre
+    query = ordenar(query, orden, relevancia)
     
-    logger.info(f"Búsqueda avanzada completada. Se encontraron {total} resultados")
+    logger.info("Búsqueda avanzada completada. Se encontraron %s resultados", total)
     
     # Aplicar paginación
-    contribuyentes = query.limit(limit).offset(offset).all()
+    contribuyentes, next_cursor = paginar(query, limit, offset, cursor, columnas)
     
-    logger.info(f"Se devuelven {len(contribuyentes)} contribuyentes")
+    logger.info("Se devuelven %s contribuyentes", len(contribuyentes))
     
     # Devolver los resultados
     return jsonify({
-        'contribuyentes': [c.to_dict() for c in contribuyentes],
+        'contribuyentes': filas_a_dicts(contribuyentes, columnas),
         'total': total,
         'limit': limit,
         'offset': offset,
+        'next_cursor': next_cursor if orden == 'nombre' else None,
         'criterios': {
             'nombre': nombre if nombre else None,
             'nombre_comercial': nombre_comercial if nombre_comercial else None,
@@ -435,5 +836,6 @@ def busqueda_avanzada():
             'estado': estado if estado else None,
             'regimen': regimen if regimen else None
         },
+        'orden': orden,
         'status': 'success'
     })
@@ -3,17 +3,149 @@ Módulo de autenticación para la API DGII.
 Proporciona funcionalidades para proteger endpoints sensibles.
 """
 import os
+import hmac
+import hashlib
+import threading
 from functools import wraps
 from flask import request, jsonify, g, current_app
 from flask_httpauth import HTTPBasicAuth, HTTPTokenAuth
 from werkzeug.security import generate_password_hash, check_password_hash
 import logging
 from datetime import datetime
+from sqlalchemy import event
 from app.models import db, Usuario, Token
+from app.cache import CacheLRU, FALTA
+from app.actividad import registrar_uso_token, registrar_actividad_usuario
 
 # Configurar logger
 logger = logging.getLogger('api.auth')
 
+# Tokens ya verificados: valor del token -> (id del token, usuario, fecha de expiración).
+# El usuario se guarda desvinculado de la sesión para reutilizarlo entre solicitudes.
+# El TTL es corto porque cada proceso tiene su propia caché: una revocación hecha
+# en otro proceso tarda como máximo AUTH_CACHE_TTL segundos en aplicarse aquí.
+cache_tokens = CacheLRU(
+    'tokens',
+    max_entradas=int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000)),
+    ttl=int(os.getenv('AUTH_CACHE_TTL', 60))
+)
+
+def autenticar_token(valor):
+    """
+    Busca el usuario de un token, primero en la caché y si no en la base de datos,
+    y registra el uso del token sin escribir en la base de datos.
+    
+    Args:
+        valor (str): Token recibido en la solicitud.
+    
+    Returns:
+        Usuario: Usuario activo dueño del token, o None si el token no es válido.
+    """
+    entrada = cache_tokens.obtener(valor)
+    if entrada is not FALTA and entrada[2] < datetime.now():
+        # Expiró mientras estaba en caché: se elimina por la ruta de la base de datos
+        cache_tokens.eliminar(valor)
+        entrada = FALTA
+    
+    if entrada is FALTA:
+        token = Token.buscar_vigente(valor)
+        usuario = token.usuario if token else None
+        if usuario is None or not usuario.activo:
+            return None
+        db.session.expunge(usuario)
+        entrada = (token.id, usuario, token.fecha_expiracion)
+        cache_tokens.guardar(valor, entrada)
+    
+    token_id, usuario, _ = entrada
+    g.token_id = token_id  # Para el registro de acceso
+    registrar_uso_token(token_id, usuario.id)
+    return usuario
+
+def invalidar_token(valor):
+    """Elimina un token de la caché de tokens verificados (al revocarlo)."""
+    cache_tokens.eliminar(valor)
+
+def invalidar_tokens_usuario(usuario_id):
+    """
+    Elimina de la caché todos los tokens de un usuario (al eliminarlo o
+    modificarlo, para que el siguiente uso vuelva a leer sus datos).
+    
+    Returns:
+        int: Número de tokens eliminados de la caché.
+    """
+    return cache_tokens.eliminar_si(lambda entrada: entrada[1].id == usuario_id)
+
+# Credenciales de autenticación básica ya verificadas: HMAC-SHA256 de
+# (usuario, contraseña) -> (valor devuelto a Flask-HTTPAuth, g.current_user).
+# Evita repetir check_password_hash (PBKDF2) en cada solicitud. La clave del HMAC
+# es aleatoria y solo existe en la memoria del proceso, por lo que las entradas
+# no sirven para deducir contraseñas; los intentos fallidos no se guardan.
+# Como en la caché de tokens, un cambio de contraseña o una desactivación hecha
+# en otro proceso tarda como máximo BASIC_AUTH_CACHE_TTL segundos en aplicarse
+# aquí, por lo que por defecto se usa el mismo TTL corto (AUTH_CACHE_TTL).
+cache_credenciales = CacheLRU(
+    'credenciales',
+    max_entradas=int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000)),
+    ttl=int(os.getenv('BASIC_AUTH_CACHE_TTL', os.getenv('AUTH_CACHE_TTL', 60)))
+)
+_CLAVE_CREDENCIALES = os.urandom(32)
+
+def _clave_credenciales(username, password):
+    """Calcula la clave de caché de un par (usuario, contraseña)."""
+    mensaje = f"{username or ''}\x00{password or ''}".encode('utf-8', 'surrogatepass')
+    return hmac.new(_CLAVE_CREDENCIALES, mensaje, hashlib.sha256).digest()
+
+def invalidar_credenciales_usuario(usuario_id):
+    """
+    Elimina de la caché las credenciales verificadas de un usuario.
+    
+    Returns:
+        int: Número de entradas eliminadas.
+    """
+    return cache_credenciales.eliminar_si(lambda entrada: getattr(entrada[1], 'id', None) == usuario_id)
+
+def invalidar_usuario(usuario_id):
+    """Elimina de las cachés de autenticación los tokens y credenciales de un usuario."""
+    invalidar_tokens_usuario(usuario_id)
+    invalidar_credenciales_usuario(usuario_id)
+
+@event.listens_for(Usuario.password_hash, 'set')
+@event.listens_for(Usuario.activo, 'set')
+def _al_cambiar_usuario(usuario, valor, anterior, iniciador):
+    """Invalida las cachés de un usuario al cambiar su contraseña (set_password) o desactivarlo."""
+    if usuario.id is not None and valor != anterior:
+        invalidar_usuario(usuario.id)
+
+# Hashes de los usuarios estáticos de desarrollo/pruebas (se calculan una sola vez)
+_hashes_estaticos = {}
+_hashes_lock = threading.Lock()
+
+def _calcular_hashes_estaticos():
+    with _hashes_lock:
+        if not _hashes_estaticos:
+            _hashes_estaticos.update({
+                "admin": generate_password_hash(os.getenv("ADMIN_PASSWORD", "admin123")),
+                "api": generate_password_hash(os.getenv("API_PASSWORD", "api123"))
+            })
+        return _hashes_estaticos
+
+def preparar_usuarios_estaticos(app):
+    """
+    Calcula los hashes de los usuarios estáticos al crear la aplicación en modo
+    TESTING o DEBUG, antes del fork de los procesos de trabajo, para que ninguna
+    solicitud pague el coste de generarlos.
+    
+    Args:
+        app (Flask): Aplicación Flask.
+    """
+    if app.config.get('TESTING', False) or app.config.get('DEBUG', False):
+        _calcular_hashes_estaticos()
+
+def usuarios_estaticos():
+    """Devuelve los hashes de contraseña de los usuarios estáticos de desarrollo/pruebas."""
+    # Ya calculados al crear la aplicación, salvo que el modo se active después
+    return _hashes_estaticos or _calcular_hashes_estaticos()
+
 # Crear instancias de autenticación
 basic_auth = HTTPBasicAuth()
 token_auth = HTTPTokenAuth()
@@ -21,46 +153,53 @@ token_auth = HTTPTokenAuth()
 @basic_auth.verify_password
 def verify_password(username, password):
     """Verificar credenciales de usuario para autenticación básica."""
+    # Credenciales verificadas hace menos de BASIC_AUTH_CACHE_TTL segundos
+    clave = _clave_credenciales(username, password)
+    entrada = cache_credenciales.obtener(clave)
+    if entrada is not FALTA:
+        resultado, usuario_actual = entrada
+        if hasattr(usuario_actual, 'id'):
+            registrar_actividad_usuario(usuario_actual.id)
+        logger.info("Autenticación básica exitosa para el usuario: %s", username)
+        g.current_user = usuario_actual
+        return resultado
+    
     # Buscar el usuario en la base de datos
     usuario = Usuario.query.filter_by(username=username, activo=True).first()
     
     if usuario and usuario.check_password(password):
-        # Actualizar última actividad
-        usuario.ultima_actividad = datetime.now()
-        db.session.commit()
+        # La última actividad se escribe en segundo plano
+        registrar_actividad_usuario(usuario.id)
+        
+        db.session.expunge(usuario)
+        cache_credenciales.guardar(clave, (usuario, usuario))
         
-        logger.info(f"Autenticación básica exitosa para el usuario: {username}")
+        logger.info("Autenticación básica exitosa para el usuario: %s", username)
         g.current_user = usuario
         return usuario
     
     # Fallback a usuarios estáticos para desarrollo/pruebas
     if current_app.config.get('TESTING', False) or current_app.config.get('DEBUG', False):
         # Usuarios para desarrollo/pruebas
-        USERS = {
-            "admin": generate_password_hash(os.getenv("ADMIN_PASSWORD", "admin123")),
-            "api": generate_password_hash(os.getenv("API_PASSWORD", "api123"))
-        }
+        USERS = usuarios_estaticos()
         
         if username in USERS and check_password_hash(USERS.get(username), password):
-            logger.info(f"Autenticación básica exitosa para usuario estático: {username}")
+            logger.info("Autenticación básica exitosa para usuario estático: %s", username)
             g.current_user = {"username": username, "rol": "admin" if username == "admin" else "usuario"}
+            cache_credenciales.guardar(clave, (username, g.current_user))
             return username
     
-    logger.warning(f"Intento fallido de autenticación básica para el usuario: {username}")
+    logger.warning("Intento fallido de autenticación básica para el usuario: %s", username)
     return False
 
 @token_auth.verify_token
 def verify_token(token):
     """Verificar token para autenticación por token."""
-    # Buscar el token en la base de datos
-    usuario = Token.check_token(token)
+    # Buscar el token en la caché o en la base de datos
+    usuario = autenticar_token(token) if token else None
     
     if usuario:
-        # Actualizar última actividad
-        usuario.ultima_actividad = datetime.now()
-        db.session.commit()
-        
-        logger.info(f"Autenticación por token exitosa para el usuario: {usuario.username}")
+        logger.info("Autenticación por token exitosa para el usuario: %s", usuario.username)
         g.current_user = usuario
         return usuario
     
@@ -74,12 +213,12 @@ def verify_token(token):
         
         if token in TOKENS:
             username = TOKENS.get(token)
-            logger.info(f"Autenticación por token estático exitosa para el usuario: {username}")
+            logger.info("Autenticación por token estático exitosa para el usuario: %s", username)
             g.current_user = {"username": username, "rol": "admin" if username == "admin" else "usuario"}
             return username
     
     if token:
-        logger.warning(f"Intento fallido de autenticación por token: {token[:10]}...")
+        logger.warning("Intento fallido de autenticación por token: %s...", token[:10])
     return False
 
 def admin_required(f):
@@ -89,15 +228,15 @@ def admin_required(f):
         # Si g.current_user es un objeto Usuario
         if hasattr(g.current_user, 'is_admin'):
             if not g.current_user.is_admin():
-                logger.warning(f"Acceso denegado a función administrativa para el usuario: {g.current_user.username}")
+                logger.warning("Acceso denegado a función administrativa para el usuario: %s", g.current_user.username)
                 return jsonify({"error": "Se requieren privilegios de administrador"}), 403
         # Si g.current_user es un diccionario (para usuarios estáticos)
         elif isinstance(g.current_user, dict) and g.current_user.get("rol") != "admin":
-            logger.warning(f"Acceso denegado a función administrativa para el usuario: {g.current_user.get('username')}")
+            logger.warning("Acceso denegado a función administrativa para el usuario: %s", g.current_user.get('username'))
             return jsonify({"error": "Se requieren privilegios de administrador"}), 403
         # Si g.current_user es una cadena (para compatibilidad con versiones anteriores)
         elif isinstance(g.current_user, str) and g.current_user != "admin":
-            logger.warning(f"Acceso denegado a función administrativa para el usuario: {g.current_user}")
+            logger.warning("Acceso denegado a función administrativa para el usuario: %s", g.current_user)
             return jsonify({"error": "Se requieren privilegios de administrador"}), 403
             
         return f(*args, **kwargs)
@@ -107,15 +246,11 @@ def get_api_key():
     """Obtener API key del encabezado de la solicitud."""
     api_key = request.headers.get('X-API-Key')
     
-    # Verificar si es un token válido en la base de datos
-    usuario = Token.check_token(api_key) if api_key else None
+    # Verificar si es un token válido (caché o base de datos)
+    usuario = autenticar_token(api_key) if api_key else None
     
     if usuario:
-        # Actualizar última actividad
-        usuario.ultima_actividad = datetime.now()
-        db.session.commit()
-        
-        logger.info(f"Autenticación por API key exitosa para el usuario: {usuario.username}")
+        logger.info("Autenticación por API key exitosa para el usuario: %s", usuario.username)
         g.current_user = usuario
         return True
     
@@ -129,10 +264,10 @@ def get_api_key():
         
         if api_key in TOKENS:
             username = TOKENS.get(api_key)
-            logger.info(f"Autenticación por API key estática exitosa para el usuario: {username}")
+            logger.info("Autenticación por API key estática exitosa para el usuario: %s", username)
             g.current_user = {"username": username, "rol": "admin" if username == "admin" else "usuario"}
             return True
     
     if api_key:
-        logger.warning(f"Intento fallido de autenticación por API key: {api_key[:10]}...")
+        logger.warning("Intento fallido de autenticación por API key: %s...", api_key[:10])
     return False
@@ -0,0 +1,235 @@
+"""
+Índice de texto completo para buscar contribuyentes por nombre y nombre comercial.
+
+En SQLite se usa una tabla virtual FTS5 de contenido externo (tokenizador trigram,
+que conserva la búsqueda por subcadena de LIKE '%texto%'; unicode61 si la versión
+de SQLite no lo incluye), sincronizada con triggers. En MySQL se usa un índice
+FULLTEXT, que InnoDB mantiene por sí solo. Se desactiva con TEXT_SEARCH=false;
+sin índice, las búsquedas vuelven a usar LIKE.
+"""
+import os
+import re
+from sqlalchemy import MetaData, Table, Column, Integer, Float, Text, inspect, text, desc
+from sqlalchemy.dialects import mysql
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import Contribuyente
+from app.cache import al_cambiar_snapshot
+from app.utils.logger import db_logger as logger
+
+TABLA_FTS = 'contribuyentes_fts'
+INDICE_FULLTEXT = 'ft_contribuyentes_nombre'
+COLUMNAS_TEXTO = ('nombre', 'nombre_comercial')
+
+# Motores de búsqueda posibles
+MOTOR_TRIGRAM = 'fts5-trigram'
+MOTOR_UNICODE = 'fts5-unicode61'
+MOTOR_FULLTEXT = 'mysql-fulltext'
+
+# Tabla virtual FTS5 vista desde SQLAlchemy (la columna con el nombre de la
+# tabla es la columna oculta que recibe MATCH sobre todas las columnas)
+_fts = Table(
+    TABLA_FTS, MetaData(),
+    Column('rowid', Integer, primary_key=True),
+    Column('nombre', Text),
+    Column('nombre_comercial', Text),
+    Column(TABLA_FTS, Text),
+    Column('rank', Float)
+)
+
+def busqueda_texto_habilitada():
+    """Indica si el índice de texto está habilitado (TEXT_SEARCH, por defecto true)."""
+    return os.getenv('TEXT_SEARCH', 'true').lower() == 'true'
+
+def _sentencias_triggers_sqlite(tabla=Contribuyente.__tablename__):
+    """
+    Devuelve las sentencias que mantienen la tabla FTS5 sincronizada con la de
+    contribuyentes (patrón de contenido externo de la documentación de SQLite).
+    """
+    columnas = ', '.join(COLUMNAS_TEXTO)
+    nuevos = ', '.join(f'new.{c}' for c in COLUMNAS_TEXTO)
+    anteriores = ', '.join(f'old.{c}' for c in COLUMNAS_TEXTO)
+    insertar = f"INSERT INTO {TABLA_FTS}(rowid, {columnas}) VALUES (new.id, {nuevos});"
+    borrar = f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, {columnas}) VALUES ('delete', old.id, {anteriores});"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON {tabla} BEGIN {insertar} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON {tabla} BEGIN {borrar} END",
+        f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE OF {columnas} ON {tabla} BEGIN {borrar} {insertar} END"
+    ]
+
+def _sentencia_reconstruir_sqlite():
+    """Sentencia que vuelve a generar el índice FTS5 a partir de la tabla de contribuyentes."""
+    return f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')"
+
+def script_sincronizacion_sqlite():
+    """
+    Devuelve el script SQL que vuelve a crear los triggers y reconstruye el índice
+    FTS5. Se ejecuta dentro de la transacción que intercambia la tabla sombra, para
+    que las búsquedas nunca vean el índice de la tabla anterior.
+
+    Returns:
+        str: Script SQL terminado en ';'.
+    """
+    return ''.join(f"{sentencia};\n" for sentencia in _sentencias_triggers_sqlite() + [_sentencia_reconstruir_sqlite()])
+
+def existe_tabla_fts(conn):
+    """Indica si existe la tabla virtual FTS5 en una conexión SQLite."""
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"),
+        {'nombre': TABLA_FTS}
+    ).first() is not None
+
+def _preparar_sqlite(conn):
+    """Crea la tabla FTS5 y sus triggers si faltan, y la llena cuando hace falta."""
+    reconstruir = False
+    if not existe_tabla_fts(conn):
+        columnas = ', '.join(COLUMNAS_TEXTO)
+        opciones = f"content='{Contribuyente.__tablename__}', content_rowid='id'"
+        try:
+            conn.execute(text(f"CREATE VIRTUAL TABLE {TABLA_FTS} USING fts5({columnas}, {opciones}, tokenize='trigram')"))
+        except OperationalError:
+            # SQLite anterior a 3.34: sin trigram la búsqueda es por prefijo de palabra
+            logger.warning("SQLite no incluye el tokenizador trigram, se usará unicode61")
+            conn.execute(text(f"CREATE VIRTUAL TABLE {TABLA_FTS} USING fts5({columnas}, {opciones}, tokenize='unicode61 remove_diacritics 2')"))
+        logger.info(f"Tabla de texto completo {TABLA_FTS} creada")
+        reconstruir = True
+
+    triggers = set(conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :tabla"),
+        {'tabla': Contribuyente.__tablename__}
+    ).scalars())
+    if not {f'{TABLA_FTS}_ai', f'{TABLA_FTS}_ad', f'{TABLA_FTS}_au'} <= triggers:
+        # Sin triggers el índice pudo quedar desfasado: se reconstruye completo
+        for sentencia in _sentencias_triggers_sqlite():
+            conn.execute(text(sentencia))
+        reconstruir = True
+
+    if reconstruir:
+        conn.execute(text(_sentencia_reconstruir_sqlite()))
+        logger.info(f"Índice de texto completo {TABLA_FTS} reconstruido")
+
+def crear_indice_fulltext(conn, tabla=Contribuyente.__tablename__):
+    """
+    Crea el índice FULLTEXT de MySQL en una tabla de contribuyentes (la actual o
+    la tabla sombra de una recarga).
+    """
+    columnas = ', '.join(COLUMNAS_TEXTO)
+    conn.execute(text(f"ALTER TABLE {tabla} ADD FULLTEXT INDEX {INDICE_FULLTEXT} ({columnas})"))
+    logger.info(f"Índice FULLTEXT {INDICE_FULLTEXT} creado en {tabla}")
+
+def preparar_indice_texto(engine):
+    """
+    Crea el índice de texto completo si falta. Se llama desde actualizar_esquema.
+
+    Args:
+        engine (Engine): Motor de la base de datos.
+    """
+    if not busqueda_texto_habilitada():
+        return
+
+    if engine.dialect.name == 'sqlite':
+        with engine.begin() as conn:
+            _preparar_sqlite(conn)
+    elif engine.dialect.name == 'mysql':
+        indices = inspect(engine).get_indexes(Contribuyente.__tablename__)
+        if not any(indice['name'] == INDICE_FULLTEXT for indice in indices):
+            with engine.begin() as conn:
+                crear_indice_fulltext(conn)
+
+# Motor de búsqueda detectado (se vuelve a detectar con cada nueva actualización)
+_motor = {'detectado': False, 'valor': None}
+
+@al_cambiar_snapshot
+def _olvidar_motor(snapshot):
+    _motor['detectado'] = False
+
+def motor_busqueda():
+    """
+    Devuelve el motor de texto completo disponible en la base de datos.
+    Requiere contexto de aplicación.
+
+    Returns:
+        str: MOTOR_TRIGRAM, MOTOR_UNICODE, MOTOR_FULLTEXT o None si no hay índice.
+    """
+    if _motor['detectado']:
+        return _motor['valor']
+
+    valor = None
+    if busqueda_texto_habilitada():
+        dialecto = db.engine.dialect.name
+        if dialecto == 'sqlite':
+            sql = db.session.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :nombre"),
+                {'nombre': TABLA_FTS}
+            ).scalar()
+            if sql:
+                valor = MOTOR_TRIGRAM if 'trigram' in sql else MOTOR_UNICODE
+        elif dialecto == 'mysql':
+            indices = inspect(db.engine).get_indexes(Contribuyente.__tablename__)
+            if any(indice['name'] == INDICE_FULLTEXT for indice in indices):
+                valor = MOTOR_FULLTEXT
+
+    _motor['valor'] = valor
+    _motor['detectado'] = True
+    return valor
+
+def _consulta_fts5(texto, motor, columnas):
+    """Convierte el texto buscado en una expresión MATCH de FTS5."""
+    if motor == MOTOR_TRIGRAM:
+        # Una frase entre comillas equivale a buscar la subcadena
+        consulta = '"' + texto.replace('"', '""') + '"'
+    else:
+        palabras = texto.replace('"', ' ').split()
+        consulta = ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+    if tuple(columnas) != COLUMNAS_TEXTO:
+        consulta = '{' + ' '.join(columnas) + '} : (' + consulta + ')'
+    return consulta
+
+def _consulta_fulltext(texto):
+    """Convierte el texto buscado en una consulta FULLTEXT en modo booleano."""
+    # Se quitan los operadores del modo booleano y las palabras más cortas que el
+    # tamaño mínimo de token de InnoDB (3), que nunca están en el índice
+    palabras = [p for p in re.split(r'[\s+\-<>()~*"@]+', texto) if len(p) >= 3]
+    return ' '.join(f'+{palabra}*' for palabra in palabras)
+
+def filtrar_por_texto(query, texto, columnas=COLUMNAS_TEXTO):
+    """
+    Filtra una consulta de contribuyentes por texto en nombre y/o nombre comercial,
+    con el índice de texto completo si existe o con LIKE si no.
+
+    Args:
+        query (Query): Consulta sobre Contribuyente.
+        texto (str): Texto buscado.
+        columnas (tuple): Columnas donde buscar ('nombre', 'nombre_comercial').
+
+    Returns:
+        tuple: (consulta filtrada, criterio de orden por relevancia o None si
+               la búsqueda no usa el índice).
+    """
+    motor = motor_busqueda()
+
+    if motor in (MOTOR_TRIGRAM, MOTOR_UNICODE):
+        consulta = _consulta_fts5(texto, motor, columnas)
+        if consulta.strip('"{}: ()'):
+            query = query.join(_fts, _fts.c.rowid == Contribuyente.id).filter(_fts.c[TABLA_FTS].match(consulta))
+            # rank de FTS5 es bm25 negativo: menor es más relevante
+            return query, _fts.c.rank
+
+    elif motor == MOTOR_FULLTEXT:
+        consulta = _consulta_fulltext(texto)
+        if consulta:
+            relevancia = mysql.match(
+                *[getattr(Contribuyente, c) for c in COLUMNAS_TEXTO], against=consulta
+            ).in_boolean_mode()
+            query = query.filter(relevancia)
+            if tuple(columnas) != COLUMNAS_TEXTO:
+                # El índice cubre ambas columnas: se restringe a la pedida con LIKE
+                query = query.filter(*[getattr(Contribuyente, c).ilike(f'%{texto}%') for c in columnas])
+            return query, desc(relevancia)
+
+    condiciones = [getattr(Contribuyente, c).ilike(f'%{texto}%') for c in columnas]
+    condicion = condiciones[0]
+    for otra in condiciones[1:]:
+        condicion = condicion | otra
+    return query.filter(condicion), None
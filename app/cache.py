@@ -0,0 +1,214 @@
+"""
+Cachés en memoria de la API DGII.
+Los datos solo cambian cuando se registra una nueva actualización (ActualizacionDB),
+por lo que las cachés se invalidan cuando aparece un nuevo registro de actualización.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from sqlalchemy import func
+from app import db
+from app.models import ActualizacionDB
+from app.acceso import anotar_cache
+from app.utils.logger import api_logger as logger
+
+# Valor devuelto por CacheLRU.obtener cuando la clave no está en la caché
+FALTA = object()
+
+class CacheLRU:
+    """Caché LRU acotada en número de entradas y con tiempo de vida (TTL)."""
+    
+    def __init__(self, nombre, max_entradas=10000, ttl=3600):
+        self.nombre = nombre
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.expirados = 0
+    
+    def obtener(self, clave):
+        """
+        Obtiene un valor de la caché.
+        
+        Returns:
+            El valor guardado (puede ser None para entradas negativas) o FALTA.
+        """
+        valor = self._obtener(clave)
+        anotar_cache(self.nombre, valor is not FALTA)
+        return valor
+    
+    def _obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return FALTA
+            
+            expira, valor = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                self.expirados += 1
+                self.fallos += 1
+                return FALTA
+            
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+    
+    def guardar(self, clave, valor):
+        """Guarda un valor en la caché, desalojando el menos usado si está llena."""
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.desalojos += 1
+    
+    def eliminar(self, clave):
+        """
+        Elimina una entrada de la caché si existe.
+        
+        Returns:
+            bool: True si la entrada estaba en la caché.
+        """
+        with self._lock:
+            return self._datos.pop(clave, None) is not None
+    
+    def eliminar_si(self, condicion):
+        """
+        Elimina las entradas cuyo valor cumple una condición.
+        
+        Args:
+            condicion (callable): Recibe el valor guardado y devuelve True si se debe eliminar.
+        
+        Returns:
+            int: Número de entradas eliminadas.
+        """
+        with self._lock:
+            claves = [clave for clave, (_, valor) in self._datos.items() if condicion(valor)]
+            for clave in claves:
+                del self._datos[clave]
+            return len(claves)
+    
+    def limpiar(self):
+        """
+        Elimina todas las entradas de la caché.
+        
+        Returns:
+            int: Número de entradas eliminadas.
+        """
+        with self._lock:
+            entradas = len(self._datos)
+            self._datos.clear()
+            return entradas
+    
+    def estadisticas(self):
+        """Devuelve los contadores de la caché."""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._datos),
+                'max_entradas': self.max_entradas,
+                'ttl': self.ttl,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+                'expirados': self.expirados,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else None
+            }
+
+# Cachés registradas (se limpian juntas al cambiar la actualización vigente)
+_caches = {}
+
+def registrar_cache(cache):
+    """Registra una caché para que se invalide con cada nueva actualización."""
+    _caches[cache.nombre] = cache
+    return cache
+
+def limpiar_caches():
+    """
+    Limpia todas las cachés registradas.
+    
+    Returns:
+        dict: Entradas eliminadas por caché.
+    """
+    return {nombre: cache.limpiar() for nombre, cache in _caches.items()}
+
+def estadisticas_caches():
+    """Devuelve los contadores de todas las cachés registradas."""
+    return {nombre: cache.estadisticas() for nombre, cache in _caches.items()}
+
+# Contribuyentes serializados por RNC (None para RNC no registrados)
+cache_contribuyentes = registrar_cache(CacheLRU(
+    'contribuyentes',
+    max_entradas=int(os.getenv('CACHE_MAX_ENTRIES', 20000)),
+    ttl=int(os.getenv('CACHE_TTL', 3600))
+))
+
+# Totales exactos de las búsquedas por conjunto de filtros normalizado
+cache_totales = registrar_cache(CacheLRU(
+    'totales',
+    max_entradas=int(os.getenv('CACHE_TOTALS_MAX_ENTRIES', 5000)),
+    ttl=int(os.getenv('CACHE_TOTALS_TTL', 86400))
+))
+
+# Respuestas grandes de /api ya serializadas y sus versiones comprimidas, por ETag
+cache_respuestas = registrar_cache(CacheLRU(
+    'respuestas',
+    max_entradas=int(os.getenv('CACHE_RESPONSES_MAX_ENTRIES', 500)),
+    ttl=int(os.getenv('CACHE_TTL', 3600))
+))
+
+# RNC registrados con dígito verificador no válido (una sola entrada por actualización)
+cache_excepciones_digito = registrar_cache(CacheLRU('excepciones_digito', max_entradas=1, ttl=86400))
+
+# Funciones a ejecutar cuando cambia la actualización vigente
+_oyentes_snapshot = []
+
+def al_cambiar_snapshot(funcion):
+    """
+    Registra una función que se llamará con el id de la nueva actualización
+    cada vez que snapshot_actual detecte un cambio.
+    """
+    _oyentes_snapshot.append(funcion)
+    return funcion
+
+# Última actualización conocida y momento en que se consultó
+_snapshot = {'id': None, 'verificado': None}
+_snapshot_lock = threading.Lock()
+
+# Segundos entre consultas a la tabla de actualizaciones
+INTERVALO_SNAPSHOT = float(os.getenv('CACHE_SNAPSHOT_INTERVAL', 30))
+
+def snapshot_actual():
+    """
+    Devuelve el id de la última actualización de la base de datos.
+    La tabla de actualizaciones se consulta como máximo cada CACHE_SNAPSHOT_INTERVAL
+    segundos; si apareció una actualización nueva, se limpian todas las cachés y
+    se avisa a las funciones registradas con al_cambiar_snapshot.
+    Requiere contexto de aplicación.
+    
+    Returns:
+        int: Id del último registro de ActualizacionDB, o None si no hay ninguno.
+    """
+    ahora = time.monotonic()
+    if _snapshot['verificado'] is not None and ahora - _snapshot['verificado'] < INTERVALO_SNAPSHOT:
+        return _snapshot['id']
+    
+    with _snapshot_lock:
+        if _snapshot['verificado'] is not None and ahora - _snapshot['verificado'] < INTERVALO_SNAPSHOT:
+            return _snapshot['id']
+        
+        ultimo_id = db.session.query(func.max(ActualizacionDB.id)).scalar()
+        if ultimo_id != _snapshot['id']:
+            eliminadas = limpiar_caches()
+            logger.info(f"Actualización vigente de la base de datos: {ultimo_id}. Cachés invalidadas: {eliminadas}")
+            _snapshot['id'] = ultimo_id
+            for funcion in _oyentes_snapshot:
+                funcion(ultimo_id)
+        _snapshot['verificado'] = ahora
+        return ultimo_id
@@ -0,0 +1,150 @@
+"""
+Compresión de respuestas según la cabecera Accept-Encoding.
+
+gzip siempre está disponible; brotli (br) y zstd solo si están instalados los
+paquetes brotli y zstandard (pip install brotli zstandard).
+
+Las respuestas de /api a partir de API_COMPRESSION_MIN_BYTES bytes (los listados)
+se guardan en la caché de respuestas bajo su ETag, junto con cada versión
+comprimida que se haya pedido: mientras no cambie la actualización vigente, la
+misma solicitud se sirve desde la caché y cada codificación se calcula una vez.
+"""
+import os
+import gzip
+import hashlib
+from flask import g, request, current_app
+from app.cache import cache_respuestas, FALTA
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Codificaciones disponibles en orden de preferencia del servidor
+CODIFICACIONES = (['br'] if brotli else []) + (['zstd'] if zstandard else []) + ['gzip']
+
+# Niveles para las respuestas dinámicas: rápidos, la primera solicitud espera por ellos
+NIVELES_DINAMICOS = {'br': 5, 'zstd': 3, 'gzip': 6}
+
+# Tamaño mínimo (bytes) de las respuestas de /api que se comprimen y guardan
+API_COMPRESSION_MIN_BYTES = int(os.getenv('API_COMPRESSION_MIN_BYTES', 1024))
+
+def comprimir(datos, codificacion, nivel=None):
+    """
+    Comprime unos bytes con la codificación indicada.
+
+    Args:
+        datos (bytes): Contenido sin comprimir.
+        codificacion (str): 'gzip', 'br' o 'zstd'.
+        nivel (int, optional): Nivel de compresión (el máximo si es None).
+
+    Returns:
+        bytes: Contenido comprimido.
+    """
+    if codificacion == 'br':
+        return brotli.compress(datos, quality=11 if nivel is None else nivel)
+    if codificacion == 'zstd':
+        return zstandard.ZstdCompressor(level=19 if nivel is None else nivel).compress(datos)
+    # mtime=0: la misma entrada produce siempre los mismos bytes
+    return gzip.compress(datos, compresslevel=9 if nivel is None else nivel, mtime=0)
+
+def elegir_codificacion(disponibles=CODIFICACIONES):
+    """
+    Elige la codificación de la respuesta según Accept-Encoding.
+
+    Returns:
+        str: Codificación aceptada por el cliente con mayor calidad, o None
+        para enviar el contenido sin comprimir.
+    """
+    aceptadas = request.accept_encodings
+    mejor, calidad_mejor = None, 0
+    for codificacion in disponibles:
+        calidad = aceptadas[codificacion]
+        if calidad > calidad_mejor:
+            mejor, calidad_mejor = codificacion, calidad
+    return mejor
+
+class ContenidoEstatico:
+    """
+    Contenido que no cambia mientras el proceso está en marcha (por ejemplo,
+    swagger.json): se codifica y comprime una sola vez y se sirve con ETag
+    fuerte, variantes comprimidas y cabeceras de caché.
+    """
+
+    def __init__(self, datos, mimetype, max_age=86400):
+        self.mimetype = mimetype
+        self.max_age = max_age
+        self.etag = hashlib.sha256(datos).hexdigest()[:32]
+        self.variantes = {None: datos}
+        for codificacion in CODIFICACIONES:
+            comprimido = comprimir(datos, codificacion)
+            if len(comprimido) < len(datos):
+                self.variantes[codificacion] = comprimido
+
+    def respuesta(self):
+        """Devuelve la respuesta para la solicitud actual (304 si el cliente ya la tiene)."""
+        codificacion = elegir_codificacion([c for c in self.variantes if c])
+        # Cada variante es una representación distinta y tiene su propio ETag fuerte
+        etag = f"{self.etag}-{codificacion}" if codificacion else self.etag
+
+        if request.if_none_match.contains_weak(etag):
+            respuesta = current_app.response_class(status=304)
+        else:
+            respuesta = current_app.response_class(self.variantes[codificacion], mimetype=self.mimetype)
+            if codificacion:
+                respuesta.headers['Content-Encoding'] = codificacion
+
+        respuesta.set_etag(etag)
+        respuesta.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        respuesta.vary.add('Accept-Encoding')
+        return respuesta
+
+def respuesta_guardada():
+    """
+    Devuelve la respuesta de la solicitud actual desde la caché de respuestas, o
+    None si no está. Requiere el ETag calculado por app.condicional.
+    """
+    etag = g.get('etag_api')
+    if etag is None or request.method != 'GET':
+        return None
+    variantes = cache_respuestas.obtener(etag)
+    if variantes is FALTA:
+        return None
+    g.variantes_respuesta = variantes
+    return current_app.response_class(variantes[None], mimetype='application/json')
+
+def comprimir_respuesta(response):
+    """
+    Comprime una respuesta correcta de /api si supera el tamaño mínimo y el
+    cliente acepta alguna codificación, y la guarda en la caché de respuestas.
+    """
+    if (response.status_code != 200 or request.method != 'GET' or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    variantes = g.get('variantes_respuesta')
+    if variantes is None:
+        datos = response.get_data()
+        if len(datos) < API_COMPRESSION_MIN_BYTES:
+            return response
+        variantes = {None: datos}
+        if g.get('etag_api') is not None:
+            cache_respuestas.guardar(g.etag_api, variantes)
+
+    response.vary.add('Accept-Encoding')
+    codificacion = elegir_codificacion()
+    if codificacion is None:
+        return response
+
+    cuerpo = variantes.get(codificacion)
+    if cuerpo is None:
+        cuerpo = comprimir(variantes[None], codificacion, NIVELES_DINAMICOS[codificacion])
+        variantes[codificacion] = cuerpo
+    response.set_data(cuerpo)
+    response.headers['Content-Encoding'] = codificacion
+    return response
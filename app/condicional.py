@@ -0,0 +1,88 @@
+"""
+GET condicional para los endpoints de /api.
+
+Los datos solo cambian cuando se registra una nueva actualización (ActualizacionDB),
+así que la respuesta a una misma solicitud es la misma mientras no cambie la
+actualización vigente. El ETag se deriva del id de esa actualización y de la
+solicitud (ruta y parámetros), y Last-Modified es la fecha de la actualización.
+If-None-Match e If-Modified-Since se comprueban antes de ejecutar el endpoint, por
+lo que una respuesta 304 no consulta la base de datos.
+"""
+import os
+import hashlib
+from datetime import timezone
+from flask import g, request, current_app
+from app import db
+from app.models import ActualizacionDB
+from app.cache import CacheLRU, registrar_cache, FALTA
+
+# Segundos que los clientes y proxies pueden reutilizar una respuesta sin revalidarla
+API_CACHE_MAX_AGE = int(os.getenv('API_CACHE_MAX_AGE', 300))
+
+# Fecha de la actualización vigente (una entrada por actualización)
+cache_fecha_snapshot = registrar_cache(CacheLRU('fecha_snapshot', max_entradas=1, ttl=86400))
+
+def fecha_snapshot(snapshot):
+    """
+    Devuelve la fecha (en UTC) de la actualización indicada, consultándola una sola vez.
+    ActualizacionDB.fecha se guarda en hora local sin zona; Last-Modified e
+    If-Modified-Since están en GMT.
+    """
+    fecha = cache_fecha_snapshot.obtener(snapshot)
+    if fecha is FALTA:
+        fecha = db.session.query(ActualizacionDB.fecha).filter(ActualizacionDB.id == snapshot).scalar()
+        if fecha is not None:
+            fecha = fecha.astimezone(timezone.utc)
+        cache_fecha_snapshot.guardar(snapshot, fecha)
+    return fecha
+
+def etag_solicitud(snapshot):
+    """ETag de la solicitud actual: actualización vigente + ruta y parámetros."""
+    parametros = '&'.join(f"{clave}={valor}" for clave, valor in sorted(request.args.items(multi=True)))
+    clave = hashlib.sha1(f"{request.path}?{parametros}".encode('utf-8')).hexdigest()[:16]
+    return f"{snapshot}-{clave}"
+
+def comprobar_condicional(snapshot):
+    """
+    Calcula el ETag y la fecha de la solicitud y, si el cliente ya tiene la
+    respuesta vigente, devuelve un 304.
+
+    Args:
+        snapshot (int): Id de la actualización vigente (None si no hay ninguna).
+
+    Returns:
+        Response: Respuesta 304, o None para ejecutar el endpoint.
+    """
+    if request.method not in ('GET', 'HEAD') or snapshot is None:
+        return None
+
+    g.etag_api = etag_solicitud(snapshot)
+    g.fecha_api = fecha_snapshot(snapshot)
+
+    # Si hay If-None-Match, If-Modified-Since se ignora
+    if request.if_none_match:
+        vigente = request.if_none_match.contains_weak(g.etag_api)
+    else:
+        vigente = (
+            request.if_modified_since is not None and g.fecha_api is not None
+            and g.fecha_api.replace(microsecond=0) <= request.if_modified_since
+        )
+    if not vigente:
+        return None
+
+    return agregar_cabeceras(current_app.response_class(status=304))
+
+def agregar_cabeceras(response):
+    """Agrega ETag, Last-Modified y Cache-Control a las respuestas correctas."""
+    etag = g.get('etag_api')
+    if etag is None or response.status_code not in (200, 304):
+        return response
+
+    # Débil: la misma información puede enviarse con otra codificación o formato
+    response.set_etag(etag, weak=True)
+    if g.fecha_api is not None:
+        response.last_modified = g.fecha_api
+    # Con credenciales la respuesta no se guarda en cachés compartidas
+    privada = 'Authorization' in request.headers or 'X-API-Key' in request.headers
+    response.headers['Cache-Control'] = f"{'private' if privada else 'public'}, max-age={API_CACHE_MAX_AGE}"
+    return response
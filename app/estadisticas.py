@@ -0,0 +1,114 @@
+"""
+Estadísticas de contribuyentes precalculadas.
+
+Los conteos por estado, régimen, actividad y categoría solo cambian cuando se
+actualiza la base de datos, por lo que se calculan una vez en actualizar_base_datos
+y se guardan en la tabla estadisticas_contribuyentes junto con el id de la
+actualización (snapshot) a la que pertenecen.
+"""
+from datetime import datetime
+from sqlalchemy import func
+from app import db
+from app.models import Contribuyente, EstadisticaContribuyentes
+from app.cache import CacheLRU, registrar_cache, FALTA
+from app.utils.logger import db_logger as logger
+
+# Dimensión de cada conteo y columna agrupada
+DIMENSIONES = {
+    'estado': Contribuyente.estado,
+    'regimen': Contribuyente.regimen_pagos,
+    'actividad': Contribuyente.actividad_economica,
+    'categoria': Contribuyente.categoria
+}
+DIMENSION_TOTAL = 'total'
+
+# Estadísticas leídas de la tabla (se invalidan con cada nueva actualización)
+cache_estadisticas = registrar_cache(CacheLRU('estadisticas', max_entradas=1, ttl=86400))
+
+def _calcular():
+    """
+    Calcula los conteos sobre la tabla de contribuyentes.
+
+    Returns:
+        list: Tuplas (dimensión, valor, total).
+    """
+    conteos = [(DIMENSION_TOTAL, None, db.session.query(func.count(Contribuyente.id)).scalar())]
+    for dimension, columna in DIMENSIONES.items():
+        filas = db.session.query(columna, func.count(Contribuyente.id)).group_by(columna).all()
+        conteos.extend((dimension, valor, total) for valor, total in filas)
+    return conteos
+
+def materializar_estadisticas(actualizacion_id):
+    """
+    Recalcula las estadísticas y reemplaza las guardadas. No confirma la
+    transacción: se llama antes del commit que registra la actualización, para que
+    la API nunca vea estadísticas de una actualización distinta a la vigente.
+
+    Args:
+        actualizacion_id (int): Id del registro de ActualizacionDB.
+
+    Returns:
+        int: Número de filas de estadísticas guardadas.
+    """
+    conteos = _calcular()
+    fecha = datetime.now()
+
+    db.session.query(EstadisticaContribuyentes).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(EstadisticaContribuyentes, [
+        {
+            'actualizacion_id': actualizacion_id,
+            'dimension': dimension,
+            'valor': valor,
+            'total': total,
+            'fecha': fecha
+        }
+        for dimension, valor, total in conteos
+    ])
+
+    logger.info(f"Estadísticas de contribuyentes materializadas: {len(conteos)} filas (actualización {actualizacion_id})")
+    return len(conteos)
+
+def obtener_estadisticas():
+    """
+    Devuelve las estadísticas vigentes, leídas de la tabla una sola vez por
+    actualización. Si la tabla está vacía (base de datos anterior a esta tabla),
+    se calculan sobre la tabla de contribuyentes y solo se guardan en memoria.
+    Requiere contexto de aplicación.
+
+    Returns:
+        dict: {'total': int, 'estado': {valor: total}, 'regimen': {...},
+               'actividad': {...}, 'categoria': {...}, 'snapshot': id de la
+               actualización o None, 'fecha': fecha del cálculo (ISO)}.
+    """
+    estadisticas = cache_estadisticas.obtener('vigentes')
+    if estadisticas is not FALTA:
+        return estadisticas
+
+    filas = db.session.query(
+        EstadisticaContribuyentes.dimension,
+        EstadisticaContribuyentes.valor,
+        EstadisticaContribuyentes.total,
+        EstadisticaContribuyentes.actualizacion_id,
+        EstadisticaContribuyentes.fecha
+    ).all()
+
+    if filas:
+        conteos = [(dimension, valor, total) for dimension, valor, total, _, _ in filas]
+        snapshot, fecha = filas[0].actualizacion_id, filas[0].fecha
+    else:
+        logger.warning("No hay estadísticas materializadas, se calculan sobre la tabla de contribuyentes")
+        conteos = _calcular()
+        snapshot, fecha = None, datetime.now()
+
+    estadisticas = {dimension: {} for dimension in DIMENSIONES}
+    estadisticas[DIMENSION_TOTAL] = 0
+    for dimension, valor, total in conteos:
+        if dimension == DIMENSION_TOTAL:
+            estadisticas[DIMENSION_TOTAL] = total
+        elif valor:
+            estadisticas[dimension][valor] = total
+    estadisticas['snapshot'] = snapshot
+    estadisticas['fecha'] = fecha.isoformat()
+
+    cache_estadisticas.guardar('vigentes', estadisticas)
+    return estadisticas
@@ -0,0 +1,212 @@
+"""
+Índice de RNC residente en memoria para consultas sin acceso a la base de datos.
+
+Los RNC se guardan como enteros de 64 bits en un arreglo ordenado de NumPy y los
+datos de cada contribuyente en un único bloque de bytes, con un arreglo de
+desplazamientos que indica dónde empieza cada registro. Se activa con MEMORY_INDEX=true.
+"""
+import os
+import time
+import threading
+import numpy as np
+from sqlalchemy import select, func
+from app import db
+from app.models import Contribuyente, ActualizacionDB
+from app.cache import al_cambiar_snapshot
+from app.utils.logger import api_logger as logger
+
+# Campos de cada registro, en el mismo orden que Contribuyente.to_dict()
+CAMPOS = [
+    'id', 'rnc', 'nombre', 'nombre_comercial', 'categoria',
+    'regimen_pagos', 'estado', 'actividad_economica', 'fecha_actualizacion'
+]
+
+# Separador de campos dentro de un registro y marca de valor nulo
+SEPARADOR = '\x1f'
+NULO = '\x00'
+
+# Las cédulas (11 dígitos) se desplazan para no coincidir con RNC de 9 dígitos
+# que tengan el mismo valor numérico (por ejemplo, con ceros a la izquierda)
+DESPLAZAMIENTO_CEDULA = 10 ** 11
+
+def clave_rnc(rnc):
+    """
+    Convierte un RNC en la clave entera del índice.
+    
+    Returns:
+        int: Clave del RNC, o None si no tiene 9 u 11 dígitos.
+    """
+    if not rnc.isdigit() or len(rnc) not in (9, 11):
+        return None
+    return int(rnc) + (DESPLAZAMIENTO_CEDULA if len(rnc) == 11 else 0)
+
+def _codificar(fila):
+    """Codifica una fila de la consulta como un registro de bytes."""
+    valores = []
+    for campo, valor in zip(CAMPOS, fila):
+        if valor is None:
+            valores.append(NULO)
+        elif campo == 'fecha_actualizacion':
+            valores.append(valor.isoformat())
+        else:
+            valores.append(str(valor))
+    return SEPARADOR.join(valores).encode('utf-8')
+
+def _decodificar(registro):
+    """Decodifica un registro de bytes como el diccionario de Contribuyente.to_dict()."""
+    datos = {}
+    for campo, valor in zip(CAMPOS, registro.decode('utf-8').split(SEPARADOR)):
+        if valor == NULO:
+            datos[campo] = None
+        elif campo == 'id':
+            datos[campo] = int(valor)
+        else:
+            datos[campo] = valor
+    return datos
+
+class IndiceRNC:
+    """Índice inmutable de contribuyentes por RNC."""
+    
+    def __init__(self, claves, desplazamientos, bloque, otros, snapshot):
+        self.claves = claves  # int64 ordenados
+        self.desplazamientos = desplazamientos  # int64, len(claves) + 1
+        self.bloque = bloque  # bytes con todos los registros
+        self.otros = otros  # RNC con formato no numérico -> registro
+        self.snapshot = snapshot
+        self.fecha_carga = time.time()
+    
+    @classmethod
+    def construir(cls):
+        """
+        Construye el índice leyendo todos los contribuyentes con una consulta Core.
+        Requiere contexto de aplicación.
+        
+        Returns:
+            IndiceRNC: Índice cargado.
+        """
+        snapshot = db.session.query(func.max(ActualizacionDB.id)).scalar()
+        columnas = [getattr(Contribuyente, campo) for campo in CAMPOS]
+        
+        claves = []
+        registros = []
+        otros = {}
+        resultado = db.session.execute(select(*columnas).execution_options(yield_per=10000))
+        for fila in resultado:
+            clave = clave_rnc(fila.rnc)
+            if clave is None:
+                otros[fila.rnc] = _codificar(fila)
+            else:
+                claves.append(clave)
+                registros.append(_codificar(fila))
+        db.session.commit()
+        
+        claves = np.array(claves, dtype=np.int64)
+        orden = np.argsort(claves, kind='stable')
+        claves = claves[orden]
+        registros = [registros[i] for i in orden]
+        
+        longitudes = np.fromiter((len(r) for r in registros), dtype=np.int64, count=len(registros))
+        desplazamientos = np.zeros(len(registros) + 1, dtype=np.int64)
+        np.cumsum(longitudes, out=desplazamientos[1:])
+        
+        return cls(claves, desplazamientos, b''.join(registros), otros, snapshot)
+    
+    def buscar(self, rnc):
+        """
+        Busca un contribuyente por RNC.
+        
+        Args:
+            rnc (str): RNC ya limpio.
+        
+        Returns:
+            dict: Datos del contribuyente, o None si no está registrado.
+        """
+        clave = clave_rnc(rnc)
+        if clave is None:
+            registro = self.otros.get(rnc)
+            return _decodificar(registro) if registro is not None else None
+        
+        posicion = int(np.searchsorted(self.claves, clave))
+        if posicion >= len(self.claves) or self.claves[posicion] != clave:
+            return None
+        
+        inicio = self.desplazamientos[posicion]
+        fin = self.desplazamientos[posicion + 1]
+        return _decodificar(self.bloque[inicio:fin])
+    
+    def estadisticas(self):
+        """Devuelve el tamaño en memoria de cada estructura del índice."""
+        bytes_otros = sum(len(k) + len(v) for k, v in self.otros.items())
+        total = self.claves.nbytes + self.desplazamientos.nbytes + len(self.bloque) + bytes_otros
+        return {
+            'registros': len(self.claves) + len(self.otros),
+            'snapshot': self.snapshot,
+            'fecha_carga': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.fecha_carga)),
+            'bytes_claves': self.claves.nbytes,
+            'bytes_desplazamientos': self.desplazamientos.nbytes,
+            'bytes_registros': len(self.bloque),
+            'bytes_otros': bytes_otros,
+            'bytes_total': total,
+            'bytes_por_registro': round(total / max(len(self.claves) + len(self.otros), 1), 1)
+        }
+
+# Índice vigente (None si el modo está desactivado o aún no se ha cargado)
+_indice = None
+_recarga_lock = threading.Lock()
+
+def indice_activo():
+    """Devuelve el índice vigente, o None si no está disponible."""
+    return _indice
+
+def cargar_indice():
+    """
+    Construye un índice nuevo y lo pone en servicio. Requiere contexto de aplicación.
+    
+    Returns:
+        IndiceRNC: Índice cargado.
+    """
+    global _indice
+    inicio = time.time()
+    indice = IndiceRNC.construir()
+    _indice = indice
+    stats = indice.estadisticas()
+    logger.info(f"Índice de RNC en memoria cargado: {stats['registros']} registros, "
+                f"{stats['bytes_total'] / 1024 / 1024:.1f} MB en {time.time() - inicio:.2f}s")
+    return indice
+
+def iniciar_indice(app):
+    """
+    Carga el índice al iniciar la aplicación si MEMORY_INDEX=true y programa su
+    recarga en segundo plano después de cada actualización de la base de datos.
+    
+    Args:
+        app (Flask): Aplicación Flask.
+    """
+    if os.getenv('MEMORY_INDEX', 'false').lower() != 'true':
+        return
+    
+    try:
+        with app.app_context():
+            cargar_indice()
+    except Exception as e:
+        logger.error(f"No se pudo cargar el índice de RNC en memoria, se usará la base de datos: {e}")
+    
+    def recargar(snapshot):
+        if _indice is not None and _indice.snapshot == snapshot:
+            return
+        if not _recarga_lock.acquire(blocking=False):
+            return  # Ya hay una recarga en curso
+        
+        def tarea():
+            try:
+                with app.app_context():
+                    cargar_indice()
+            except Exception as e:
+                logger.error(f"Error al recargar el índice de RNC en memoria: {e}")
+            finally:
+                _recarga_lock.release()
+        
+        # Mientras se construye el nuevo índice se sigue respondiendo con el anterior
+        threading.Thread(target=tarea, name='recarga-indice-rnc', daemon=True).start()
+    
+    al_cambiar_snapshot(recargar)
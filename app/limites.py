@@ -0,0 +1,246 @@
+"""
+Almacenamiento compartido para el límite de tasa (Flask-Limiter / limits).
+
+Con varios procesos de gunicorn, memory:// guarda contadores separados en cada
+proceso y el límite efectivo se multiplica por el número de procesos. AlmacenSQLite
+guarda los contadores en un archivo SQLite que comparten todos los procesos del
+mismo equipo, sin servicios adicionales (requiere SQLite 3.35 o posterior):
+
+    RATELIMIT_STORAGE_URI=sqlite:////var/lib/dgii/limites.db
+
+Con un servidor Redis disponible se usa el almacenamiento de limits
+(RATELIMIT_STORAGE_URI=redis://host:6379, requiere el paquete redis).
+
+Admite las estrategias fixed-window, moving-window y sliding-window-counter
+(RATELIMIT_STRATEGY).
+
+Las solicitudes con un token (X-API-Key o Authorization: Bearer) se limitan por
+usuario con su cuota (Usuario.limite_minuto, limite_rafaga y limite_diario); las
+demás, por IP con RATELIMIT_DEFAULT.
+"""
+import os
+import math
+import time
+import sqlite3
+import threading
+from flask import g, request
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage, MovingWindowSupport, SlidingWindowCounterSupport
+from limits.storage.base import TimestampedSlidingWindow
+
+# Segundos entre limpiezas de contadores y eventos vencidos (por proceso)
+INTERVALO_LIMPIEZA = 60
+
+# Límite de las solicitudes anónimas y de los usuarios sin cuota por minuto
+LIMITE_GENERAL = os.getenv('RATELIMIT_DEFAULT', '30 per minute')
+
+# Campos de la cuota de cada usuario y su periodo
+CUOTAS = (('limite_minuto', 'minute'), ('limite_rafaga', 'second'), ('limite_diario', 'day'))
+
+def usuario_limitado():
+    """
+    Devuelve el usuario del token de la solicitud, o None si no hay token o no es
+    válido. Se resuelve una sola vez por solicitud con la caché de tokens.
+    """
+    if 'usuario_limite' not in g:
+        valor = request.headers.get('X-API-Key')
+        if not valor:
+            autorizacion = request.headers.get('Authorization', '')
+            if autorizacion[:7].lower() == 'bearer ':
+                valor = autorizacion[7:].strip()
+        
+        from app.auth import autenticar_token
+        g.usuario_limite = autenticar_token(valor) if valor else None
+    return g.usuario_limite
+
+def clave_limite():
+    """Clave del límite de tasa: el usuario del token o, sin token, la IP."""
+    usuario = usuario_limitado()
+    return f"usuario:{usuario.id}" if usuario else get_remote_address()
+
+def limite_solicitud():
+    """
+    Límites de la solicitud actual (se evalúa en cada solicitud). Los usuarios sin
+    límite por minuto propio usan RATELIMIT_DEFAULT; la ráfaga (por segundo) y el
+    límite diario solo se aplican si el usuario los tiene.
+    """
+    usuario = usuario_limitado()
+    if usuario is None:
+        return LIMITE_GENERAL
+    
+    limites = []
+    for campo, periodo in CUOTAS:
+        valor = getattr(usuario, campo)
+        if valor:
+            limites.append(f"{valor} per {periodo}")
+    if not usuario.limite_minuto:
+        limites.insert(0, LIMITE_GENERAL)
+    return ';'.join(limites)
+
+class AlmacenSQLite(Storage, MovingWindowSupport, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Almacenamiento de límites de tasa en un archivo SQLite compartido entre procesos."""
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, **opciones):
+        # sqlite:////ruta/absoluta.db o sqlite:///ruta/relativa.db
+        self.ruta = uri.split('://', 1)[1][1:] or 'limites.db'
+        self.espera = float(opciones.get('timeout', 5))
+        self._local = threading.local()
+        self._ultima_limpieza = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **opciones)
+        self._crear_tablas()
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conexion(self):
+        """
+        Devuelve la conexión del hilo actual, abriendo una nueva en cada proceso
+        (las conexiones SQLite no se pueden usar después de un fork).
+        """
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None or self._local.pid != os.getpid():
+            conexion = sqlite3.connect(self.ruta, timeout=self.espera, isolation_level=None, check_same_thread=False)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexion = conexion
+            self._local.pid = os.getpid()
+        return conexion
+
+    def _crear_tablas(self):
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conexion = self._conexion()
+        conexion.execute(
+            'CREATE TABLE IF NOT EXISTS limites_contadores ('
+            'clave TEXT PRIMARY KEY, valor INTEGER NOT NULL, expira REAL NOT NULL)'
+        )
+        conexion.execute('CREATE TABLE IF NOT EXISTS limites_eventos (clave TEXT NOT NULL, instante REAL NOT NULL)')
+        conexion.execute('CREATE INDEX IF NOT EXISTS ix_limites_eventos_clave ON limites_eventos (clave, instante)')
+
+    def _limpiar_vencidos(self, ahora):
+        """Elimina de vez en cuando los contadores vencidos."""
+        if ahora - self._ultima_limpieza < INTERVALO_LIMPIEZA:
+            return
+        self._ultima_limpieza = ahora
+        self._conexion().execute('DELETE FROM limites_contadores WHERE expira <= ?', (ahora,))
+
+    def _incrementar(self, conexion, clave, expiracion, ahora, elastica=False, cantidad=1):
+        """Incrementa un contador en una sola sentencia (atómica entre procesos)."""
+        return conexion.execute(
+            'INSERT INTO limites_contadores (clave, valor, expira) VALUES (:clave, :cantidad, :nueva) '
+            'ON CONFLICT (clave) DO UPDATE SET '
+            'valor = CASE WHEN expira <= :ahora THEN :cantidad ELSE valor + :cantidad END, '
+            'expira = CASE WHEN expira <= :ahora OR :elastica THEN :nueva ELSE expira END '
+            'RETURNING valor',
+            {'clave': clave, 'cantidad': cantidad, 'nueva': ahora + expiracion, 'ahora': ahora, 'elastica': elastica}
+        ).fetchone()[0]
+
+    def _leer(self, conexion, clave, ahora):
+        fila = conexion.execute(
+            'SELECT valor FROM limites_contadores WHERE clave = ? AND expira > ?', (clave, ahora)
+        ).fetchone()
+        return fila[0] if fila else 0
+
+    # Ventana fija
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        ahora = time.time()
+        self._limpiar_vencidos(ahora)
+        return self._incrementar(self._conexion(), key, expiry, ahora, elastic_expiry, amount)
+
+    def get(self, key):
+        return self._leer(self._conexion(), key, time.time())
+
+    def get_expiry(self, key):
+        ahora = time.time()
+        fila = self._conexion().execute(
+            'SELECT expira FROM limites_contadores WHERE clave = ? AND expira > ?', (key, ahora)
+        ).fetchone()
+        return fila[0] if fila else ahora
+
+    def check(self):
+        try:
+            self._conexion().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        conexion = self._conexion()
+        eliminados = conexion.execute('DELETE FROM limites_contadores').rowcount
+        eliminados += conexion.execute('DELETE FROM limites_eventos').rowcount
+        return eliminados
+
+    def clear(self, key):
+        conexion = self._conexion()
+        conexion.execute('DELETE FROM limites_contadores WHERE clave = ?', (key,))
+        conexion.execute('DELETE FROM limites_eventos WHERE clave = ?', (key,))
+
+    # Ventana móvil: un evento por solicitud aceptada
+
+    def acquire_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        conexion = self._conexion()
+        ahora = time.time()
+        # BEGIN IMMEDIATE toma el bloqueo de escritura: contar e insertar es atómico entre procesos
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            conexion.execute('DELETE FROM limites_eventos WHERE clave = ? AND instante < ?', (key, ahora - expiry))
+            ocupados = conexion.execute('SELECT COUNT(*) FROM limites_eventos WHERE clave = ?', (key,)).fetchone()[0]
+            if ocupados + amount > limit:
+                conexion.execute('COMMIT')
+                return False
+            conexion.executemany('INSERT INTO limites_eventos (clave, instante) VALUES (?, ?)', [(key, ahora)] * amount)
+            conexion.execute('COMMIT')
+            return True
+        except BaseException:
+            conexion.execute('ROLLBACK')
+            raise
+
+    def get_moving_window(self, key, limit, expiry):
+        ahora = time.time()
+        inicio, ocupados = self._conexion().execute(
+            'SELECT MIN(instante), COUNT(*) FROM limites_eventos WHERE clave = ? AND instante >= ?',
+            (key, ahora - expiry)
+        ).fetchone()
+        return (inicio if inicio is not None else ahora), ocupados
+
+    # Ventana deslizante aproximada: contador actual + parte proporcional del anterior
+
+    def _ventana_deslizante(self, conexion, key, expiry, ahora):
+        anterior, actual = self.sliding_window_keys(key, expiry, ahora)
+        cuenta_anterior = self._leer(conexion, anterior, ahora)
+        cuenta_actual = self._leer(conexion, actual, ahora)
+        ttl_anterior = (1 - (((ahora - expiry) / expiry) % 1)) * expiry if cuenta_anterior else 0.0
+        ttl_actual = (1 - ((ahora / expiry) % 1)) * expiry + expiry
+        return actual, cuenta_anterior, ttl_anterior, cuenta_actual, ttl_actual
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        conexion = self._conexion()
+        ahora = time.time()
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            actual, cuenta_anterior, ttl_anterior, cuenta_actual, _ = self._ventana_deslizante(conexion, key, expiry, ahora)
+            if math.floor(cuenta_anterior * ttl_anterior / expiry + cuenta_actual) + amount > limit:
+                conexion.execute('COMMIT')
+                return False
+            # El contador de la ventana actual se conserva durante la siguiente
+            self._incrementar(conexion, actual, 2 * expiry, ahora, cantidad=amount)
+            conexion.execute('COMMIT')
+            return True
+        except BaseException:
+            conexion.execute('ROLLBACK')
+            raise
+
+    def get_sliding_window(self, key, expiry):
+        _, cuenta_anterior, ttl_anterior, cuenta_actual, ttl_actual = self._ventana_deslizante(
+            self._conexion(), key, expiry, time.time()
+        )
+        return cuenta_anterior, ttl_anterior, cuenta_actual, ttl_actual
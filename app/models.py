@@ -9,6 +9,11 @@ from app import db
 class Contribuyente(db.Model):
     """Modelo para almacenar la información de los contribuyentes."""
     __tablename__ = 'contribuyentes'
+    __table_args__ = (
+        # Paginación por cursor: ORDER BY nombre, id con o sin filtro de estado
+        db.Index('ix_contribuyentes_nombre_id', 'nombre', 'id'),
+        db.Index('ix_contribuyentes_estado_nombre_id', 'estado', 'nombre', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     rnc = db.Column(db.String(11), unique=True, index=True, nullable=False)
@@ -18,6 +23,8 @@ class Contribuyente(db.Model):
     regimen_pagos = db.Column(db.String(50), nullable=True)
     estado = db.Column(db.String(50), nullable=True)
     actividad_economica = db.Column(db.String(255), nullable=True)
+    hash_contenido = db.Column(db.BigInteger, nullable=True)  # Hash de los campos de datos para detectar cambios
+    digito_valido = db.Column(db.Boolean, nullable=True)  # Dígito verificador correcto (hay números emitidos que no lo cumplen)
     fecha_actualizacion = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
@@ -46,12 +53,27 @@ class ActualizacionDB(db.Model):
     registros_procesados = db.Column(db.Integer, default=0)
     registros_nuevos = db.Column(db.Integer, default=0)
     registros_actualizados = db.Column(db.Integer, default=0)
+    registros_sin_cambios = db.Column(db.Integer, default=0)
     estado = db.Column(db.String(50), default='completado')
     mensaje = db.Column(db.String(255), nullable=True)
     
     def __repr__(self):
         return f'<ActualizacionDB {self.fecha}>'
 
+class EstadisticaContribuyentes(db.Model):
+    """Conteos de contribuyentes precalculados en cada actualización de la base de datos."""
+    __tablename__ = 'estadisticas_contribuyentes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    actualizacion_id = db.Column(db.Integer, index=True, nullable=True)  # ActualizacionDB en la que se calcularon
+    dimension = db.Column(db.String(20), nullable=False)  # 'total', 'estado', 'regimen', 'actividad' o 'categoria'
+    valor = db.Column(db.String(255), nullable=True)
+    total = db.Column(db.Integer, default=0)
+    fecha = db.Column(db.DateTime, default=datetime.now)
+    
+    def __repr__(self):
+        return f'<EstadisticaContribuyentes {self.dimension}={self.valor}: {self.total}>'
+
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
     id = db.Column(db.Integer, primary_key=True)
@@ -61,6 +83,10 @@ class Usuario(db.Model):
     activo = db.Column(db.Boolean, default=True)
     fecha_creacion = db.Column(db.DateTime, default=datetime.now)
     ultima_actividad = db.Column(db.DateTime, default=datetime.now)
+    # Cuota del límite de tasa por token; None usa el límite general (app/limites.py)
+    limite_minuto = db.Column(db.Integer, nullable=True)  # Solicitudes por minuto
+    limite_rafaga = db.Column(db.Integer, nullable=True)  # Solicitudes por segundo
+    limite_diario = db.Column(db.Integer, nullable=True)  # Solicitudes por día
     tokens = db.relationship('Token', backref='usuario', lazy='dynamic', cascade='all, delete-orphan')
 
     def __repr__(self):
@@ -75,6 +101,14 @@ class Usuario(db.Model):
     def is_admin(self):
         return self.rol == 'admin'
     
+    def cuota(self):
+        """Devuelve la cuota del límite de tasa del usuario."""
+        return {
+            'limite_minuto': self.limite_minuto,
+            'limite_rafaga': self.limite_rafaga,
+            'limite_diario': self.limite_diario
+        }
+    
     def generate_token(self, expires_in=3600*24*30):  # 30 días por defecto
         return Token.generate_token(self.id, expires_in)
 
@@ -104,7 +138,7 @@ class Token(db.Model):
         return token
     
     @staticmethod
-    def check_token(token_value):
+    def buscar_vigente(token_value):
         token = Token.query.filter_by(token=token_value).first()
         if token is None:
             return None
@@ -115,8 +149,16 @@ class Token(db.Model):
             db.session.commit()
             return None
         
-        # Actualizar último uso
-        token.ultimo_uso = datetime.now()
-        db.session.commit()
+        return token
+    
+    @staticmethod
+    def check_token(token_value):
+        token = Token.buscar_vigente(token_value)
+        if token is None:
+            return None
+        
+        # El último uso se escribe en segundo plano (app.actividad)
+        from app.actividad import registrar_uso_token
+        registrar_uso_token(token.id, token.usuario_id)
         
         return token.usuario
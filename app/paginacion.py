@@ -0,0 +1,137 @@
+"""
+Paginación por cursor (keyset) de las listas de contribuyentes.
+
+Las listas se ordenan por (nombre, id). El cursor codifica el nombre y el id del
+último contribuyente devuelto, y la página siguiente empieza justo después de él,
+con un costo que no depende de la profundidad de la página.
+"""
+import os
+import json
+import base64
+from sqlalchemy import and_, or_, func
+from app import db
+from app.models import Contribuyente
+from app.cache import cache_totales, FALTA
+
+# Modos del parámetro total de las listas
+TOTAL_EXACTO = 'exact'
+TOTAL_ESTIMADO = 'estimate'
+TOTAL_NINGUNO = 'none'
+MODOS_TOTAL = (TOTAL_EXACTO, TOTAL_ESTIMADO, TOTAL_NINGUNO)
+
+# Máximo de registros que cuenta el modo estimate antes de responder "N+"
+TOPE_ESTIMACION = int(os.getenv('TOTAL_ESTIMATE_CAP', 1000))
+
+def codificar_cursor(contribuyente):
+    """
+    Genera el cursor opaco que apunta después de un contribuyente.
+    
+    Args:
+        contribuyente (Contribuyente): Último contribuyente de la página.
+        
+    Returns:
+        str: Cursor en base64 apto para URL.
+    """
+    datos = json.dumps([contribuyente.nombre, contribuyente.id], ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor):
+    """
+    Decodifica un cursor generado por codificar_cursor.
+    
+    Returns:
+        tuple: (nombre, id) del último contribuyente de la página anterior.
+        
+    Raises:
+        ValueError: Si el cursor no es válido.
+    """
+    try:
+        datos = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        nombre, id_ = json.loads(datos.decode('utf-8'))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Cursor no válido') from e
+    
+    if not isinstance(nombre, str) or not isinstance(id_, int):
+        raise ValueError('Cursor no válido')
+    return nombre, id_
+
+def ordenar_por_nombre(query):
+    """Ordena una consulta por (nombre, id), el orden que recorren los cursores."""
+    return query.order_by(Contribuyente.nombre, Contribuyente.id)
+
+def paginar(query, limit, offset=0, cursor=None, columnas=None):
+    """
+    Obtiene una página de una consulta ordenada con ordenar_por_nombre.
+    
+    Args:
+        query (Query): Consulta sobre Contribuyente ordenada por (nombre, id).
+        limit (int): Tamaño de la página.
+        offset (int): Desplazamiento, si no se usa cursor.
+        cursor (tuple): (nombre, id) decodificado del parámetro cursor, o None.
+        columnas (list, optional): Columnas a seleccionar en lugar de instancias ORM.
+            Se devuelven filas con esas columnas, seguidas de nombre e id (que
+            necesita el cursor) si no están entre ellas.
+        
+    Returns:
+        tuple: (lista de contribuyentes, cursor de la página siguiente o None si es la última).
+    """
+    if limit <= 0:
+        # Página vacía: solo interesa el total
+        return [], None
+    
+    if columnas is not None:
+        claves = {columna.key for columna in columnas}
+        faltantes = [c for c in (Contribuyente.nombre, Contribuyente.id) if c.key not in claves]
+        query = query.with_entities(*columnas, *faltantes)
+    
+    if cursor is not None:
+        nombre, id_ = cursor
+        # nombre >= :nombre permite recorrer el índice (nombre, id) por rango
+        query = query.filter(and_(
+            Contribuyente.nombre >= nombre,
+            or_(Contribuyente.nombre > nombre, Contribuyente.id > id_)
+        ))
+    elif offset:
+        query = query.offset(offset)
+    
+    # Un registro de más indica si existe una página siguiente
+    contribuyentes = query.limit(limit + 1).all()
+    if len(contribuyentes) <= limit:
+        return contribuyentes, None
+    contribuyentes = contribuyentes[:limit]
+    return contribuyentes, codificar_cursor(contribuyentes[-1])
+
+def contar(query, modo, clave):
+    """
+    Calcula el total de una búsqueda según el modo pedido.
+    
+    Los totales exactos se guardan en la caché por clave (los filtros ya
+    normalizados: textos sin espacios en los extremos y en mayúsculas) hasta la siguiente actualización de la base de datos. El modo
+    estimate cuenta como máximo TOPE_ESTIMACION + 1 registros: si hay más, devuelve
+    el texto "N+"; si no, el conteo es exacto y también se guarda.
+    
+    Args:
+        query (Query): Consulta filtrada, sin paginar.
+        modo (str): 'exact', 'estimate' o 'none'.
+        clave (tuple): Identificador de la búsqueda y sus filtros normalizados.
+        
+    Returns:
+        int | str | None: Total, "N+" o None con el modo none.
+    """
+    if modo == TOTAL_NINGUNO:
+        return None
+    
+    total = cache_totales.obtener(clave)
+    if total is not FALTA:
+        return total
+    
+    if modo == TOTAL_ESTIMADO:
+        limitada = query.order_by(None).with_entities(Contribuyente.id).limit(TOPE_ESTIMACION + 1).subquery()
+        total = db.session.query(func.count()).select_from(limitada).scalar()
+        if total > TOPE_ESTIMACION:
+            return f"{TOPE_ESTIMACION}+"
+    else:
+        total = query.order_by(None).count()
+    
+    cache_totales.guardar(clave, total)
+    return total
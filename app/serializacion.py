@@ -0,0 +1,82 @@
+"""
+Serialización JSON de las respuestas de la API.
+
+ProveedorJSON reemplaza al proveedor JSON de Flask: usa orjson si está instalado
+(pip install orjson) y, si no, la biblioteca estándar, con el mismo resultado
+para los clientes (mismas claves, orden y formatos de fecha). JSON_PROVIDER
+permite forzar uno u otro ('orjson' o 'stdlib').
+
+filas_a_dicts convierte filas de consultas Core (select de columnas) al mismo
+diccionario que Contribuyente.to_dict(), sin crear instancias ORM.
+"""
+import os
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Proveedor JSON: 'auto' (orjson si está instalado), 'orjson' o 'stdlib'
+JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'auto').lower()
+USAR_ORJSON = orjson is not None and JSON_PROVIDER != 'stdlib'
+
+class ProveedorJSON(DefaultJSONProvider):
+    """Proveedor JSON de Flask que codifica con orjson cuando está disponible."""
+
+    def _opciones_orjson(self, indentar=False):
+        # Las fechas pasan por Flask.default para conservar su formato (fecha HTTP)
+        opciones = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opciones |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opciones |= orjson.OPT_INDENT_2
+        return opciones
+
+    def dumps(self, obj, **kwargs):
+        if not USAR_ORJSON or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._opciones_orjson()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if not USAR_ORJSON or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if not USAR_ORJSON:
+            return super().response(*args, **kwargs)
+
+        # Los bytes de orjson van directamente a la respuesta, sin pasar por str
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = (self.compact is None and self._app.debug) or self.compact is False
+        datos = orjson.dumps(obj, default=self.default, option=self._opciones_orjson(indentar) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(datos, mimetype=self.mimetype)
+
+def filas_a_dicts(filas, columnas):
+    """
+    Convierte filas de una consulta Core (select de columnas) en diccionarios
+    para la respuesta JSON, con las fechas en formato ISO como
+    Contribuyente.to_dict(), sin crear instancias ORM.
+
+    Args:
+        filas (iterable): Filas del resultado, en el orden de las columnas.
+        columnas (list): Columnas seleccionadas (Contribuyente.rnc, ...).
+
+    Returns:
+        list: Un diccionario columna -> valor por fila.
+    """
+    campos = tuple(columna.key for columna in columnas)
+    fechas = tuple(i for i, columna in enumerate(columnas) if isinstance(columna.type, (DateTime, Date)))
+    if not fechas:
+        return [dict(zip(campos, fila)) for fila in filas]
+
+    resultado = []
+    for fila in filas:
+        valores = list(fila)
+        for i in fechas:
+            if valores[i] is not None:
+                valores[i] = valores[i].isoformat()
+        resultado.append(dict(zip(campos, valores)))
+    return resultado
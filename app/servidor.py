@@ -0,0 +1,110 @@
+"""
+Ejecución de la API con varios procesos (servidores pre-fork como gunicorn).
+
+Con preload, la aplicación se importa una sola vez en el proceso maestro y los
+procesos de trabajo se crean con fork, compartiendo la memoria ya cargada (por
+ejemplo, el índice de RNC en memoria). Después del fork, cada proceso descarta
+las conexiones heredadas del maestro y vuelve a iniciar sus hilos en segundo plano.
+"""
+import os
+import signal
+from app import db
+from app.utils.logger import api_logger as logger
+
+# Archivo con el PID del proceso maestro de gunicorn. Las recargas tras una
+# actualización solo se piden si se configura WEB_PIDFILE explícitamente
+WEB_PIDFILE = os.getenv('WEB_PIDFILE')
+ARCHIVO_PID = WEB_PIDFILE or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'run', 'gunicorn.pid'
+)
+
+# Funciones a ejecutar en cada proceso de trabajo después del fork
+_tras_fork = []
+
+def en_cada_proceso(funcion):
+    """
+    Registra una función sin argumentos que se ejecutará en cada proceso creado
+    con fork (por ejemplo, para iniciar hilos, que no sobreviven al fork).
+    """
+    _tras_fork.append(funcion)
+    return funcion
+
+def preparar_prefork(app):
+    """
+    Prepara la aplicación para que se pueda importar antes del fork: en cada
+    proceso hijo se descartan las conexiones de la base de datos heredadas y se
+    ejecutan las funciones registradas con en_cada_proceso.
+
+    Args:
+        app (Flask): Aplicación Flask.
+    """
+    def tras_fork():
+        # Las conexiones abiertas en el maestro no se pueden usar desde otro
+        # proceso: se olvidan sin cerrarlas (close=False) para no afectar al maestro
+        with app.app_context():
+            db.engine.dispose(close=False)
+        for funcion in _tras_fork:
+            funcion()
+
+    os.register_at_fork(after_in_child=tras_fork)
+
+def es_maestro_gunicorn(pid):
+    """
+    Comprueba que un PID sea el proceso maestro de gunicorn, y no un proceso
+    que reutilizó el PID de un archivo antiguo: su línea de comandos debe ser
+    de gunicorn y su proceso padre no.
+
+    Args:
+        pid (int): PID leído del archivo de PID.
+
+    Returns:
+        bool: True si es el maestro de gunicorn (False si no se puede comprobar).
+    """
+    def linea_comandos(proceso):
+        with open(f'/proc/{proceso}/cmdline', 'rb') as archivo:
+            return archivo.read().replace(b'\0', b' ')
+
+    try:
+        if b'gunicorn' not in linea_comandos(pid):
+            return False
+        with open(f'/proc/{pid}/stat') as archivo:
+            # El nombre del proceso va entre paréntesis y puede contener espacios
+            padre = int(archivo.read().rsplit(')', 1)[1].split()[1])
+        return padre <= 1 or b'gunicorn' not in linea_comandos(padre)
+    except (OSError, ValueError, IndexError):
+        return False
+
+def solicitar_recarga():
+    """
+    Pide al proceso maestro de gunicorn una recarga ordenada (SIGHUP): los
+    procesos de trabajo terminan las solicitudes en curso y se reemplazan por
+    otros nuevos, que parten de los datos recargados en el maestro.
+
+    Solo se envía la señal si WEB_PIDFILE está configurado y el PID del archivo
+    es el maestro de gunicorn; SIGHUP terminaría cualquier otro proceso.
+
+    Returns:
+        bool: True si se envió la señal, False en otro caso.
+    """
+    if not WEB_PIDFILE:
+        return False
+
+    try:
+        with open(WEB_PIDFILE) as archivo:
+            pid = int(archivo.read().strip())
+    except (OSError, ValueError):
+        logger.warning("No se pudo leer el PID de gunicorn de %s; no se pide la recarga", WEB_PIDFILE)
+        return False
+
+    if not es_maestro_gunicorn(pid):
+        logger.warning("El proceso %s de %s no es el maestro de gunicorn; no se pide la recarga", pid, WEB_PIDFILE)
+        return False
+
+    try:
+        os.kill(pid, signal.SIGHUP)
+    except OSError as e:
+        logger.warning("No se pudo pedir la recarga al proceso maestro %s: %s", pid, e)
+        return False
+
+    logger.info("Recarga ordenada solicitada al proceso maestro %s", pid)
+    return True
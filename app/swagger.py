@@ -100,6 +100,22 @@ def get_swagger_json():
                     "summary": "Listar contribuyentes",
                     "description": "Devuelve una lista paginada de contribuyentes",
                     "parameters": [
+                        {
+                            "name": "nombre",
+                            "in": "query",
+                            "description": "Texto a buscar en el nombre o nombre comercial (mínimo 3 caracteres)",
+                            "required": True,
+                            "type": "string"
+                        },
+                        {
+                            "name": "orden",
+                            "in": "query",
+                            "description": "Orden de los resultados: nombre o relevancia (índice de texto completo)",
+                            "required": False,
+                            "type": "string",
+                            "enum": ["nombre", "relevancia"],
+                            "default": "nombre"
+                        },
                         {
                             "name": "page",
                             "in": "query",
@@ -115,6 +131,29 @@ def get_swagger_json():
                             "required": False,
                             "type": "integer",
                             "default": 20
+                        },
+                        {
+                            "name": "cursor",
+                            "in": "query",
+                            "description": "Cursor opaco de la página siguiente (next_cursor de la respuesta anterior); reemplaza a offset",
+                            "required": False,
+                            "type": "string"
+                        },
+                        {
+                            "name": "total",
+                            "in": "query",
+                            "description": "Cálculo del total: exact (por defecto), estimate (cuenta hasta un tope y responde \"1000+\") o none",
+                            "required": False,
+                            "type": "string",
+                            "enum": ["exact", "estimate", "none"],
+                            "default": "exact"
+                        },
+                        {
+                            "name": "fields",
+                            "in": "query",
+                            "description": "Campos de cada contribuyente separados por comas (por ejemplo, rnc,nombre,estado); todos por defecto",
+                            "required": False,
+                            "type": "string"
                         }
                     ],
                     "responses": {
@@ -140,6 +179,7 @@ def get_swagger_json():
                                         }
                                     },
                                     "total": {"type": "integer"},
+                                    "next_cursor": {"type": "string", "description": "Cursor de la página siguiente (null en la última página)"},
                                     "page": {"type": "integer"},
                                     "per_page": {"type": "integer"},
                                     "total_pages": {"type": "integer"}
@@ -177,6 +217,29 @@ def get_swagger_json():
                             "required": False,
                             "type": "integer",
                             "default": 20
+                        },
+                        {
+                            "name": "cursor",
+                            "in": "query",
+                            "description": "Cursor opaco de la página siguiente (next_cursor de la respuesta anterior); reemplaza a offset",
+                            "required": False,
+                            "type": "string"
+                        },
+                        {
+                            "name": "total",
+                            "in": "query",
+                            "description": "Cálculo del total: exact (por defecto), estimate (cuenta hasta un tope y responde \"1000+\") o none",
+                            "required": False,
+                            "type": "string",
+                            "enum": ["exact", "estimate", "none"],
+                            "default": "exact"
+                        },
+                        {
+                            "name": "fields",
+                            "in": "query",
+                            "description": "Campos de cada contribuyente separados por comas (por ejemplo, rnc,nombre,estado); todos por defecto",
+                            "required": False,
+                            "type": "string"
                         }
                     ],
                     "responses": {
@@ -190,6 +253,7 @@ def get_swagger_json():
                                         "items": {"type": "object"}
                                     },
                                     "total": {"type": "integer"},
+                                    "next_cursor": {"type": "string", "description": "Cursor de la página siguiente (null en la última página)"},
                                     "page": {"type": "integer"},
                                     "per_page": {"type": "integer"},
                                     "total_pages": {"type": "integer"}
@@ -235,7 +299,9 @@ def get_swagger_json():
                                     "total_contribuyentes": {"type": "integer"},
                                     "por_estado": {"type": "object"},
                                     "por_categoria": {"type": "object"},
-                                    "ultima_actualizacion": {"type": "string", "format": "date-time"}
+                                    "ultima_actualizacion": {"type": "string", "format": "date-time"},
+                                    "snapshot": {"type": "integer", "description": "Id de la actualización en la que se calcularon las estadísticas"},
+                                    "fecha_calculo": {"type": "string", "format": "date-time"}
                                 }
                             }
                         }
@@ -246,7 +312,7 @@ def get_swagger_json():
                 "get": {
                     "tags": ["Contribuyentes"],
                     "summary": "Validar RNC",
-                    "description": "Valida si un RNC es válido y existe en la base de datos",
+                    "description": "Valida el formato y el dígito verificador de un RNC y si existe en la base de datos",
                     "parameters": [
                         {
                             "name": "rnc",
@@ -272,6 +338,62 @@ def get_swagger_json():
                     }
                 }
             },
+            "/validar/lote": {
+                "post": {
+                    "tags": ["Contribuyentes"],
+                    "summary": "Validar un lote de RNC",
+                    "description": "Valida varios RNC en una sola solicitud (máximo BATCH_MAX_RNC, 5000 por defecto). Acepta un arreglo JSON, un objeto {\"rncs\": [...]} o texto plano con un RNC por línea",
+                    "consumes": ["application/json", "text/plain"],
+                    "parameters": [
+                        {
+                            "name": "rncs",
+                            "in": "body",
+                            "description": "Lista de RNC a validar",
+                            "required": True,
+                            "schema": {
+                                "type": "array",
+                                "items": {"type": "string"}
+                            }
+                        }
+                    ],
+                    "responses": {
+                        "200": {
+                            "description": "Resultado de la validación de cada RNC, en el mismo orden recibido",
+                            "schema": {
+                                "type": "object",
+                                "properties": {
+                                    "resultados": {
+                                        "type": "array",
+                                        "items": {
+                                            "type": "object",
+                                            "properties": {
+                                                "rnc": {"type": "string"},
+                                                "valido": {"type": "boolean"},
+                                                "registrado": {"type": "boolean"},
+                                                "mensaje": {"type": "string"},
+                                                "error": {"type": "string"},
+                                                "contribuyente": {"$ref": "#/definitions/Contribuyente"},
+                                                "status": {"type": "string"}
+                                            }
+                                        }
+                                    },
+                                    "total": {"type": "integer"},
+                                    "registrados": {"type": "integer"},
+                                    "no_registrados": {"type": "integer"},
+                                    "invalidos": {"type": "integer"},
+                                    "status": {"type": "string"}
+                                }
+                            }
+                        },
+                        "400": {
+                            "description": "Cuerpo de la solicitud no válido"
+                        },
+                        "413": {
+                            "description": "El lote supera el máximo de RNC permitidos"
+                        }
+                    }
+                }
+            },
             "/busqueda-avanzada": {
                 "get": {
                     "tags": ["Contribuyentes"],
@@ -285,6 +407,15 @@ def get_swagger_json():
                             "required": False,
                             "type": "string"
                         },
+                        {
+                            "name": "orden",
+                            "in": "query",
+                            "description": "Orden de los resultados: nombre o relevancia (índice de texto completo)",
+                            "required": False,
+                            "type": "string",
+                            "enum": ["nombre", "relevancia"],
+                            "default": "nombre"
+                        },
                         {
                             "name": "actividad",
                             "in": "query",
@@ -321,6 +452,29 @@ def get_swagger_json():
                             "required": False,
                             "type": "integer",
                             "default": 20
+                        },
+                        {
+                            "name": "cursor",
+                            "in": "query",
+                            "description": "Cursor opaco de la página siguiente (next_cursor de la respuesta anterior); reemplaza a offset",
+                            "required": False,
+                            "type": "string"
+                        },
+                        {
+                            "name": "total",
+                            "in": "query",
+                            "description": "Cálculo del total: exact (por defecto), estimate (cuenta hasta un tope y responde \"1000+\") o none",
+                            "required": False,
+                            "type": "string",
+                            "enum": ["exact", "estimate", "none"],
+                            "default": "exact"
+                        },
+                        {
+                            "name": "fields",
+                            "in": "query",
+                            "description": "Campos de cada contribuyente separados por comas (por ejemplo, rnc,nombre,estado); todos por defecto",
+                            "required": False,
+                            "type": "string"
                         }
                     ],
                     "responses": {
@@ -334,6 +488,7 @@ def get_swagger_json():
                                         "items": {"type": "object"}
                                     },
                                     "total": {"type": "integer"},
+                                    "next_cursor": {"type": "string", "description": "Cursor de la página siguiente (null en la última página)"},
                                     "page": {"type": "integer"},
                                     "per_page": {"type": "integer"},
                                     "total_pages": {"type": "integer"}
@@ -359,7 +514,10 @@ def get_swagger_json():
                                     "ultima_actualizacion": {"type": "string", "format": "date-time"},
                                     "registros_procesados": {"type": "integer"},
                                     "registros_nuevos": {"type": "integer"},
-                                    "registros_actualizados": {"type": "integer"}
+                                    "registros_actualizados": {"type": "integer"},
+                                    "registros_sin_cambios": {"type": "integer"},
+                                    "total_contribuyentes": {"type": "integer"},
+                                    "snapshot": {"type": "integer", "description": "Id de la actualización a la que corresponde total_contribuyentes"}
                                 }
                             }
                         }
@@ -387,7 +545,8 @@ def get_swagger_json():
                                         "rol": {"type": "string"},
                                         "activo": {"type": "boolean"},
                                         "fecha_creacion": {"type": "string", "format": "date-time"},
-                                        "ultima_actividad": {"type": "string", "format": "date-time"}
+                                        "ultima_actividad": {"type": "string", "format": "date-time"},
+                                        "cuota": {"$ref": "#/definitions/Cuota"}
                                     }
                                 }
                             }
@@ -419,7 +578,10 @@ def get_swagger_json():
                                     "username": {"type": "string"},
                                     "password": {"type": "string"},
                                     "rol": {"type": "string", "enum": ["admin", "usuario"]},
-                                    "activo": {"type": "boolean"}
+                                    "activo": {"type": "boolean"},
+                                    "limite_minuto": {"type": "integer", "description": "Solicitudes por minuto con sus tokens (null usa el límite general)"},
+                                    "limite_rafaga": {"type": "integer", "description": "Solicitudes por segundo con sus tokens (null sin límite de ráfaga)"},
+                                    "limite_diario": {"type": "integer", "description": "Solicitudes por día con sus tokens (null sin límite diario)"}
                                 }
                             }
                         }
@@ -481,6 +643,7 @@ def get_swagger_json():
                                     "activo": {"type": "boolean"},
                                     "fecha_creacion": {"type": "string", "format": "date-time"},
                                     "ultima_actividad": {"type": "string", "format": "date-time"},
+                                    "cuota": {"$ref": "#/definitions/Cuota"},
                                     "tokens_activos": {
                                         "type": "array",
                                         "items": {
@@ -533,7 +696,10 @@ def get_swagger_json():
                                     "username": {"type": "string"},
                                     "password": {"type": "string"},
                                     "rol": {"type": "string", "enum": ["admin", "usuario"]},
-                                    "activo": {"type": "boolean"}
+                                    "activo": {"type": "boolean"},
+                                    "limite_minuto": {"type": "integer", "description": "Solicitudes por minuto con sus tokens (null usa el límite general)"},
+                                    "limite_rafaga": {"type": "integer", "description": "Solicitudes por segundo con sus tokens (null sin límite de ráfaga)"},
+                                    "limite_diario": {"type": "integer", "description": "Solicitudes por día con sus tokens (null sin límite diario)"}
                                 }
                             }
                         }
@@ -723,6 +889,7 @@ def get_swagger_json():
                                     "rol": {"type": "string"},
                                     "fecha_creacion": {"type": "string", "format": "date-time"},
                                     "ultima_actividad": {"type": "string", "format": "date-time"},
+                                    "cuota": {"$ref": "#/definitions/Cuota"},
                                     "tokens_activos": {
                                         "type": "array",
                                         "items": {
@@ -820,6 +987,15 @@ def get_swagger_json():
                     "actividad_economica": {"type": "string"},
                     "fecha_actualizacion": {"type": "string", "format": "date-time"}
                 }
+            },
+            "Cuota": {
+                "type": "object",
+                "description": "Límite de tasa del usuario con sus tokens (null usa el valor general)",
+                "properties": {
+                    "limite_minuto": {"type": "integer"},
+                    "limite_rafaga": {"type": "integer"},
+                    "limite_diario": {"type": "integer"}
+                }
             }
         }
     }
@@ -846,6 +1022,7 @@ def get_swagger_json():
                                 "registros_procesados": {"type": "integer"},
                                 "registros_nuevos": {"type": "integer"},
                                 "registros_actualizados": {"type": "integer"},
+                                "registros_sin_cambios": {"type": "integer"},
                                 "fecha_actualizacion": {"type": "string", "format": "date-time"}
                             }
                         }
@@ -905,9 +1082,18 @@ def get_swagger_json():
                                         "fecha": {"type": "string", "format": "date-time"},
                                         "registros_procesados": {"type": "integer"},
                                         "registros_nuevos": {"type": "integer"},
-                                        "registros_actualizados": {"type": "integer"}
+                                        "registros_actualizados": {"type": "integer"},
+                                        "registros_sin_cambios": {"type": "integer"}
                                     }
                                 },
+                                "cache": {
+                                    "type": "object",
+                                    "description": "Contadores por caché: entradas, aciertos, fallos, desalojos y expirados"
+                                },
+                                "indice_memoria": {
+                                    "type": "object",
+                                    "description": "Registros y tamaño en bytes del índice de RNC en memoria (null si MEMORY_INDEX no está activo)"
+                                },
                                 "configuracion": {
                                     "type": "object",
                                     "properties": {
@@ -946,7 +1132,7 @@ def get_swagger_json():
             "post": {
                 "tags": ["Administración"],
                 "summary": "Limpiar caché",
-                "description": "Limpia el caché de la aplicación",
+                "description": "Limpia las cachés en memoria de la aplicación",
                 "security": [
                     {"BasicAuth": []}
                 ],
@@ -958,6 +1144,7 @@ def get_swagger_json():
                             "properties": {
                                 "estado": {"type": "string"},
                                 "mensaje": {"type": "string"},
+                                "entradas_eliminadas": {"type": "object", "description": "Entradas eliminadas por caché"},
                                 "fecha": {"type": "string", "format": "date-time"}
                             }
                         }
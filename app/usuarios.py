@@ -5,7 +5,7 @@ Proporciona endpoints para administrar usuarios y tokens.
 import logging
 from flask import Blueprint, jsonify, request, g
 from app.models import db, Usuario, Token
-from app.auth import basic_auth, admin_required
+from app.auth import basic_auth, admin_required, invalidar_token, invalidar_usuario
 from datetime import datetime, timedelta
 
 # Configurar logger
@@ -14,6 +14,23 @@ logger = logging.getLogger('api.usuarios')
 # Crear blueprint para endpoints de usuarios
 usuarios_bp = Blueprint('usuarios', __name__)
 
+def leer_cuota(datos):
+    """
+    Lee de la solicitud los campos de la cuota del límite de tasa presentes.
+    
+    Returns:
+        tuple: (dict con los campos a asignar, mensaje de error o None)
+    """
+    cuota = {}
+    for campo in ('limite_minuto', 'limite_rafaga', 'limite_diario'):
+        if campo not in datos:
+            continue
+        valor = datos[campo]
+        if valor is not None and (isinstance(valor, bool) or not isinstance(valor, int) or valor <= 0):
+            return None, f'{campo} debe ser un entero positivo o null'
+        cuota[campo] = valor
+    return cuota, None
+
 @usuarios_bp.route('', methods=['GET'])
 @basic_auth.login_required
 @admin_required
@@ -30,7 +47,8 @@ def listar_usuarios():
                 'rol': usuario.rol,
                 'activo': usuario.activo,
                 'fecha_creacion': usuario.fecha_creacion.isoformat(),
-                'ultima_actividad': usuario.ultima_actividad.isoformat() if usuario.ultima_actividad else None
+                'ultima_actividad': usuario.ultima_actividad.isoformat() if usuario.ultima_actividad else None,
+                'cuota': usuario.cuota()
             })
         
         logger.info(f"Listado de usuarios solicitado por: {g.current_user.username if hasattr(g.current_user, 'username') else g.current_user}")
@@ -74,6 +92,7 @@ def obtener_usuario(usuario_id):
             'activo': usuario.activo,
             'fecha_creacion': usuario.fecha_creacion.isoformat(),
             'ultima_actividad': usuario.ultima_actividad.isoformat() if usuario.ultima_actividad else None,
+            'cuota': usuario.cuota(),
             'tokens_activos': tokens
         }
         
@@ -103,11 +122,16 @@ def crear_usuario():
         if Usuario.query.filter_by(username=datos['username']).first():
             return jsonify({'error': 'El nombre de usuario ya existe'}), 409
         
+        cuota, error = leer_cuota(datos)
+        if error:
+            return jsonify({'error': error}), 400
+        
         # Crear nuevo usuario
         nuevo_usuario = Usuario(
             username=datos['username'],
             rol=datos.get('rol', 'usuario'),
-            activo=datos.get('activo', True)
+            activo=datos.get('activo', True),
+            **cuota
         )
         nuevo_usuario.set_password(datos['password'])
         
@@ -119,7 +143,8 @@ def crear_usuario():
             'mensaje': 'Usuario creado correctamente',
             'id': nuevo_usuario.id,
             'username': nuevo_usuario.username,
-            'rol': nuevo_usuario.rol
+            'rol': nuevo_usuario.rol,
+            'cuota': nuevo_usuario.cuota()
         }), 201
     
     except Exception as e:
@@ -143,6 +168,10 @@ def actualizar_usuario(usuario_id):
         
         datos = request.get_json()
         
+        cuota, error = leer_cuota(datos)
+        if error:
+            return jsonify({'error': error}), 400
+        
         # Actualizar campos si están presentes en la solicitud
         if 'username' in datos and datos['username'] != usuario.username:
             # Verificar si el nuevo username ya existe
@@ -159,15 +188,23 @@ def actualizar_usuario(usuario_id):
         if 'activo' in datos:
             usuario.activo = datos['activo']
         
+        for campo, valor in cuota.items():
+            setattr(usuario, campo, valor)
+        
         db.session.commit()
         
+        # Los tokens y credenciales en caché guardan los datos anteriores del usuario
+        # (incluida la cuota que usa el límite de tasa)
+        invalidar_usuario(usuario.id)
+        
         logger.info(f"Usuario {usuario.username} actualizado por: {g.current_user.username if hasattr(g.current_user, 'username') else g.current_user}")
         return jsonify({
             'mensaje': 'Usuario actualizado correctamente',
             'id': usuario.id,
             'username': usuario.username,
             'rol': usuario.rol,
-            'activo': usuario.activo
+            'activo': usuario.activo,
+            'cuota': usuario.cuota()
         }), 200
     
     except Exception as e:
@@ -199,6 +236,7 @@ def eliminar_usuario(usuario_id):
         # Eliminar el usuario (esto también eliminará sus tokens debido a la relación cascade)
         db.session.delete(usuario)
         db.session.commit()
+        invalidar_usuario(usuario_id)
         
         logger.info(f"Usuario {username} eliminado por: {g.current_user.username if hasattr(g.current_user, 'username') else g.current_user}")
         return jsonify({
@@ -263,8 +301,10 @@ def revocar_token(usuario_id, token_id):
         if not token:
             return jsonify({'error': 'Token no encontrado'}), 404
         
+        valor = token.token
         db.session.delete(token)
         db.session.commit()
+        invalidar_token(valor)
         
         logger.info(f"Token revocado para el usuario {usuario.username} por: {g.current_user.username if hasattr(g.current_user, 'username') else g.current_user}")
         return jsonify({
@@ -307,6 +347,7 @@ def obtener_perfil():
                 'rol': usuario.rol,
                 'fecha_creacion': usuario.fecha_creacion.isoformat(),
                 'ultima_actividad': usuario.ultima_actividad.isoformat() if usuario.ultima_actividad else None,
+                'cuota': usuario.cuota(),
                 'tokens_activos': tokens
             }
             
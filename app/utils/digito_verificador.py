@@ -0,0 +1,107 @@
+"""
+Validación de los dígitos verificadores de RNC y cédulas.
+
+- RNC (9 dígitos): módulo 11 con los pesos 7, 9, 8, 6, 5, 4, 3, 2 sobre los
+  8 primeros dígitos.
+- Cédula (11 dígitos): algoritmo de Luhn sobre los 11 dígitos.
+
+validar_digito valida un solo número; validar_digitos valida un arreglo completo
+con operaciones vectorizadas de NumPy.
+"""
+import numpy as np
+
+PESOS_RNC = np.array([7, 9, 8, 6, 5, 4, 3, 2], dtype=np.int32)
+
+# Posiciones de la cédula que se duplican en Luhn (una sí y otra no desde la
+# penúltima) y las que se suman tal cual (incluido el dígito verificador)
+POSICIONES_DOBLES = [1, 3, 5, 7, 9]
+POSICIONES_SIMPLES = [0, 2, 4, 6, 8, 10]
+
+# Ancho con el que se convierten los números a bytes: uno más que la cédula para
+# que los valores más largos no se confundan con una cédula al truncarse
+ANCHO = 12
+
+def digito_verificador_rnc(base):
+    """
+    Calcula el dígito verificador de un RNC.
+
+    Args:
+        base (str): Los 8 primeros dígitos del RNC.
+
+    Returns:
+        int: Dígito verificador.
+    """
+    suma = sum(peso * int(digito) for peso, digito in zip(PESOS_RNC.tolist(), base))
+    return (10 - suma % 11) % 9 + 1
+
+def digito_verificador_cedula(base):
+    """
+    Calcula el dígito verificador (Luhn) de una cédula.
+
+    Args:
+        base (str): Los 10 primeros dígitos de la cédula.
+
+    Returns:
+        int: Dígito verificador.
+    """
+    suma = 0
+    for posicion, digito in enumerate(base):
+        valor = int(digito)
+        if posicion % 2 == 1:
+            valor = valor * 2 - 9 if valor > 4 else valor * 2
+        suma += valor
+    return (10 - suma % 10) % 10
+
+def validar_digito(rnc):
+    """
+    Valida el dígito verificador de un RNC o cédula.
+
+    Args:
+        rnc (str): RNC sin guiones ni espacios.
+
+    Returns:
+        bool: True si tiene 9 u 11 dígitos y el dígito verificador es correcto.
+    """
+    if not (rnc.isascii() and rnc.isdigit()):
+        return False
+    if len(rnc) == 9:
+        return int(rnc[8]) == digito_verificador_rnc(rnc[:8])
+    if len(rnc) == 11:
+        return int(rnc[10]) == digito_verificador_cedula(rnc[:10])
+    return False
+
+def validar_digitos(rncs):
+    """
+    Valida los dígitos verificadores de muchos RNC y cédulas a la vez.
+
+    Args:
+        rncs (sequence): RNC sin guiones ni espacios (lista, arreglo de NumPy o Series).
+
+    Returns:
+        ndarray: Arreglo booleano con el resultado de validar_digito para cada valor.
+    """
+    try:
+        # Cada número ocupa ANCHO bytes; los más cortos se rellenan con ceros
+        texto = np.asarray(rncs, dtype=f'S{ANCHO}')
+    except UnicodeEncodeError:
+        # Con caracteres no ASCII no hay forma de tener un número válido
+        return np.fromiter((isinstance(r, str) and validar_digito(r) for r in rncs), dtype=bool, count=len(rncs))
+
+    bytes_ = texto.view(np.uint8).reshape(-1, ANCHO)
+    longitudes = np.count_nonzero(bytes_, axis=1)
+    digitos = bytes_.astype(np.int32) - ord('0')
+    es_digito = (digitos >= 0) & (digitos <= 9)
+
+    # RNC: módulo 11
+    es_rnc = (longitudes == 9) & es_digito[:, :9].all(axis=1)
+    suma = digitos[:, :8] @ PESOS_RNC
+    rnc_valido = es_rnc & ((10 - suma % 11) % 9 + 1 == digitos[:, 8])
+
+    # Cédula: Luhn
+    es_cedula = (longitudes == 11) & es_digito[:, :11].all(axis=1)
+    dobles = digitos[:, POSICIONES_DOBLES] * 2
+    dobles = np.where(dobles > 9, dobles - 9, dobles)
+    suma = digitos[:, POSICIONES_SIMPLES].sum(axis=1) + dobles.sum(axis=1)
+    cedula_valida = es_cedula & (suma % 10 == 0)
+
+    return rnc_valido | cedula_valida
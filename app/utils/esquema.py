@@ -0,0 +1,80 @@
+"""
+Módulo para mantener el esquema de la base de datos al día con los modelos.
+"""
+from sqlalchemy import inspect, text
+from app.utils.logger import db_logger as logger
+
+def actualizar_esquema(db):
+    """
+    Crea las tablas, columnas e índices que falten en la base de datos.
+    
+    db.create_all() solo crea las tablas nuevas; las columnas e índices
+    agregados a modelos existentes se crean aquí con ALTER TABLE / CREATE INDEX.
+    También se crea el índice de texto completo de nombres si falta.
+    
+    Args:
+        db (SQLAlchemy): Instancia de la base de datos (requiere contexto de aplicación).
+    """
+    db.create_all()
+    
+    engine = db.engine
+    inspector = inspect(engine)
+    indices_creados = False
+    
+    with engine.begin() as conn:
+        for tabla in db.metadata.sorted_tables:
+            columnas_existentes = {c['name'] for c in inspector.get_columns(tabla.name)}
+            
+            for columna in tabla.columns:
+                if columna.name in columnas_existentes:
+                    continue
+                
+                if not columna.nullable:
+                    logger.warning(f"No se puede agregar la columna obligatoria {tabla.name}.{columna.name} a una tabla existente")
+                    continue
+                
+                tipo = columna.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {tabla.name} ADD COLUMN {columna.name} {tipo}"))
+                logger.info(f"Columna {tabla.name}.{columna.name} agregada")
+            
+            # Un índice equivalente con otro nombre (por ejemplo, tras una recarga
+            # con tabla sombra) también cuenta como existente
+            indices_existentes = inspector.get_indexes(tabla.name)
+            for indice in tabla.indexes:
+                columnas = [columna.name for columna in indice.columns]
+                if any(
+                    existente['name'] == indice.name or
+                    (existente['column_names'] == columnas and bool(existente['unique']) == bool(indice.unique))
+                    for existente in indices_existentes
+                ):
+                    continue
+                
+                indice.create(conn)
+                indices_creados = True
+                logger.info(f"Índice {indice.name} creado")
+    
+    # Importación local: app.busqueda_texto depende de los modelos
+    from app.busqueda_texto import preparar_indice_texto
+    preparar_indice_texto(engine)
+    
+    if indices_creados:
+        actualizar_estadisticas(db)
+
+def actualizar_estadisticas(db):
+    """
+    Actualiza las estadísticas que usa el planificador de consultas (ANALYZE).
+    
+    Sin estadísticas, SQLite supone que cualquier índice es muy selectivo y puede
+    preferir, por ejemplo, el índice de estado antes que el de texto completo.
+    
+    Args:
+        db (SQLAlchemy): Instancia de la base de datos (requiere contexto de aplicación).
+    """
+    engine = db.engine
+    with engine.begin() as conn:
+        if engine.dialect.name == 'sqlite':
+            conn.execute(text("ANALYZE"))
+        else:
+            for tabla in db.metadata.sorted_tables:
+                conn.execute(text(f"ANALYZE TABLE {tabla.name}"))
+    logger.info("Estadísticas de la base de datos actualizadas")
@@ -1,15 +1,29 @@
 """
 Módulo para la configuración centralizada de logs.
+
+Con LOG_ASYNC=true cada logger solo pone los registros en una cola (QueueHandler)
+y un hilo por logger (QueueListener) los escribe en la consola y en el archivo, de
+modo que la solicitud no espera por la escritura. Conviene cuando la salida puede
+bloquear (disco lento o en red, tubería sin leer); con escrituras rápidas el paso
+por la cola cuesta más de lo que ahorra (scripts/benchmarks/benchmark_logs.py).
+Por defecto se escribe directamente desde el hilo que registra el mensaje.
 """
 import os
-import logging
-from logging.handlers import RotatingFileHandler
 import sys
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
 # Asegurarse de que el directorio de logs exista
-LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'logs')
+LOG_DIR = os.getenv('LOG_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'logs'))
 os.makedirs(LOG_DIR, exist_ok=True)
 
+# Escritura de los logs en segundo plano y nivel de los loggers predefinidos
+LOG_ASYNC = os.getenv('LOG_ASYNC', 'false').lower() == 'true'
+LOG_LEVEL = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+
 # Configuración de formatos
 CONSOLE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 FILE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
@@ -17,7 +31,41 @@ FILE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d
 # Configurar el nivel de log global
 logging.basicConfig(level=logging.INFO)
 
-def setup_logger(name, log_file=None, level=logging.INFO):
+# Oyentes de las colas de cada logger: nombre -> (QueueHandler, QueueListener)
+_colas = {}
+_lock_colas = threading.Lock()
+
+def _iniciar_oyente(manejador_cola, handlers):
+    """Crea una cola nueva para el QueueHandler y arranca el hilo que la vacía."""
+    cola = queue.SimpleQueue()
+    manejador_cola.queue = cola
+    oyente = QueueListener(cola, *handlers, respect_handler_level=True)
+    oyente.start()
+    return oyente
+
+def detener_colas():
+    """Escribe los registros pendientes y detiene los hilos de las colas."""
+    with _lock_colas:
+        for _, oyente in _colas.values():
+            oyente.stop()
+        _colas.clear()
+
+def _reiniciar_colas():
+    """
+    Tras un fork (gunicorn con preload) el proceso hijo no tiene los hilos de las
+    colas: se crea una cola y un hilo nuevos por logger. Los registros pendientes
+    en la cola heredada los escribe el proceso padre.
+    """
+    global _lock_colas
+    _lock_colas = threading.Lock()
+    for nombre, (manejador_cola, oyente) in list(_colas.items()):
+        _colas[nombre] = (manejador_cola, _iniciar_oyente(manejador_cola, oyente.handlers))
+
+atexit.register(detener_colas)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reiniciar_colas)
+
+def setup_logger(name, log_file=None, level=LOG_LEVEL, asincrono=LOG_ASYNC, formato=None):
     """
     Configura y devuelve un logger con el nombre especificado.
     
@@ -25,7 +73,11 @@ def setup_logger(name, log_file=None, level=logging.INFO):
         name (str): Nombre del logger.
         log_file (str, optional): Archivo donde se guardarán los logs. 
                                  Si es None, solo se usará la consola.
-        level (int, optional): Nivel de log. Por defecto, INFO.
+        level (int, optional): Nivel de log. Por defecto, LOG_LEVEL (INFO).
+        asincrono (bool, optional): Escribir los logs desde un hilo en segundo
+                                    plano. Por defecto, LOG_ASYNC.
+        formato (str, optional): Formato para la consola y el archivo en lugar
+                                 de CONSOLE_FORMAT y FILE_FORMAT.
         
     Returns:
         logging.Logger: Logger configurado.
@@ -37,17 +89,21 @@ def setup_logger(name, log_file=None, level=logging.INFO):
     if logger.handlers:
         for handler in logger.handlers[:]:
             logger.removeHandler(handler)
+    with _lock_colas:
+        if name in _colas:
+            _colas.pop(name)[1].stop()
     
     # Crear formatter
-    console_formatter = logging.Formatter(CONSOLE_FORMAT)
-    file_formatter = logging.Formatter(FILE_FORMAT)
+    console_formatter = logging.Formatter(formato or CONSOLE_FORMAT)
+    file_formatter = logging.Formatter(formato or FILE_FORMAT)
     
     # Configurar handler para consola
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # Configurar handler para archivo si se especifica
+    file_handler = None
     if log_file:
         file_path = os.path.join(LOG_DIR, log_file)
         try:
@@ -58,10 +114,9 @@ def setup_logger(name, log_file=None, level=logging.INFO):
                 delay=False
             )
             file_handler.setFormatter(file_formatter)
-            logger.addHandler(file_handler)
-            # Escribir un mensaje de prueba para verificar que el archivo se puede escribir
-            logger.info(f"Logger {name} inicializado correctamente. Escribiendo en {file_path}")
+            handlers.append(file_handler)
         except Exception as e:
+            # Sin handlers todavía, los errores de configuración llegan a la consola por el logger raíz
             logger.error(f"Error al configurar el archivo de log {file_path}: {e}")
             # Intentar crear el archivo manualmente
             try:
@@ -71,6 +126,23 @@ def setup_logger(name, log_file=None, level=logging.INFO):
             except Exception as e:
                 logger.error(f"No se pudo crear el archivo de log {file_path} manualmente: {e}")
     
+    if asincrono:
+        # La solicitud solo encola el registro; la consola y el archivo los escribe el hilo.
+        # Sin propagar al logger raíz, que volvería a escribir en la consola de forma síncrona.
+        manejador_cola = QueueHandler(queue.SimpleQueue())
+        with _lock_colas:
+            _colas[name] = (manejador_cola, _iniciar_oyente(manejador_cola, handlers))
+        logger.addHandler(manejador_cola)
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
+    logger.propagate = not asincrono
+    
+    if file_handler and not formato:
+        # Escribir un mensaje de prueba para verificar que el archivo se puede escribir
+        # (no en los logs con formato propio, como el de acceso en JSON)
+        logger.info("Logger %s inicializado correctamente. Escribiendo en %s", name, file_path)
+    
     return logger
 
 # Loggers predefinidos para diferentes componentes
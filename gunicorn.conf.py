@@ -0,0 +1,59 @@
+"""
+Configuración de gunicorn para ejecutar la API DGII en producción.
+
+Uso:
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Variables de entorno:
+    WEB_WORKERS            Procesos de trabajo (2 x núcleos + 1 por defecto)
+    WEB_THREADS            Hilos por proceso (4 por defecto)
+    WEB_PRELOAD            Importar la aplicación en el maestro antes del fork (true por defecto)
+    WEB_TIMEOUT            Segundos máximos por solicitud antes de reiniciar el proceso (60)
+    WEB_GRACEFUL_TIMEOUT   Segundos para terminar las solicitudes en curso al recargar (30)
+    WEB_PIDFILE            Archivo con el PID del maestro (run/gunicorn.pid por defecto);
+                           si se configura, scripts/update_db.py pide recargas al maestro
+    RATELIMIT_STORAGE_URI  Almacenamiento del límite de tasa; por defecto un archivo
+                           SQLite compartido por todos los procesos
+"""
+import os
+import sys
+import tempfile
+import multiprocessing
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+load_dotenv()
+
+from app.servidor import ARCHIVO_PID
+
+# Con memory:// cada proceso tendría sus propios contadores y el límite se multiplicaría
+os.environ.setdefault('RATELIMIT_STORAGE_URI', f"sqlite:///{os.path.join(tempfile.gettempdir(), 'dgii_limites.db')}")
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', 5001)}"
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('WEB_THREADS', 4))
+worker_class = 'gthread'
+preload_app = os.getenv('WEB_PRELOAD', 'true').lower() == 'true'
+timeout = int(os.getenv('WEB_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+os.makedirs(os.path.dirname(ARCHIVO_PID), exist_ok=True)
+pidfile = ARCHIVO_PID
+errorlog = '-'
+
+def on_reload(server):
+    """
+    Recarga ordenada (SIGHUP, enviada por scripts/update_db.py al terminar una
+    actualización): antes de crear los nuevos procesos se vuelve a cargar en el
+    maestro el índice de RNC en memoria, para que todos lo compartan tras el fork.
+    """
+    if not server.cfg.preload_app or os.getenv('MEMORY_INDEX', 'false').lower() != 'true':
+        return
+
+    from app.indice_memoria import cargar_indice
+    aplicacion = server.app.wsgi()
+    try:
+        with aplicacion.app_context():
+            cargar_indice()
+    except Exception as e:
+        server.log.error(f"No se pudo recargar el índice de RNC en memoria: {e}")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la validación de dígitos verificadores: validar_digito número a
+número frente a validar_digitos sobre el arreglo completo.
+
+Uso:
+    python scripts/benchmarks/benchmark_digito_verificador.py --numeros 1000000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+import numpy as np
+from app.utils.digito_verificador import validar_digito, validar_digitos
+from scripts.benchmarks.sinteticos import generar_rnc
+
+def generar_numeros(cantidad, semilla=7):
+    """
+    Genera RNC y cédulas como los del archivo de la DGII: 90% con dígito
+    verificador válido, 9% con el último dígito alterado y 1% con formato no válido.
+    """
+    aleatorio = random.Random(semilla)
+    numeros = []
+    for i in range(cantidad):
+        rnc = generar_rnc(i)
+        azar = aleatorio.random()
+        if azar < 0.09:
+            rnc = rnc[:-1] + str((int(rnc[-1]) + 1) % 10)
+        elif azar < 0.10:
+            rnc = aleatorio.choice(['', 'N/A', rnc[:-2], rnc + '0', rnc[:4] + '-' + rnc[4:]])
+        numeros.append(rnc)
+    return numeros
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--numeros', type=int, default=1000000, help='Cantidad de números a validar')
+    parser.add_argument('--repeticiones', type=int, default=3, help='Repeticiones de cada medición (se toma la mejor)')
+    args = parser.parse_args()
+
+    print(f"Generando {args.numeros} números...")
+    numeros = generar_numeros(args.numeros)
+    arreglo = np.array(numeros, dtype=object)
+
+    def escalar():
+        return np.fromiter((validar_digito(rnc) for rnc in numeros), dtype=bool, count=len(numeros))
+
+    def vectorizado():
+        return validar_digitos(arreglo)
+
+    resultados = {}
+    tiempos = {}
+    for nombre, funcion in [('escalar', escalar), ('vectorizado', vectorizado)]:
+        mejor = None
+        for _ in range(args.repeticiones):
+            inicio = time.perf_counter()
+            resultados[nombre] = funcion()
+            segundos = time.perf_counter() - inicio
+            mejor = segundos if mejor is None else min(mejor, segundos)
+        tiempos[nombre] = mejor
+
+    # Ambas rutas deben dar exactamente el mismo resultado
+    assert np.array_equal(resultados['escalar'], resultados['vectorizado'])
+
+    print()
+    print(f"Válidos: {int(resultados['vectorizado'].sum())} de {args.numeros}")
+    print()
+    print(f"{'ruta':<12} {'segundos':>10} {'números/s':>14} {'ns/número':>10}")
+    for nombre, segundos in tiempos.items():
+        print(f"{nombre:<12} {segundos:>10.3f} {args.numeros / segundos:>14,.0f} {segundos / args.numeros * 1e9:>10.0f}")
+
+    print(f"\nAceleración: {tiempos['escalar'] / tiempos['vectorizado']:.1f}x")
+
+if __name__ == '__main__':
+    main()
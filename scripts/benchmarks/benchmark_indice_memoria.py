@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark del índice de RNC en memoria: tamaño en memoria y latencia de consulta
+frente a la consulta ORM a la base de datos.
+
+Uso:
+    python scripts/benchmarks/benchmark_indice_memoria.py --registros 700000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import logging
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+# La base de datos del benchmark es un SQLite temporal, nunca la de producción
+TEMP_DIR = tempfile.mkdtemp(prefix='dgii_bench_')
+os.environ['DB_TYPE'] = 'sqlite'
+os.environ['DB_PATH'] = os.path.join(TEMP_DIR, 'benchmark.db')
+# Los logs de las pruebas tampoco van a logs/ del repositorio
+os.environ['LOG_DIR'] = os.path.join(TEMP_DIR, 'logs')
+
+from scripts import update_db
+from scripts.benchmarks.sinteticos import generar_zip_dgii, generar_rnc
+from app.models import Contribuyente
+from app.indice_memoria import IndiceRNC
+
+def percentil(valores, p):
+    """Devuelve el percentil p (0-100) de una lista ya ordenada."""
+    return valores[min(int(len(valores) * p / 100), len(valores) - 1)]
+
+def medir_latencias(funcion, rncs):
+    """Mide la latencia de cada consulta en microsegundos."""
+    latencias = []
+    for rnc in rncs:
+        inicio = time.perf_counter()
+        funcion(rnc)
+        latencias.append((time.perf_counter() - inicio) * 1e6)
+    return sorted(latencias)
+
+def consulta_db(rnc):
+    """Ruta original: consulta ORM y serialización con to_dict()."""
+    contribuyente = Contribuyente.query.filter_by(rnc=rnc).first()
+    return contribuyente.to_dict() if contribuyente else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registros', type=int, default=700000, help='Registros en la base de datos')
+    parser.add_argument('--consultas', type=int, default=20000, help='Consultas a medir en cada ruta')
+    args = parser.parse_args()
+    
+    update_db.logger.setLevel(logging.WARNING)
+    
+    print(f"Cargando {args.registros} registros sintéticos...")
+    with update_db.app.app_context():
+        update_db.db.create_all()
+        update_db.actualizar_base_datos(update_db.procesar_archivo_zip_por_partes(generar_zip_dgii(args.registros)))
+    
+    # 90% de RNC registrados y 10% inexistentes
+    aleatorio = random.Random(7)
+    rncs = [
+        generar_rnc(aleatorio.randrange(args.registros)) if aleatorio.random() < 0.9
+        else f"{aleatorio.randrange(500000000, 999999999):09d}"
+        for _ in range(args.consultas)
+    ]
+    
+    with update_db.app.app_context():
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        indice = IndiceRNC.construir()
+        segundos_carga = time.perf_counter() - inicio
+        memoria_retenida, pico_carga = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        # Verificar que ambas rutas devuelven lo mismo
+        for rnc in rncs[:200]:
+            assert indice.buscar(rnc) == consulta_db(rnc), rnc
+        
+        latencias_db = medir_latencias(consulta_db, rncs)
+        latencias_indice = medir_latencias(indice.buscar, rncs)
+    
+    stats = indice.estadisticas()
+    print()
+    print("Tamaño del índice:")
+    print(f"  registros:              {stats['registros']}")
+    print(f"  claves (int64):         {stats['bytes_claves'] / 1024 / 1024:8.1f} MB")
+    print(f"  desplazamientos:        {stats['bytes_desplazamientos'] / 1024 / 1024:8.1f} MB")
+    print(f"  bloque de registros:    {stats['bytes_registros'] / 1024 / 1024:8.1f} MB")
+    print(f"  total:                  {stats['bytes_total'] / 1024 / 1024:8.1f} MB ({stats['bytes_por_registro']} bytes/registro)")
+    print(f"  memoria retenida:       {memoria_retenida / 1024 / 1024:8.1f} MB (tracemalloc)")
+    print(f"  pico durante la carga:  {pico_carga / 1024 / 1024:8.1f} MB en {segundos_carga:.2f}s")
+    
+    print()
+    print(f"{'ruta':<8} {'consultas':>10} {'p50 µs':>10} {'p99 µs':>10} {'media µs':>10}")
+    for nombre, latencias in [('db', latencias_db), ('indice', latencias_indice)]:
+        print(f"{nombre:<8} {len(latencias):>10} {percentil(latencias, 50):>10.1f} "
+              f"{percentil(latencias, 99):>10.1f} {sum(latencias) / len(latencias):>10.1f}")
+    
+    print(f"\nAceleración (p50): {percentil(latencias_db, 50) / percentil(latencias_indice, 50):.0f}x")
+
+if __name__ == '__main__':
+    main()
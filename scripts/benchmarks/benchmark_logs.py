@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de /api/contribuyente/<rnc> con gunicorn y logs a nivel INFO,
+escribiendo directamente desde el hilo de la solicitud (LOG_ASYNC=false, como
+hasta ahora) o mediante la cola en segundo plano (LOG_ASYNC=true). La salida
+estándar del servidor va a un archivo, como en un contenedor con los logs
+redirigidos, y los archivos de log a un directorio temporal (LOG_DIR).
+
+Uso:
+    python scripts/benchmarks/benchmark_logs.py --registros 100000 --clientes 16 --segundos 20
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import logging
+import subprocess
+import http.client
+import multiprocessing
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+from scripts.benchmarks.benchmark_servidor import TEMP_DIR, cliente, percentil, puerto_libre
+from scripts.benchmarks.sinteticos import generar_zip_dgii, generar_rnc
+from scripts import update_db
+
+# Modo -> (LOG_ASYNC, LOG_LEVEL)
+MODOS = {
+    'sincrono': ('false', 'INFO'),
+    'cola': ('true', 'INFO'),
+    'cola-warning': ('true', 'WARNING')
+}
+
+def iniciar_servidor(modo, puerto, args):
+    """Inicia gunicorn con la configuración de logs del modo y espera a que responda."""
+    asincrono, nivel = MODOS[modo]
+    directorio = os.path.join(TEMP_DIR, f'logs_{modo}')
+    os.makedirs(directorio, exist_ok=True)
+    entorno = dict(
+        os.environ,
+        API_HOST='127.0.0.1',
+        API_PORT=str(puerto),
+        RATELIMIT_ENABLED='false',
+        WEB_WORKERS=str(args.workers),
+        WEB_THREADS=str(args.threads),
+        WEB_PIDFILE=os.path.join(TEMP_DIR, f'{modo}.pid'),
+        LOG_ASYNC=asincrono,
+        LOG_LEVEL=nivel,
+        LOG_DIR=directorio
+    )
+    salida = open(os.path.join(directorio, 'stdout.log'), 'w')
+    proceso = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:application'],
+        cwd=BASE_DIR, env=entorno, stdout=salida, stderr=subprocess.STDOUT
+    )
+    limite = time.time() + 60
+    while time.time() < limite:
+        try:
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=2)
+            conexion.request('GET', '/api/status')
+            if conexion.getresponse().status == 200:
+                return proceso, salida
+        except OSError:
+            time.sleep(0.2)
+    proceso.terminate()
+    raise RuntimeError(f"El servidor en modo {modo} no respondió")
+
+def medir(modo, rncs, args):
+    """Ejecuta la prueba de carga con un modo de logs."""
+    puerto = puerto_libre()
+    proceso, salida = iniciar_servidor(modo, puerto, args)
+    try:
+        cliente((puerto, rncs, time.time() + 2, 0))
+
+        fin = time.time() + args.segundos
+        with multiprocessing.Pool(args.clientes) as pool:
+            resultados = pool.map(cliente, [(puerto, rncs, fin, i + 1) for i in range(args.clientes)])
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+        salida.close()
+
+    latencias = sorted(l for parcial, _ in resultados for l in parcial)
+    return {
+        'solicitudes': len(latencias),
+        'errores': sum(e for _, e in resultados),
+        'por_segundo': len(latencias) / args.segundos,
+        'p50': percentil(latencias, 50) if latencias else 0,
+        'p99': percentil(latencias, 99) if latencias else 0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registros', type=int, default=100000, help='Registros en la base de datos')
+    parser.add_argument('--clientes', type=int, default=16, help='Clientes concurrentes (procesos)')
+    parser.add_argument('--segundos', type=int, default=20, help='Duración de cada medición')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count() * 2 + 1, help='Procesos de gunicorn')
+    parser.add_argument('--threads', type=int, default=4, help='Hilos por proceso de gunicorn')
+    parser.add_argument('--modos', default=','.join(MODOS), help='Modos a medir, separados por comas')
+    args = parser.parse_args()
+
+    update_db.logger.setLevel(logging.WARNING)
+
+    print(f"Cargando {args.registros} registros sintéticos...")
+    with update_db.app.app_context():
+        update_db.db.create_all()
+        update_db.actualizar_base_datos(update_db.procesar_archivo_zip_por_partes(generar_zip_dgii(args.registros)))
+
+    aleatorio = random.Random(7)
+    rncs = [generar_rnc(aleatorio.randrange(args.registros)) for _ in range(10000)]
+
+    print(f"{args.clientes} clientes, {args.segundos}s por modo; gunicorn con {args.workers} procesos x {args.threads} hilos")
+    print()
+    print(f"{'modo':<14} {'solicitudes':>12} {'errores':>8} {'sol/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for modo in args.modos.split(','):
+        r = medir(modo, rncs, args)
+        print(f"{modo:<14} {r['solicitudes']:>12} {r['errores']:>8} {r['por_segundo']:>10.1f} {r['p50']:>8.2f} {r['p99']:>8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memoria (pico de tracemalloc) del procesamiento del ZIP de la DGII:
+DataFrame completo frente a lectura por partes desde el ZIP.
+
+Uso:
+    python scripts/benchmarks/benchmark_memoria_zip.py --registros 700000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import logging
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+# La base de datos del benchmark es un SQLite temporal, nunca la de producción
+TEMP_DIR = tempfile.mkdtemp(prefix='dgii_bench_')
+os.environ['DB_TYPE'] = 'sqlite'
+os.environ['DB_PATH'] = os.path.join(TEMP_DIR, 'benchmark.db')
+# Los logs de las pruebas tampoco van a logs/ del repositorio
+os.environ['LOG_DIR'] = os.path.join(TEMP_DIR, 'logs')
+
+from scripts import update_db
+from scripts.benchmarks.sinteticos import generar_zip_dgii
+
+def completo(ruta_zip, tamano_parte):
+    """Ruta original: todo el archivo en un solo DataFrame."""
+    return update_db.actualizar_base_datos(update_db.procesar_archivo_zip(ruta_zip))
+
+def por_partes(ruta_zip, tamano_parte):
+    """Ruta por partes: cada parte se escribe en cuanto se lee."""
+    return update_db.actualizar_base_datos(update_db.procesar_archivo_zip_por_partes(ruta_zip, tamano_parte))
+
+def medir(nombre, funcion, ruta_zip, tamano_parte):
+    """Ejecuta una carga sobre una base de datos vacía y mide tiempo y pico de memoria."""
+    with update_db.app.app_context():
+        update_db.db.drop_all()
+        update_db.db.create_all()
+        
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        resultado = funcion(ruta_zip, tamano_parte)
+        segundos = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    
+    if resultado['estado'] != 'success':
+        print(f"Error en {nombre}: {resultado['mensaje']}")
+        sys.exit(1)
+    return nombre, resultado['registros_procesados'], segundos, pico
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registros', type=int, default=700000, help='Registros del archivo sintético')
+    parser.add_argument('--tamano-parte', type=int, default=50000, help='Registros por parte en la lectura por partes')
+    args = parser.parse_args()
+    
+    update_db.logger.setLevel(logging.WARNING)
+    
+    print(f"Generando archivo sintético con {args.registros} registros...")
+    ruta_zip = os.path.join(TEMP_DIR, 'DGII_RNC.zip')
+    with open(ruta_zip, 'wb') as f:
+        f.write(generar_zip_dgii(args.registros).getvalue())
+    
+    resultados = [
+        medir('completo', completo, ruta_zip, args.tamano_parte),
+        medir('por partes', por_partes, ruta_zip, args.tamano_parte)
+    ]
+    
+    print()
+    print(f"{'ruta':<12} {'registros':>10} {'segundos':>10} {'pico MB':>10}")
+    for nombre, registros, segundos, pico in resultados:
+        print(f"{nombre:<12} {registros:>10} {segundos:>10.2f} {pico / 1024 / 1024:>10.1f}")
+    
+    print(f"\nReducción del pico de memoria: {resultados[0][3] / resultados[1][3]:.1f}x")
+
+if __name__ == '__main__':
+    main()
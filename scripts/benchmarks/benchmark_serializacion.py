@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la serialización de páginas de contribuyentes (100 filas por
+defecto): instancias ORM + to_dict() frente a filas Core + filas_a_dicts, cada una
+codificada con la biblioteca estándar y con orjson (app/serializacion.py).
+
+Se mide la página completa (consulta + conversión + JSON) y solo la parte de
+serialización, con las filas ya cargadas.
+
+Uso:
+    python scripts/benchmarks/benchmark_serializacion.py --registros 20000 --filas 100
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+# La base de datos del benchmark es un SQLite temporal, nunca la de producción
+TEMP_DIR = tempfile.mkdtemp(prefix='dgii_bench_')
+os.environ['DB_TYPE'] = 'sqlite'
+os.environ['DB_PATH'] = os.path.join(TEMP_DIR, 'benchmark.db')
+# Los logs de las pruebas tampoco van a logs/ del repositorio
+os.environ['LOG_DIR'] = os.path.join(TEMP_DIR, 'logs')
+
+from sqlalchemy import select
+from flask.json.provider import DefaultJSONProvider
+from scripts import update_db
+from scripts.benchmarks.sinteticos import generar_zip_dgii
+from app.models import Contribuyente
+from app.serializacion import ProveedorJSON, filas_a_dicts, orjson
+
+COLUMNAS = [
+    Contribuyente.id, Contribuyente.rnc, Contribuyente.nombre, Contribuyente.nombre_comercial,
+    Contribuyente.categoria, Contribuyente.regimen_pagos, Contribuyente.estado,
+    Contribuyente.actividad_economica, Contribuyente.fecha_actualizacion
+]
+
+def medir(funcion, repeticiones):
+    """Devuelve el mejor tiempo por llamada (µs) de varias tandas."""
+    mejor = None
+    for _ in range(5):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        tiempo = (time.perf_counter() - inicio) / repeticiones * 1e6
+        mejor = tiempo if mejor is None else min(mejor, tiempo)
+    return mejor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registros', type=int, default=20000, help='Registros en la base de datos')
+    parser.add_argument('--filas', type=int, default=100, help='Filas por página')
+    parser.add_argument('--repeticiones', type=int, default=200, help='Páginas por tanda')
+    args = parser.parse_args()
+
+    update_db.logger.setLevel(logging.WARNING)
+    app = update_db.app
+    db = update_db.db
+
+    print(f"Cargando {args.registros} registros sintéticos...")
+    with app.app_context():
+        db.create_all()
+        update_db.actualizar_base_datos(update_db.procesar_archivo_zip_por_partes(generar_zip_dgii(args.registros)))
+
+    estandar = DefaultJSONProvider(app)
+    rapido = ProveedorJSON(app)
+    codificadores = [('stdlib', estandar)] + ([('orjson', rapido)] if orjson else [])
+    if not orjson:
+        print("orjson no está instalado: solo se mide la biblioteca estándar")
+
+    with app.app_context():
+        def pagina_orm():
+            return [c.to_dict() for c in
+                    Contribuyente.query.order_by(Contribuyente.nombre, Contribuyente.id).limit(args.filas)]
+
+        def pagina_core():
+            consulta = select(*COLUMNAS).order_by(Contribuyente.nombre, Contribuyente.id).limit(args.filas)
+            return filas_a_dicts(db.session.execute(consulta), COLUMNAS)
+
+        # Mismo resultado por las dos vías
+        assert pagina_orm() == pagina_core()
+
+        instancias = Contribuyente.query.order_by(Contribuyente.nombre, Contribuyente.id).limit(args.filas).all()
+        filas = db.session.execute(
+            select(*COLUMNAS).order_by(Contribuyente.nombre, Contribuyente.id).limit(args.filas)
+        ).all()
+
+        print(f"Páginas de {args.filas} filas, mejor de 5 tandas de {args.repeticiones}")
+        print()
+        print(f"{'lectura':<6} {'json':<8} {'página completa µs':>20} {'solo serialización µs':>24}")
+        base = None
+        for lectura, pagina, convertir in [
+            ('orm', pagina_orm, lambda: [c.to_dict() for c in instancias]),
+            ('core', pagina_core, lambda: filas_a_dicts(filas, COLUMNAS))
+        ]:
+            for nombre, proveedor in codificadores:
+                completa = medir(lambda: proveedor.response({'contribuyentes': pagina()}), args.repeticiones)
+                serializacion = medir(lambda: proveedor.response({'contribuyentes': convertir()}), args.repeticiones)
+                base = base or completa
+                print(f"{lectura:<6} {nombre:<8} {completa:>20.1f} {serializacion:>24.1f}   x{base / completa:.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de /api/contribuyente/<rnc> con el servidor de desarrollo de
+Flask (python app.py) y con gunicorn (wsgi.py + gunicorn.conf.py): solicitudes
+por segundo y latencias p50/p99 con varios clientes concurrentes.
+
+Uso:
+    python scripts/benchmarks/benchmark_servidor.py --registros 100000 --clientes 16 --segundos 20
+"""
+import os
+import sys
+import time
+import random
+import socket
+import argparse
+import tempfile
+import logging
+import subprocess
+import http.client
+import multiprocessing
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+# La base de datos del benchmark es un SQLite temporal, nunca la de producción
+TEMP_DIR = tempfile.mkdtemp(prefix='dgii_bench_')
+os.environ['DB_TYPE'] = 'sqlite'
+os.environ['DB_PATH'] = os.path.join(TEMP_DIR, 'benchmark.db')
+# Los logs de las pruebas tampoco van a logs/ del repositorio
+os.environ['LOG_DIR'] = os.path.join(TEMP_DIR, 'logs')
+
+from scripts import update_db
+from scripts.benchmarks.sinteticos import generar_zip_dgii, generar_rnc
+
+def percentil(valores, p):
+    """Devuelve el percentil p (0-100) de una lista ya ordenada."""
+    return valores[min(int(len(valores) * p / 100), len(valores) - 1)]
+
+def puerto_libre():
+    """Devuelve un puerto TCP libre en localhost."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def iniciar_servidor(modo, puerto, args):
+    """Inicia la API en un subproceso y espera a que responda."""
+    entorno = dict(
+        os.environ,
+        API_HOST='127.0.0.1',
+        API_PORT=str(puerto),
+        RATELIMIT_ENABLED='false',
+        FLASK_DEBUG='false',
+        WEB_WORKERS=str(args.workers),
+        WEB_THREADS=str(args.threads),
+        WEB_PIDFILE=os.path.join(TEMP_DIR, f'{modo}.pid')
+    )
+    if modo == 'desarrollo':
+        comando = [sys.executable, 'app.py']
+    else:
+        comando = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:application']
+
+    proceso = subprocess.Popen(comando, cwd=BASE_DIR, env=entorno,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    limite = time.time() + 60
+    while time.time() < limite:
+        try:
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=2)
+            conexion.request('GET', '/api/status')
+            if conexion.getresponse().status == 200:
+                return proceso
+        except OSError:
+            time.sleep(0.2)
+    proceso.terminate()
+    raise RuntimeError(f"El servidor en modo {modo} no respondió")
+
+def cliente(parametros):
+    """Envía solicitudes con una conexión persistente hasta el fin del plazo."""
+    puerto, rncs, fin, semilla = parametros
+    aleatorio = random.Random(semilla)
+    latencias = []
+    errores = 0
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=10)
+    while time.time() < fin:
+        inicio = time.perf_counter()
+        try:
+            conexion.request('GET', f'/api/contribuyente/{aleatorio.choice(rncs)}')
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            if respuesta.status not in (200, 404):
+                errores += 1
+        except (OSError, http.client.HTTPException):
+            errores += 1
+            conexion.close()
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=10)
+            continue
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    conexion.close()
+    return latencias, errores
+
+def medir(modo, rncs, args):
+    """Ejecuta la prueba de carga contra un modo de servidor."""
+    puerto = puerto_libre()
+    proceso = iniciar_servidor(modo, puerto, args)
+    try:
+        # Calentamiento: cachés y conexiones
+        cliente((puerto, rncs, time.time() + 2, 0))
+
+        fin = time.time() + args.segundos
+        with multiprocessing.Pool(args.clientes) as pool:
+            resultados = pool.map(cliente, [(puerto, rncs, fin, i + 1) for i in range(args.clientes)])
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+
+    latencias = sorted(l for parcial, _ in resultados for l in parcial)
+    errores = sum(e for _, e in resultados)
+    return {
+        'solicitudes': len(latencias),
+        'errores': errores,
+        'por_segundo': len(latencias) / args.segundos,
+        'p50': percentil(latencias, 50) if latencias else 0,
+        'p99': percentil(latencias, 99) if latencias else 0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registros', type=int, default=100000, help='Registros en la base de datos')
+    parser.add_argument('--clientes', type=int, default=16, help='Clientes concurrentes (procesos)')
+    parser.add_argument('--segundos', type=int, default=20, help='Duración de cada medición')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count() * 2 + 1, help='Procesos de gunicorn')
+    parser.add_argument('--threads', type=int, default=4, help='Hilos por proceso de gunicorn')
+    parser.add_argument('--modos', default='desarrollo,produccion', help='Modos a medir, separados por comas')
+    args = parser.parse_args()
+
+    update_db.logger.setLevel(logging.WARNING)
+
+    print(f"Cargando {args.registros} registros sintéticos...")
+    with update_db.app.app_context():
+        update_db.db.create_all()
+        update_db.actualizar_base_datos(update_db.procesar_archivo_zip_por_partes(generar_zip_dgii(args.registros)))
+
+    # 90% de RNC registrados y 10% inexistentes
+    aleatorio = random.Random(7)
+    rncs = [
+        generar_rnc(aleatorio.randrange(args.registros)) if aleatorio.random() < 0.9
+        else f"{aleatorio.randrange(500000000, 999999999):09d}"
+        for _ in range(10000)
+    ]
+
+    print(f"{args.clientes} clientes, {args.segundos}s por modo; gunicorn con {args.workers} procesos x {args.threads} hilos")
+    print()
+    print(f"{'modo':<12} {'solicitudes':>12} {'errores':>8} {'sol/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for modo in args.modos.split(','):
+        r = medir(modo, rncs, args)
+        print(f"{modo:<12} {r['solicitudes']:>12} {r['errores']:>8} {r['por_segundo']:>10.1f} {r['p50']:>8.2f} {r['p99']:>8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark de actualizar_base_datos: upsert por lotes y recarga completa frente al
+procesamiento por fila.
+
+Uso:
+    python scripts/benchmarks/benchmark_update_db.py --registros 700000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import logging
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+# La base de datos del benchmark es un SQLite temporal, nunca la de producción
+TEMP_DIR = tempfile.mkdtemp(prefix='dgii_bench_')
+os.environ['DB_TYPE'] = 'sqlite'
+os.environ['DB_PATH'] = os.path.join(TEMP_DIR, 'benchmark.db')
+# Los logs de las pruebas tampoco van a logs/ del repositorio
+os.environ['LOG_DIR'] = os.path.join(TEMP_DIR, 'logs')
+
+from scripts import update_db
+from scripts.benchmarks.sinteticos import generar_zip_dgii
+
+def medir(modo, df):
+    """Ejecuta una actualización y devuelve (segundos, resultado)."""
+    inicio = time.perf_counter()
+    with update_db.app.app_context():
+        resultado = update_db.actualizar_base_datos(df, modo=modo)
+    return time.perf_counter() - inicio, resultado
+
+def reiniciar_base_datos():
+    """Elimina y vuelve a crear las tablas del SQLite temporal."""
+    with update_db.app.app_context():
+        update_db.db.drop_all()
+        update_db.db.create_all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--registros', type=int, default=700000, help='Registros del archivo sintético')
+    parser.add_argument('--registros-fila', type=int, default=None,
+                        help='Registros para el modo por fila (por defecto los mismos; el modo por fila es lento)')
+    args = parser.parse_args()
+    
+    # Silenciar los logs por lote para no medir la escritura de logs
+    update_db.logger.setLevel(logging.WARNING)
+    
+    print(f"Generando archivo sintético con {args.registros} registros...")
+    df = update_db.procesar_archivo_zip(generar_zip_dgii(args.registros))
+    df_fila = df if args.registros_fila is None else df.iloc[:args.registros_fila]
+    
+    resultados = []
+    for modo, datos in [(update_db.MODO_BULK, df), (update_db.MODO_RECARGA, df), (update_db.MODO_FILA, df_fila)]:
+        reiniciar_base_datos()
+        for fase in ['inserción', 'sin cambios']:
+            segundos, resultado = medir(modo, datos)
+            if resultado['estado'] != 'success':
+                print(f"Error en modo {modo}: {resultado['mensaje']}")
+                sys.exit(1)
+            resultados.append((modo, fase, len(datos), segundos, resultado))
+    
+    print()
+    print(f"{'modo':<8} {'fase':<14} {'registros':>10} {'segundos':>10} {'reg/s':>10} {'nuevos':>9} {'actualiz.':>9} {'sin camb.':>9}")
+    for modo, fase, registros, segundos, resultado in resultados:
+        print(f"{modo:<8} {fase:<14} {registros:>10} {segundos:>10.2f} {registros / segundos:>10.0f} "
+              f"{resultado['registros_nuevos']:>9} {resultado['registros_actualizados']:>9} {resultado['registros_sin_cambios']:>9}")
+    
+    tasa = {}
+    for modo, fase, registros, segundos, _ in resultados:
+        tasa.setdefault(modo, []).append(registros / segundos)
+    aceleracion = (sum(tasa[update_db.MODO_BULK]) / sum(tasa[update_db.MODO_FILA]))
+    print(f"\nAceleración del modo bulk (registros/s): {aceleracion:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Comprueba que el límite de tasa se respeta entre varios procesos.
+
+1. Almacenamiento: varios procesos consumen el mismo límite a la vez con cada
+   estrategia; con sqlite:// el total aceptado no supera el límite, con memory://
+   se multiplica por el número de procesos.
+2. HTTP: gunicorn con varios procesos y un límite bajo; se cuentan las
+   respuestas 200 frente a las 429 con cada almacenamiento.
+
+Uso:
+    python scripts/benchmarks/prueba_limites_procesos.py --procesos 4 --limite 20
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import http.client
+import multiprocessing
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BASE_DIR)
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+import app.limites  # noqa: F401 (registra sqlite://)
+
+TEMP_DIR = tempfile.mkdtemp(prefix='dgii_limites_')
+# Los servidores de la prueba escriben sus logs en el directorio temporal
+os.environ['LOG_DIR'] = os.path.join(TEMP_DIR, 'logs')
+ESTRATEGIAS = ['fixed-window', 'moving-window', 'sliding-window-counter']
+
+def consumir(parametros):
+    """Intenta consumir el límite desde un proceso; devuelve los aciertos."""
+    uri, estrategia, limite, intentos, inicio = parametros
+    limitador = STRATEGIES[estrategia](storage_from_string(uri))
+    item = parse(f"{limite} per minute")
+    # Todos los procesos empiezan a la vez para forzar la concurrencia
+    time.sleep(max(inicio - time.time(), 0))
+    return sum(1 for _ in range(intentos) if limitador.hit(item, 'prueba', estrategia))
+
+def probar_almacenamiento(uri, estrategia, args):
+    inicio = time.time() + 1
+    with multiprocessing.Pool(args.procesos) as pool:
+        aceptados = pool.map(consumir, [(uri, estrategia, args.limite, args.limite * 2, inicio)] * args.procesos)
+    return sum(aceptados)
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def solicitar(parametros):
+    """Envía solicitudes con una conexión nueva cada vez (se reparten entre procesos)."""
+    puerto, cantidad = parametros
+    estados = []
+    for _ in range(cantidad):
+        conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=10)
+        conexion.request('GET', '/api/contribuyente/101850043')
+        estados.append(conexion.getresponse().status)
+        conexion.close()
+    return estados
+
+def probar_http(uri, args):
+    puerto = puerto_libre()
+    entorno = dict(
+        os.environ,
+        DB_TYPE='sqlite',
+        DB_PATH=os.path.join(TEMP_DIR, 'api.db'),
+        API_HOST='127.0.0.1',
+        API_PORT=str(puerto),
+        WEB_WORKERS=str(args.procesos),
+        WEB_THREADS='2',
+        WEB_PIDFILE=os.path.join(TEMP_DIR, 'gunicorn.pid'),
+        RATELIMIT_STORAGE_URI=uri,
+        RATELIMIT_DEFAULT=f"{args.limite} per minute"
+    )
+    proceso = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:application'],
+        cwd=BASE_DIR, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        limite = time.time() + 60
+        while time.time() < limite:
+            try:
+                socket.create_connection(('127.0.0.1', puerto), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.2)
+        time.sleep(1)  # Que arranquen todos los procesos
+        with multiprocessing.Pool(args.procesos) as pool:
+            estados = [e for parcial in pool.map(solicitar, [(puerto, args.limite)] * args.procesos) for e in parcial]
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=30)
+    return sum(1 for e in estados if e != 429), sum(1 for e in estados if e == 429)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--procesos', type=int, default=4, help='Procesos concurrentes')
+    parser.add_argument('--limite', type=int, default=20, help='Solicitudes permitidas por minuto')
+    parser.add_argument('--sin-http', action='store_true', help='Omitir la prueba con gunicorn')
+    args = parser.parse_args()
+
+    fallos = 0
+    print(f"Almacenamiento: {args.procesos} procesos, límite {args.limite}/minuto, {args.limite * 2} intentos por proceso")
+    print(f"{'almacenamiento':<16} {'estrategia':<24} {'aceptados':>10}")
+    for estrategia in ESTRATEGIAS:
+        uri = f"sqlite:///{os.path.join(TEMP_DIR, estrategia + '.db')}"
+        aceptados = probar_almacenamiento(uri, estrategia, args)
+        correcto = aceptados <= args.limite
+        fallos += not correcto
+        print(f"{'sqlite':<16} {estrategia:<24} {aceptados:>10} {'OK' if correcto else 'FALLO'}")
+    aceptados = probar_almacenamiento('memory://', 'fixed-window', args)
+    print(f"{'memory':<16} {'fixed-window':<24} {aceptados:>10} (cada proceso cuenta por separado)")
+
+    if not args.sin_http:
+        print()
+        print(f"HTTP: gunicorn con {args.procesos} procesos, {args.procesos * args.limite} solicitudes")
+        print(f"{'almacenamiento':<16} {'200/404':>10} {'429':>8}")
+        for nombre, uri in [('sqlite', f"sqlite:///{os.path.join(TEMP_DIR, 'http.db')}"), ('memory', 'memory://')]:
+            aceptadas, rechazadas = probar_http(uri, args)
+            if nombre == 'sqlite':
+                correcto = aceptadas <= args.limite
+                fallos += not correcto
+                print(f"{nombre:<16} {aceptadas:>10} {rechazadas:>8} {'OK' if correcto else 'FALLO'}")
+            else:
+                print(f"{nombre:<16} {aceptadas:>10} {rechazadas:>8}")
+
+    sys.exit(1 if fallos else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Generación de archivos sintéticos con el formato del DGII_RNC.zip para benchmarks.
+"""
+import io
+import random
+import zipfile
+from app.utils.digito_verificador import digito_verificador_rnc, digito_verificador_cedula
+
+# Valores de ejemplo para los campos categóricos del archivo
+ESTADOS = ['ACTIVO', 'ACTIVO', 'ACTIVO', 'SUSPENDIDO', 'INACTIVO']
+REGIMENES = ['NORMAL', 'RST', 'PST', 'ESPECIAL']
+ACTIVIDADES = [
+    'VENTA AL POR MENOR EN COLMADOS',
+    'SERVICIOS DE CONSULTORIA',
+    'CONSTRUCCION DE EDIFICIOS',
+    'TRANSPORTE DE CARGA POR CARRETERA',
+    'ACTIVIDADES DE RESTAURANTES',
+    'COMERCIO DE PRODUCTOS FARMACEUTICOS',
+    'ALQUILER DE VIVIENDAS',
+    'FABRICACION DE MUEBLES'
+]
+PALABRAS = [
+    'COMERCIAL', 'INVERSIONES', 'GRUPO', 'DISTRIBUIDORA', 'FERRETERIA',
+    'CONSTRUCTORA', 'SERVICIOS', 'FARMACIA', 'TRANSPORTE', 'CARIBE',
+    'QUISQUEYA', 'CIBAO', 'SANTO DOMINGO', 'BAHIA', 'MONTAÑA', 'PEÑA'
+]
+
+def generar_rnc(indice):
+    """
+    Genera un RNC sintético único a partir de un índice, con dígito verificador válido.
+    Uno de cada tres registros usa 9 dígitos (empresas) y el resto 11 (cédulas).
+    """
+    if indice % 3 == 0:
+        base = f"{10000000 + indice // 3:08d}"
+        return base + str(digito_verificador_rnc(base))
+    base = f"{4020000000 + indice:010d}"
+    return base + str(digito_verificador_cedula(base))
+
+def generar_lineas(registros, semilla=42):
+    """
+    Genera las líneas del archivo TXT de la DGII (separado por '|', sin encabezados).
+    
+    Args:
+        registros (int): Cantidad de registros a generar.
+        semilla (int): Semilla para obtener siempre los mismos datos.
+        
+    Yields:
+        str: Una línea del archivo.
+    """
+    aleatorio = random.Random(semilla)
+    for i in range(registros):
+        nombre = ' '.join(aleatorio.choice(PALABRAS) for _ in range(3)) + f' SRL {i}'
+        nombre_comercial = aleatorio.choice(PALABRAS) if aleatorio.random() < 0.4 else ''
+        yield '|'.join([
+            generar_rnc(i),
+            nombre,
+            nombre_comercial,
+            aleatorio.choice(ACTIVIDADES),
+            '', '', '', '',
+            '01/01/2000',
+            aleatorio.choice(ESTADOS),
+            aleatorio.choice(REGIMENES)
+        ]) + '\n'
+
+def generar_zip_dgii(registros, semilla=42):
+    """
+    Genera un ZIP en memoria con un archivo TXT equivalente al de la DGII.
+    
+    Args:
+        registros (int): Cantidad de registros a generar.
+        semilla (int): Semilla para obtener siempre los mismos datos.
+        
+    Returns:
+        BytesIO: Contenido del archivo ZIP.
+    """
+    contenido = io.BytesIO()
+    with zipfile.ZipFile(contenido, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+        with z.open('TMP/DGII_RNC.TXT', 'w') as txt:
+            bloque = []
+            for linea in generar_lineas(registros, semilla):
+                bloque.append(linea)
+                if len(bloque) >= 10000:
+                    txt.write(''.join(bloque).encode('latin1'))
+                    bloque = []
+            if bloque:
+                txt.write(''.join(bloque).encode('latin1'))
+    contenido.seek(0)
+    return contenido
@@ -31,6 +31,7 @@ logger.info(f"Usando base de datos SQLite en: {db_path}")
 
 from app import create_app
 from app.models import db
+from app.utils.esquema import actualizar_esquema
 
 def migrate_database():
     """Migrar la base de datos y crear las nuevas tablas."""
@@ -40,8 +41,8 @@ def migrate_database():
         
         # Usar el contexto de la aplicación
         with app.app_context():
-            # Crear las tablas que no existen
-            db.create_all()
+            # Crear las tablas, columnas e índices que no existen
+            actualizar_esquema(db)
             logger.info("Migración de base de datos completada correctamente")
             
             # Mostrar las tablas creadas
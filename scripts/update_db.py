@@ -6,12 +6,13 @@ import os
 import sys
 import requests
 import zipfile
-import io
+import json
 import pandas as pd
 import tempfile
 from datetime import datetime
 from dotenv import load_dotenv
 from flask import Flask
+from sqlalchemy import select, text, case, func, MetaData, Table, Column, Index
 
 # Agregar el directorio raíz al path para poder importar los módulos de la aplicación
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -19,6 +20,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Importar después de agregar el path
 from app.models import db, Contribuyente, ActualizacionDB
 from app.utils.logger import update_logger as logger
+from app.utils.esquema import actualizar_esquema, actualizar_estadisticas
+from app.estadisticas import materializar_estadisticas
+from app.utils.digito_verificador import validar_digitos
+from app.servidor import solicitar_recarga
+from app.busqueda_texto import (
+    busqueda_texto_habilitada, existe_tabla_fts, script_sincronizacion_sqlite, crear_indice_fulltext
+)
 
 # Cargar variables de entorno
 load_dotenv()
@@ -36,33 +44,242 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # Inicializar la base de datos con esta aplicación
 db.init_app(app)
 
+# Valor devuelto por descargar_archivo_dgii cuando el archivo no cambió desde la última actualización
+ARCHIVO_SIN_CAMBIOS = object()
+
+# Tamaño de cada bloque escrito a disco durante la descarga
+TAMANO_BLOQUE_DESCARGA = 1024 * 1024
+
+def _rutas_descarga():
+    """
+    Obtiene las rutas del archivo descargado, la descarga parcial y sus metadatos.
+    Por defecto se guardan junto a la base de datos (DGII_DOWNLOAD_DIR).
+    
+    Returns:
+        tuple: (ruta_zip, ruta_parcial, ruta_metadatos)
+    """
+    directorio = os.getenv('DGII_DOWNLOAD_DIR', os.path.dirname(os.getenv('DB_PATH', 'data/dgii_contribuyentes.db')) or '.')
+    os.makedirs(directorio, exist_ok=True)
+    ruta_zip = os.path.join(directorio, 'DGII_RNC.zip')
+    return ruta_zip, ruta_zip + '.part', ruta_zip + '.json'
+
+def _leer_metadatos_descarga():
+    """Lee los metadatos (ETag, Last-Modified, estado) de la última descarga."""
+    _, _, ruta_metadatos = _rutas_descarga()
+    try:
+        with open(ruta_metadatos, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _guardar_metadatos_descarga(metadatos):
+    """Guarda los metadatos de la descarga de forma atómica."""
+    _, _, ruta_metadatos = _rutas_descarga()
+    temporal = ruta_metadatos + '.tmp'
+    with open(temporal, 'w') as f:
+        json.dump(metadatos, f)
+    os.replace(temporal, ruta_metadatos)
+
+def marcar_archivo_procesado():
+    """
+    Marca el archivo descargado como procesado. A partir de aquí las siguientes
+    ejecuciones envían solicitudes condicionales y omiten la actualización si la
+    DGII responde 304.
+    """
+    metadatos = _leer_metadatos_descarga()
+    if metadatos.get('completo'):
+        metadatos['procesado'] = True
+        _guardar_metadatos_descarga(metadatos)
+
+def _validadores(response):
+    """Extrae los validadores HTTP (ETag y Last-Modified) de una respuesta."""
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified')
+    }
+
 def descargar_archivo_dgii():
     """
     Descarga el archivo ZIP de contribuyentes desde la DGII.
     
+    La descarga es condicional (If-None-Match / If-Modified-Since) respecto al
+    último archivo procesado y se escribe a disco por bloques. Si la conexión se
+    interrumpe, el siguiente intento continúa desde el último byte recibido con
+    una solicitud Range.
+    
     Returns:
-        BytesIO: Objeto con el contenido del archivo ZIP.
+        str: Ruta del archivo ZIP descargado, ARCHIVO_SIN_CAMBIOS si la DGII
+             indica que no ha cambiado, o None si hubo un error.
     """
     url = os.getenv('DGII_URL', 'https://www.dgii.gov.do/app/WebApps/Consultas/RNC/DGII_RNC.zip')
+    intentos = int(os.getenv('DGII_DOWNLOAD_RETRIES', 3))
+    ruta_zip, ruta_parcial, _ = _rutas_descarga()
     
-    try:
-        logger.info(f"Descargando archivo desde {url}...")
-        response = requests.get(url, timeout=60)
-        response.raise_for_status()  # Lanzar excepción si hay error HTTP
+    for intento in range(1, intentos + 1):
+        metadatos = _leer_metadatos_descarga()
+        headers = {}
+        descargados = 0
         
-        # Devolver el contenido como un objeto BytesIO
-        logger.info(f"Archivo descargado correctamente ({len(response.content)} bytes)")
-        return io.BytesIO(response.content)
-    except Exception as e:
-        logger.error(f"Error al descargar el archivo: {e}")
+        if os.path.exists(ruta_parcial) and not metadatos.get('completo'):
+            # Continuar una descarga interrumpida si el archivo remoto sigue siendo el mismo
+            descargados = os.path.getsize(ruta_parcial)
+            validador = metadatos.get('etag') or metadatos.get('last_modified')
+            if descargados and validador:
+                headers['Range'] = f"bytes={descargados}-"
+                headers['If-Range'] = validador
+        elif metadatos.get('completo') and os.path.exists(ruta_zip):
+            # Solicitud condicional respecto al último archivo descargado
+            if metadatos.get('etag'):
+                headers['If-None-Match'] = metadatos['etag']
+            if metadatos.get('last_modified'):
+                headers['If-Modified-Since'] = metadatos['last_modified']
+        
+        try:
+            logger.info(f"Descargando archivo desde {url} (intento {intento}/{intentos})...")
+            with requests.get(url, headers=headers, timeout=60, stream=True) as response:
+                if response.status_code == 304:
+                    if metadatos.get('procesado'):
+                        logger.info("El archivo de la DGII no ha cambiado desde la última actualización")
+                        return ARCHIVO_SIN_CAMBIOS
+                    # El archivo no cambió pero la última actualización no terminó: reutilizarlo
+                    logger.info(f"El archivo no ha cambiado, se reutiliza la descarga existente {ruta_zip}")
+                    return ruta_zip
+                
+                if response.status_code == 416:
+                    # La descarga parcial no corresponde al archivo remoto: empezar de nuevo
+                    logger.warning("Rango de descarga no válido, se descartará la descarga parcial")
+                    os.remove(ruta_parcial)
+                    continue
+                
+                response.raise_for_status()  # Lanzar excepción si hay error HTTP
+                
+                if response.status_code == 206 and not response.headers.get('Content-Range', '').startswith(f"bytes {descargados}-"):
+                    logger.warning("El servidor devolvió un rango inesperado, se descartará la descarga parcial")
+                    os.remove(ruta_parcial)
+                    continue
+                
+                if response.status_code == 206:
+                    logger.info(f"Continuando descarga desde el byte {descargados}")
+                    modo_apertura = 'ab'
+                else:
+                    # Descarga completa desde cero
+                    descargados = 0
+                    modo_apertura = 'wb'
+                    _guardar_metadatos_descarga(dict(_validadores(response), completo=False, procesado=False))
+                
+                with open(ruta_parcial, modo_apertura) as f:
+                    for bloque in response.iter_content(chunk_size=TAMANO_BLOQUE_DESCARGA):
+                        f.write(bloque)
+                        descargados += len(bloque)
+            
+            os.replace(ruta_parcial, ruta_zip)
+            metadatos = _leer_metadatos_descarga()
+            metadatos['completo'] = True
+            _guardar_metadatos_descarga(metadatos)
+            
+            logger.info(f"Archivo descargado correctamente ({descargados} bytes) en {ruta_zip}")
+            return ruta_zip
+        except Exception as e:
+            logger.error(f"Error al descargar el archivo: {e}")
+    
+    return None
+
+# Nombres de las columnas del archivo TXT de la DGII (el archivo no tiene encabezados)
+# Basado en la estructura observada en las primeras líneas
+COLUMNAS_ARCHIVO = [
+    'rnc', 'nombre', 'nombre_comercial', 'actividad_economica', 
+    'col5', 'col6', 'col7', 'col8', 'fecha_constitucion', 
+    'estado', 'regimen_pagos'
+]
+
+# Opciones de lectura del archivo TXT con pandas
+OPCIONES_CSV = {
+    'sep': '|',
+    'encoding': 'latin1',
+    'dtype': str,  # Todos los campos como string
+    'keep_default_na': False,  # No convertir valores vacíos a NaN
+    'header': None  # No usar la primera fila como encabezados
+}
+
+def _preparar_dataframe(df):
+    """
+    Asigna los nombres de columnas y limpia los datos leídos del archivo TXT.
+    
+    Args:
+        df (DataFrame): Datos tal como se leyeron del archivo.
+        
+    Returns:
+        DataFrame: DataFrame con las columnas normalizadas, o None si faltan columnas requeridas.
+    """
+    # Asignar nombres solo a las columnas que existen
+    if len(df.columns) <= len(COLUMNAS_ARCHIVO):
+        df.columns = COLUMNAS_ARCHIVO[:len(df.columns)]
+    else:
+        # Si hay más columnas de las esperadas, nombrar las adicionales
+        df.columns = COLUMNAS_ARCHIVO + [f'col{i+1}' for i in range(len(COLUMNAS_ARCHIVO), len(df.columns))]
+    
+    logger.debug(f"Columnas asignadas: {df.columns.tolist()}")
+    
+    # Asegurarse de que existan todas las columnas necesarias
+    required_columns = ['rnc', 'nombre']
+    for col in required_columns:
+        if col not in df.columns:
+            logger.error(f"Error: Columna requerida '{col}' no encontrada en el archivo.")
+            logger.error(f"Columnas disponibles: {df.columns.tolist()}")
+            return None
+    
+    # Columnas opcionales (si no existen, crear con valores vacíos)
+    optional_columns = ['nombre_comercial', 'categoria', 'regimen_pagos', 'estado', 'actividad_economica']
+    for col in optional_columns:
+        if col not in df.columns:
+            df[col] = ''
+    
+    # Limpiar RNC (eliminar guiones y espacios)
+    df['rnc'] = df['rnc'].str.replace('-', '').str.replace(' ', '')
+    
+    # Limpiar otros campos
+    for col in df.columns:
+        if col in df and isinstance(df[col], pd.Series):
+            df[col] = df[col].str.strip()
+    
+    # Marcar los RNC y cédulas cuyo dígito verificador no es correcto
+    df['digito_valido'] = validar_digitos(df['rnc'].fillna('').values)
+    invalidos = int((~df['digito_valido']).sum())
+    if invalidos:
+        logger.warning(f"{invalidos} registros con dígito verificador no válido: {df.loc[~df['digito_valido'], 'rnc'].head(5).tolist()}")
+    
+    return df
+
+def _buscar_archivo_txt(z):
+    """
+    Busca el archivo TXT de contribuyentes dentro del ZIP.
+    
+    Args:
+        z (ZipFile): Archivo ZIP abierto.
+        
+    Returns:
+        str: Nombre del archivo TXT, o None si no hay ninguno.
+    """
+    # Listar los archivos en el ZIP
+    file_list = z.namelist()
+    logger.info(f"Archivos en el ZIP: {file_list}")
+    
+    # Buscar el archivo TXT (normalmente hay solo uno)
+    txt_files = [f for f in file_list if f.lower().endswith('.txt')]
+    
+    if not txt_files:
+        logger.error("No se encontró ningún archivo TXT en el ZIP.")
         return None
+    
+    logger.info(f"Archivo TXT encontrado: {txt_files[0]}")
+    return txt_files[0]
 
 def procesar_archivo_zip(zip_content):
     """
     Procesa el archivo ZIP y extrae los datos de contribuyentes.
     
     Args:
-        zip_content (BytesIO): Contenido del archivo ZIP.
+        zip_content (BytesIO | str): Contenido o ruta del archivo ZIP.
         
     Returns:
         DataFrame: DataFrame de pandas con los datos procesados.
@@ -70,22 +287,13 @@ def procesar_archivo_zip(zip_content):
     try:
         # Crear un objeto ZipFile
         with zipfile.ZipFile(zip_content) as z:
-            # Listar los archivos en el ZIP
-            file_list = z.namelist()
-            logger.info(f"Archivos en el ZIP: {file_list}")
-            
-            # Buscar el archivo TXT (normalmente hay solo uno)
-            txt_files = [f for f in file_list if f.lower().endswith('.txt')]
-            
-            if not txt_files:
-                logger.error("No se encontró ningún archivo TXT en el ZIP.")
+            txt_name = _buscar_archivo_txt(z)
+            if not txt_name:
                 return None
             
-            logger.info(f"Archivo TXT encontrado: {txt_files[0]}")
-            
             # Extraer el primer archivo TXT a un directorio temporal
             with tempfile.TemporaryDirectory() as temp_dir:
-                txt_file = z.extract(txt_files[0], temp_dir)
+                txt_file = z.extract(txt_name, temp_dir)
                 
                 # Mostrar las primeras líneas del archivo para depuración
                 with open(txt_file, 'r', encoding='latin1') as f:
@@ -98,58 +306,17 @@ def procesar_archivo_zip(zip_content):
                     f.seek(0)  # Volver al inicio del archivo
                 
                 # Leer el archivo con pandas - IMPORTANTE: El archivo no tiene encabezados
-                df = pd.read_csv(
-                    txt_file, 
-                    sep='|', 
-                    encoding='latin1',
-                    dtype=str,  # Todos los campos como string
-                    keep_default_na=False,  # No convertir valores vacíos a NaN
-                    header=None  # No usar la primera fila como encabezados
-                )
+                df = pd.read_csv(txt_file, **OPCIONES_CSV)
                 
                 logger.info(f"Forma del DataFrame: {df.shape}")
                 logger.debug(f"Primeras filas del DataFrame:")
                 logger.debug(df.head().to_string())
                 
-                # Asignar nombres de columnas basados en la estructura del archivo
-                # Basado en la estructura observada en las primeras líneas
-                column_names = [
-                    'rnc', 'nombre', 'nombre_comercial', 'actividad_economica', 
-                    'col5', 'col6', 'col7', 'col8', 'fecha_constitucion', 
-                    'estado', 'regimen_pagos'
-                ]
-                
-                # Asignar nombres solo a las columnas que existen
-                if len(df.columns) <= len(column_names):
-                    df.columns = column_names[:len(df.columns)]
-                else:
-                    # Si hay más columnas de las esperadas, nombrar las adicionales
-                    df.columns = column_names + [f'col{i+1}' for i in range(len(column_names), len(df.columns))]
+                df = _preparar_dataframe(df)
+                if df is None:
+                    return None
                 
                 logger.info(f"Columnas asignadas: {df.columns.tolist()}")
-                
-                # Asegurarse de que existan todas las columnas necesarias
-                required_columns = ['rnc', 'nombre']
-                for col in required_columns:
-                    if col not in df.columns:
-                        logger.error(f"Error: Columna requerida '{col}' no encontrada en el archivo.")
-                        logger.error(f"Columnas disponibles: {df.columns.tolist()}")
-                        return None
-                
-                # Columnas opcionales (si no existen, crear con valores vacíos)
-                optional_columns = ['nombre_comercial', 'categoria', 'regimen_pagos', 'estado', 'actividad_economica']
-                for col in optional_columns:
-                    if col not in df.columns:
-                        df[col] = ''
-                
-                # Limpiar RNC (eliminar guiones y espacios)
-                df['rnc'] = df['rnc'].str.replace('-', '').str.replace(' ', '')
-                
-                # Limpiar otros campos
-                for col in df.columns:
-                    if col in df and isinstance(df[col], pd.Series):
-                        df[col] = df[col].str.strip()
-                
                 logger.info(f"DataFrame procesado exitosamente con {len(df)} registros")
                 return df
     except Exception as e:
@@ -158,96 +325,520 @@ def procesar_archivo_zip(zip_content):
         logger.error(traceback.format_exc())
         return None
 
-def actualizar_base_datos(df):
+def procesar_archivo_zip_por_partes(zip_content, tamano_parte=None):
+    """
+    Lee el archivo TXT directamente desde el ZIP, por partes y sin extraerlo a disco.
+    La memoria usada queda acotada por el tamaño de cada parte, sin importar el
+    tamaño del archivo.
+    
+    Args:
+        zip_content (BytesIO | str): Contenido o ruta del archivo ZIP.
+        tamano_parte (int, optional): Registros por parte. Por defecto se toma de
+                                      la variable de entorno UPDATE_CHUNK_SIZE (50000).
+        
+    Returns:
+        generator: Generador de DataFrames ya procesados, o None si el ZIP no es válido.
+    """
+    tamano_parte = tamano_parte or int(os.getenv('UPDATE_CHUNK_SIZE', 50000))
+    
+    try:
+        z = zipfile.ZipFile(zip_content)
+    except Exception as e:
+        logger.error(f"Error al procesar el archivo ZIP: {e}")
+        return None
+    
+    txt_name = _buscar_archivo_txt(z)
+    if not txt_name:
+        z.close()
+        return None
+    
+    return _leer_partes(z, txt_name, tamano_parte)
+
+def _leer_partes(z, txt_name, tamano_parte):
+    """
+    Generador que lee el archivo TXT del ZIP en partes de tamano_parte registros.
+    
+    Raises:
+        ValueError: Si el archivo no tiene las columnas requeridas.
+    """
+    with z, z.open(txt_name) as txt_file:
+        lector = pd.read_csv(txt_file, chunksize=tamano_parte, **OPCIONES_CSV)
+        for numero, parte in enumerate(lector, start=1):
+            df = _preparar_dataframe(parte)
+            if df is None:
+                raise ValueError("El archivo no contiene las columnas requeridas")
+            
+            logger.debug(f"Parte {numero} leída con {len(df)} registros")
+            yield df
+
+# Columnas de datos que se escriben en la tabla de contribuyentes
+COLUMNAS_CONTRIBUYENTE = [
+    'rnc', 'nombre', 'nombre_comercial', 'categoria',
+    'regimen_pagos', 'estado', 'actividad_economica', 'digito_valido'
+]
+
+# Columnas que forman parte del hash de contenido de cada contribuyente
+COLUMNAS_HASH = [
+    'nombre', 'nombre_comercial', 'categoria',
+    'regimen_pagos', 'estado', 'actividad_economica', 'digito_valido'
+]
+
+# Modos de actualización disponibles
+MODO_BULK = 'bulk'  # INSERT ... ON CONFLICT / ON DUPLICATE KEY por lotes
+MODO_FILA = 'fila'  # Una consulta ORM por registro (comportamiento original)
+MODO_RECARGA = 'recarga'  # Carga completa en una tabla sombra que luego reemplaza a la actual
+MODOS_ACTUALIZACION = [MODO_BULK, MODO_FILA, MODO_RECARGA]
+
+# Tablas auxiliares de la recarga completa
+TABLA_SOMBRA = 'contribuyentes_new'
+TABLA_ANTERIOR = 'contribuyentes_old'
+
+# Sufijo de los índices de la tabla sombra cuando el nombre original está ocupado
+# (en SQLite los nombres de índice son únicos en toda la base de datos)
+SUFIJO_INDICE_ALTERNO = '_alt'
+
+# Tamaño máximo de la lista IN (...) para no superar el límite de variables de SQLite
+MAX_PARAMETROS_IN = 500
+
+def _sentencia_upsert():
+    """
+    Construye la sentencia de upsert según el dialecto de la base de datos.
+    
+    Returns:
+        Insert: Sentencia INSERT con resolución de conflictos sobre el RNC,
+                o None si el dialecto no la soporta.
+    """
+    tabla = Contribuyente.__table__
+    columnas_actualizables = COLUMNAS_HASH + ['hash_contenido', 'fecha_actualizacion']
+    dialecto = db.engine.dialect.name
+    
+    if dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(tabla)
+        return stmt.on_conflict_do_update(
+            index_elements=['rnc'],
+            set_={col: stmt.excluded[col] for col in columnas_actualizables}
+        )
+    
+    if dialecto == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(tabla)
+        return stmt.on_duplicate_key_update(
+            {col: stmt.inserted[col] for col in columnas_actualizables}
+        )
+    
+    return None
+
+def calcular_hashes(df):
+    """
+    Calcula el hash de contenido de cada registro de forma vectorizada.
+    
+    Args:
+        df (DataFrame): DataFrame con las columnas de COLUMNAS_HASH.
+        
+    Returns:
+        ndarray: Hash de 64 bits con signo por registro (cabe en un BIGINT).
+    """
+    normalizado = df[COLUMNAS_HASH].fillna('').astype(str).apply(lambda columna: columna.str.strip())
+    return pd.util.hash_pandas_object(normalizado, index=False).values.view('int64')
+
+def _hashes_existentes(rncs):
+    """
+    Obtiene el hash de contenido de los RNC de la lista que ya existen en la base de datos.
+    
+    Args:
+        rncs (list): Lista de RNC a consultar.
+        
+    Returns:
+        dict: Hash de contenido por RNC registrado (None si aún no se ha calculado).
+    """
+    existentes = {}
+    for i in range(0, len(rncs), MAX_PARAMETROS_IN):
+        parte = rncs[i:i + MAX_PARAMETROS_IN]
+        resultado = db.session.execute(
+            select(Contribuyente.rnc, Contribuyente.hash_contenido).where(Contribuyente.rnc.in_(parte))
+        )
+        existentes.update(resultado.tuples().all())
+    return existentes
+
+def _procesar_lote_bulk(batch_df, stmt):
+    """
+    Inserta o actualiza un lote completo con una sola sentencia executemany.
+    Solo se escriben los registros nuevos o cuyo hash de contenido cambió.
+    
+    Args:
+        batch_df (DataFrame): Lote de registros a procesar.
+        stmt (Insert): Sentencia de upsert del dialecto actual.
+        
+    Returns:
+        tuple: (registros_nuevos, registros_actualizados, registros_sin_cambios) del lote.
+    """
+    registros = batch_df[COLUMNAS_CONTRIBUYENTE + ['hash_contenido']].to_dict('records')
+    existentes = _hashes_existentes([r['rnc'] for r in registros])
+    
+    pendientes = [r for r in registros if existentes.get(r['rnc']) != r['hash_contenido']]
+    if pendientes:
+        ahora = datetime.utcnow()
+        for registro in pendientes:
+            registro['fecha_actualizacion'] = ahora
+        db.session.execute(stmt, pendientes)
+    
+    nuevos = sum(1 for r in pendientes if r['rnc'] not in existentes)
+    return nuevos, len(pendientes) - nuevos, len(registros) - len(pendientes)
+
+def _procesar_lote_fila(batch_df):
+    """
+    Procesa un lote registro por registro usando el ORM.
+    
+    Args:
+        batch_df (DataFrame): Lote de registros a procesar.
+        
+    Returns:
+        tuple: (registros_nuevos, registros_actualizados, registros_sin_cambios) del lote.
+    """
+    registros_nuevos = 0
+    registros_actualizados = 0
+    registros_sin_cambios = 0
+    
+    for _, row in batch_df.iterrows():
+        # Buscar si el contribuyente ya existe
+        contribuyente = Contribuyente.query.filter_by(rnc=row['rnc']).first()
+        
+        if contribuyente and contribuyente.hash_contenido == row['hash_contenido']:
+            # El contenido no cambió desde la última actualización
+            registros_sin_cambios += 1
+        elif contribuyente:
+            # Actualizar contribuyente existente
+            contribuyente.nombre = row['nombre']
+            contribuyente.nombre_comercial = row['nombre_comercial']
+            contribuyente.categoria = row['categoria']
+            contribuyente.regimen_pagos = row['regimen_pagos']
+            contribuyente.estado = row['estado']
+            contribuyente.actividad_economica = row['actividad_economica']
+            contribuyente.digito_valido = bool(row['digito_valido'])
+            contribuyente.hash_contenido = row['hash_contenido']
+            contribuyente.fecha_actualizacion = datetime.utcnow()
+            registros_actualizados += 1
+        else:
+            # Crear nuevo contribuyente
+            nuevo_contribuyente = Contribuyente(
+                rnc=row['rnc'],
+                nombre=row['nombre'],
+                nombre_comercial=row['nombre_comercial'],
+                categoria=row['categoria'],
+                regimen_pagos=row['regimen_pagos'],
+                estado=row['estado'],
+                actividad_economica=row['actividad_economica'],
+                digito_valido=bool(row['digito_valido']),
+                hash_contenido=row['hash_contenido']
+            )
+            db.session.add(nuevo_contribuyente)
+            registros_nuevos += 1
+    
+    return registros_nuevos, registros_actualizados, registros_sin_cambios
+
+def _crear_tabla_sombra():
+    """
+    Crea la tabla sombra vacía, con las mismas columnas que la de contribuyentes
+    pero sin índices secundarios para que la carga sea lo más rápida posible.
+    
+    Returns:
+        Table: Tabla sombra.
+    """
+    tabla = Contribuyente.__table__
+    metadata = MetaData()
+    sombra = Table(TABLA_SOMBRA, metadata, *[
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+        for c in tabla.columns
+    ])
+    
+    # Restos de una recarga anterior que no terminó
+    Table(TABLA_ANTERIOR, metadata).drop(db.engine, checkfirst=True)
+    sombra.drop(db.engine, checkfirst=True)
+    sombra.create(db.engine)
+    return sombra
+
+def _crear_indices_sombra(sombra):
+    """
+    Crea en la tabla sombra los mismos índices que tiene el modelo Contribuyente.
+    
+    Args:
+        sombra (Table): Tabla sombra ya cargada.
+    """
+    ocupados = set()
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.connect() as conn:
+            ocupados = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+    
+    for indice in Contribuyente.__table__.indexes:
+        # Alternar entre el nombre original y el alterno en cada recarga
+        nombre = indice.name if indice.name not in ocupados else f"{indice.name}{SUFIJO_INDICE_ALTERNO}"
+        columnas = [sombra.c[columna.name] for columna in indice.columns]
+        Index(nombre, *columnas, unique=indice.unique).create(db.engine)
+    
+    # El índice FULLTEXT pasa a la tabla nueva con el RENAME TABLE de MySQL
+    if db.engine.dialect.name == 'mysql' and busqueda_texto_habilitada():
+        with db.engine.begin() as conn:
+            crear_indice_fulltext(conn, TABLA_SOMBRA)
+
+def _intercambiar_tablas():
+    """
+    Reemplaza atómicamente la tabla de contribuyentes por la tabla sombra.
+    """
+    tabla = Contribuyente.__tablename__
+    
+    if db.engine.dialect.name == 'sqlite':
+        # pysqlite no abre transacciones para DDL: se usa un script con BEGIN/COMMIT explícitos
+        conexion = db.engine.raw_connection()
+        try:
+            # Los triggers del índice de texto se eliminan con la tabla anterior: se
+            # vuelven a crear y el índice se reconstruye en la misma transacción
+            sincronizar_texto = ''
+            with db.engine.connect() as conn:
+                if busqueda_texto_habilitada() and existe_tabla_fts(conn):
+                    sincronizar_texto = script_sincronizacion_sqlite()
+            
+            conexion.driver_connection.executescript(f"""
+                BEGIN IMMEDIATE;
+                ALTER TABLE {tabla} RENAME TO {TABLA_ANTERIOR};
+                ALTER TABLE {TABLA_SOMBRA} RENAME TO {tabla};
+                DROP TABLE {TABLA_ANTERIOR};
+                {sincronizar_texto}
+                COMMIT;
+            """)
+        finally:
+            conexion.close()
+    else:
+        # RENAME TABLE de MySQL intercambia ambas tablas en una sola operación atómica
+        with db.engine.begin() as conn:
+            conn.execute(text(f"RENAME TABLE {tabla} TO {TABLA_ANTERIOR}, {TABLA_SOMBRA} TO {tabla}"))
+            conn.execute(text(f"DROP TABLE {TABLA_ANTERIOR}"))
+
+def _recargar_tabla(datos, batch_size):
+    """
+    Carga todos los registros en una tabla sombra y la intercambia con la actual.
+    Mientras dura la carga, la API sigue leyendo la tabla anterior completa.
+    
+    Args:
+        datos (DataFrame | iterable): Datos de contribuyentes.
+        batch_size (int): Registros por sentencia executemany.
+        
+    Returns:
+        tuple: (registros_procesados, registros_nuevos, registros_actualizados, registros_sin_cambios)
+    """
+    if db.engine.dialect.name == 'sqlite':
+        # Con WAL los lectores no se bloquean mientras se escribe la tabla sombra
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    
+    tabla = Contribuyente.__table__
+    sombra = _crear_tabla_sombra()
+    registros_procesados = 0
+    ahora = datetime.utcnow()
+    
+    # Carga masiva sin índices secundarios ni comprobaciones por registro
+    with db.engine.begin() as conn:
+        for batch_df in _lotes(datos, batch_size):
+            batch_df = batch_df.assign(hash_contenido=calcular_hashes(batch_df))
+            registros = batch_df[COLUMNAS_CONTRIBUYENTE + ['hash_contenido']].to_dict('records')
+            for registro in registros:
+                registro['fecha_actualizacion'] = ahora
+            conn.execute(sombra.insert(), registros)
+            registros_procesados += len(registros)
+        
+        logger.info(f"{registros_procesados} registros cargados en la tabla {TABLA_SOMBRA}")
+        
+        # Un RNC repetido en el archivo se queda con su última aparición. MySQL no
+        # permite leer en un DELETE la misma tabla que se borra (error 1093): los
+        # ids se leen de una tabla derivada, que se materializa por el GROUP BY
+        ultimos = select(func.max(sombra.c.id).label('id')).group_by(sombra.c.rnc).subquery('ultimos')
+        duplicados = conn.execute(sombra.delete().where(sombra.c.id.not_in(select(ultimos.c.id)))).rowcount
+        if duplicados:
+            logger.warning(f"Se omiten {duplicados} registros con RNC duplicado en el archivo")
+    
+    if registros_procesados == 0:
+        raise ValueError("No hay datos para actualizar")
+    
+    # Los índices se crean después de la carga, de una sola vez
+    _crear_indices_sombra(sombra)
+    
+    with db.engine.begin() as conn:
+        # Contadores respecto a la tabla actual, con una sola consulta
+        existente = tabla.c.id.isnot(None)
+        cambiado = (tabla.c.hash_contenido.is_(None)) | (tabla.c.hash_contenido != sombra.c.hash_contenido)
+        total, nuevos, actualizados = conn.execute(
+            select(
+                func.count(sombra.c.id),
+                func.coalesce(func.sum(case((~existente, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((existente & cambiado, 1), else_=0)), 0)
+            ).select_from(sombra.outerjoin(tabla, tabla.c.rnc == sombra.c.rnc))
+        ).one()
+        
+        eliminados = conn.execute(
+            select(func.count(tabla.c.id))
+            .select_from(tabla.outerjoin(sombra, sombra.c.rnc == tabla.c.rnc))
+            .where(sombra.c.id.is_(None))
+        ).scalar()
+        if eliminados:
+            logger.info(f"{eliminados} contribuyentes que ya no están en el archivo se eliminarán con la recarga")
+        
+        # Conservar la fecha de actualización de los registros que no cambiaron
+        sin_cambio = (tabla.c.rnc == sombra.c.rnc) & (tabla.c.hash_contenido == sombra.c.hash_contenido)
+        conn.execute(
+            sombra.update()
+            .where(select(tabla.c.id).where(sin_cambio).exists())
+            .values(fecha_actualizacion=select(tabla.c.fecha_actualizacion).where(sin_cambio).scalar_subquery())
+        )
+    
+    _intercambiar_tablas()
+    logger.info(f"Tabla {TABLA_SOMBRA} intercambiada con {Contribuyente.__tablename__}")
+    
+    # Las apariciones repetidas de un RNC cuentan como sin cambios, como en los demás modos
+    return registros_procesados, nuevos, actualizados, total - nuevos - actualizados + duplicados
+
+def _lotes(datos, batch_size):
+    """
+    Divide los datos en lotes de batch_size registros.
+    
+    Args:
+        datos (DataFrame | iterable): DataFrame completo o iterable de DataFrames por partes.
+        batch_size (int): Registros por lote.
+        
+    Yields:
+        DataFrame: Un lote de registros.
+    """
+    if isinstance(datos, pd.DataFrame):
+        datos = [datos]
+    
+    for parte in datos:
+        # DataFrames que no pasaron por _preparar_dataframe
+        if 'digito_valido' not in parte:
+            parte = parte.assign(digito_valido=validar_digitos(parte['rnc'].fillna('').values))
+        for inicio in range(0, len(parte), batch_size):
+            yield parte.iloc[inicio:inicio + batch_size]
+
+def actualizar_base_datos(df, modo=None):
     """
     Actualiza la base de datos con los datos procesados.
     
     Args:
-        df (DataFrame): DataFrame con los datos de contribuyentes.
+        df (DataFrame | iterable): DataFrame con los datos de contribuyentes, o un
+                                   iterable de DataFrames (por ejemplo, el generador de
+                                   procesar_archivo_zip_por_partes) que se escriben a
+                                   medida que llegan.
+        modo (str, optional): 'bulk' para upsert por lotes, 'fila' para el
+                              procesamiento registro por registro o 'recarga' para
+                              cargar una tabla sombra y reemplazar la actual. Por
+                              defecto se toma de la variable de entorno UPDATE_MODE ('bulk').
         
     Returns:
         dict: Estadísticas de la actualización.
     """
-    if df is None or df.empty:
+    if df is None or (isinstance(df, pd.DataFrame) and df.empty):
         logger.error("No hay datos para actualizar")
         return {
             'estado': 'error',
             'mensaje': 'No hay datos para actualizar',
             'registros_procesados': 0,
             'registros_nuevos': 0,
-            'registros_actualizados': 0
+            'registros_actualizados': 0,
+            'registros_sin_cambios': 0
         }
     
     try:
         # Inicializar contadores
-        registros_procesados = len(df)
+        registros_procesados = 0
         registros_nuevos = 0
         registros_actualizados = 0
+        registros_sin_cambios = 0
+        
+        # Crear las columnas nuevas del esquema si la base de datos es anterior
+        actualizar_esquema(db)
+        
+        # Determinar el modo de actualización
+        modo = (modo or os.getenv('UPDATE_MODE', MODO_BULK)).lower()
+        if modo not in MODOS_ACTUALIZACION:
+            logger.warning(f"Modo de actualización desconocido '{modo}', se usará '{MODO_BULK}'")
+            modo = MODO_BULK
+        
+        stmt = None
+        if modo == MODO_BULK:
+            stmt = _sentencia_upsert()
+            if stmt is None:
+                logger.warning(f"El dialecto {db.engine.dialect.name} no soporta upsert, se usará el modo '{MODO_FILA}'")
+                modo = MODO_FILA
         
         # Procesar por lotes para evitar problemas de memoria
         batch_size = 1000
-        total_batches = (len(df) + batch_size - 1) // batch_size
         
-        logger.info(f"Procesando {registros_procesados} registros en {total_batches} lotes...")
+        if isinstance(df, pd.DataFrame):
+            logger.info(f"Procesando {len(df)} registros en lotes de {batch_size} (modo: {modo})...")
+        else:
+            logger.info(f"Procesando registros por partes en lotes de {batch_size} (modo: {modo})...")
         
-        for i in range(total_batches):
-            start_idx = i * batch_size
-            end_idx = min((i + 1) * batch_size, len(df))
-            batch_df = df.iloc[start_idx:end_idx]
-            
-            logger.info(f"Procesando lote {i+1}/{total_batches} ({start_idx+1}-{end_idx})...")
-            
-            # Procesar cada registro del lote
-            for _, row in batch_df.iterrows():
-                # Buscar si el contribuyente ya existe
-                contribuyente = Contribuyente.query.filter_by(rnc=row['rnc']).first()
+        if modo == MODO_RECARGA:
+            registros_procesados, registros_nuevos, registros_actualizados, registros_sin_cambios = _recargar_tabla(df, batch_size)
+        else:
+            for i, batch_df in enumerate(_lotes(df, batch_size)):
+                start_idx = registros_procesados
+                registros_procesados += len(batch_df)
+                
+                logger.info(f"Procesando lote {i+1} ({start_idx+1}-{registros_procesados})...")
+                
+                if modo == MODO_BULK:
+                    # Un RNC repetido en el lote se queda con su última aparición; las
+                    # apariciones omitidas cuentan como sin cambios, como en el modo fila
+                    duplicados = batch_df['rnc'].duplicated(keep='last')
+                    if duplicados.any():
+                        logger.warning(f"Se omiten {int(duplicados.sum())} registros con RNC duplicado en el lote {i+1}")
+                        registros_sin_cambios += int(duplicados.sum())
+                        batch_df = batch_df[~duplicados]
+                
+                # Hash de contenido para escribir solo los registros que cambiaron
+                batch_df = batch_df.assign(hash_contenido=calcular_hashes(batch_df))
                 
-                if contribuyente:
-                    # Actualizar contribuyente existente
-                    contribuyente.nombre = row['nombre']
-                    contribuyente.nombre_comercial = row['nombre_comercial']
-                    contribuyente.categoria = row['categoria']
-                    contribuyente.regimen_pagos = row['regimen_pagos']
-                    contribuyente.estado = row['estado']
-                    contribuyente.actividad_economica = row['actividad_economica']
-                    contribuyente.fecha_actualizacion = datetime.utcnow()
-                    registros_actualizados += 1
+                if modo == MODO_BULK:
+                    nuevos, actualizados, sin_cambios = _procesar_lote_bulk(batch_df, stmt)
                 else:
-                    # Crear nuevo contribuyente
-                    nuevo_contribuyente = Contribuyente(
-                        rnc=row['rnc'],
-                        nombre=row['nombre'],
-                        nombre_comercial=row['nombre_comercial'],
-                        categoria=row['categoria'],
-                        regimen_pagos=row['regimen_pagos'],
-                        estado=row['estado'],
-                        actividad_economica=row['actividad_economica']
-                    )
-                    db.session.add(nuevo_contribuyente)
-                    registros_nuevos += 1
-            
-            # Guardar cambios del lote
-            db.session.commit()
-            logger.info(f"Lote {i+1}/{total_batches} procesado. Nuevos: {registros_nuevos}, Actualizados: {registros_actualizados}")
+                    nuevos, actualizados, sin_cambios = _procesar_lote_fila(batch_df)
+                registros_nuevos += nuevos
+                registros_actualizados += actualizados
+                registros_sin_cambios += sin_cambios
+                
+                # Guardar cambios del lote
+                db.session.commit()
+                logger.info(f"Lote {i+1} procesado. Nuevos: {registros_nuevos}, Actualizados: {registros_actualizados}, Sin cambios: {registros_sin_cambios}")
+        
+        if registros_procesados == 0:
+            raise ValueError("No hay datos para actualizar")
+        
+        # Estadísticas del planificador al día con los datos y los índices nuevos
+        actualizar_estadisticas(db)
         
         # Registrar la actualización
         actualizacion = ActualizacionDB(
             registros_procesados=registros_procesados,
             registros_nuevos=registros_nuevos,
             registros_actualizados=registros_actualizados,
+            registros_sin_cambios=registros_sin_cambios,
             estado='success',
             mensaje='Actualización completada con éxito'
         )
         db.session.add(actualizacion)
+        db.session.flush()
+        
+        # Conteos para /api/estadisticas y /api/status, en la misma transacción
+        materializar_estadisticas(actualizacion.id)
         db.session.commit()
         
-        logger.info(f"Actualización completada con éxito. Total: {registros_procesados}, Nuevos: {registros_nuevos}, Actualizados: {registros_actualizados}")
+        logger.info(f"Actualización completada con éxito. Total: {registros_procesados}, Nuevos: {registros_nuevos}, Actualizados: {registros_actualizados}, Sin cambios: {registros_sin_cambios}")
         return {
             'estado': 'success',
             'mensaje': 'Actualización completada con éxito',
             'registros_procesados': registros_procesados,
             'registros_nuevos': registros_nuevos,
-            'registros_actualizados': registros_actualizados
+            'registros_actualizados': registros_actualizados,
+            'registros_sin_cambios': registros_sin_cambios
         }
     except Exception as e:
         db.session.rollback()
@@ -258,6 +849,7 @@ def actualizar_base_datos(df):
             registros_procesados=registros_procesados if 'registros_procesados' in locals() else 0,
             registros_nuevos=registros_nuevos if 'registros_nuevos' in locals() else 0,
             registros_actualizados=registros_actualizados if 'registros_actualizados' in locals() else 0,
+            registros_sin_cambios=registros_sin_cambios if 'registros_sin_cambios' in locals() else 0,
             estado='error',
             mensaje=f"Error al actualizar la base de datos: {error_msg}"
         )
@@ -272,7 +864,8 @@ def actualizar_base_datos(df):
             'mensaje': f"Error al actualizar la base de datos: {error_msg}",
             'registros_procesados': registros_procesados if 'registros_procesados' in locals() else 0,
             'registros_nuevos': registros_nuevos if 'registros_nuevos' in locals() else 0,
-            'registros_actualizados': registros_actualizados if 'registros_actualizados' in locals() else 0
+            'registros_actualizados': registros_actualizados if 'registros_actualizados' in locals() else 0,
+            'registros_sin_cambios': registros_sin_cambios if 'registros_sin_cambios' in locals() else 0
         }
 
 def update_database():
@@ -287,6 +880,16 @@ def update_database():
     
     # Descargar el archivo
     zip_content = descargar_archivo_dgii()
+    if zip_content is ARCHIVO_SIN_CAMBIOS:
+        logger.info("Se omite la actualización: el archivo de la DGII no ha cambiado")
+        return {
+            'estado': 'success',
+            'mensaje': 'El archivo de la DGII no ha cambiado desde la última actualización',
+            'registros_procesados': 0,
+            'registros_nuevos': 0,
+            'registros_actualizados': 0,
+            'registros_sin_cambios': 0
+        }
     if not zip_content:
         logger.error("Error al descargar el archivo")
         return {
@@ -294,11 +897,15 @@ def update_database():
             'mensaje': 'Error al descargar el archivo',
             'registros_procesados': 0,
             'registros_nuevos': 0,
-            'registros_actualizados': 0
+            'registros_actualizados': 0,
+            'registros_sin_cambios': 0
         }
     
-    # Procesar el archivo
-    df = procesar_archivo_zip(zip_content)
+    # Procesar el archivo (por partes, salvo que se desactive con UPDATE_STREAMING=false)
+    if os.getenv('UPDATE_STREAMING', 'true').lower() == 'true':
+        df = procesar_archivo_zip_por_partes(zip_content)
+    else:
+        df = procesar_archivo_zip(zip_content)
     if df is None:
         logger.error("Error al procesar el archivo")
         return {
@@ -306,17 +913,26 @@ def update_database():
             'mensaje': 'Error al procesar el archivo',
             'registros_procesados': 0,
             'registros_nuevos': 0,
-            'registros_actualizados': 0
+            'registros_actualizados': 0,
+            'registros_sin_cambios': 0
         }
     
     # Actualizar la base de datos
     with app.app_context():
         resultado = actualizar_base_datos(df)
     
+    # Solo un archivo procesado con éxito permite omitir las siguientes descargas
+    if resultado['estado'] == 'success':
+        marcar_archivo_procesado()
+        
+        # Si la API corre con gunicorn, reemplazar sus procesos con los datos nuevos
+        solicitar_recarga()
+    
     logger.info(f"Actualización completada: {resultado['estado']}")
     logger.info(f"Registros procesados: {resultado['registros_procesados']}")
     logger.info(f"Registros nuevos: {resultado['registros_nuevos']}")
     logger.info(f"Registros actualizados: {resultado['registros_actualizados']}")
+    logger.info(f"Registros sin cambios: {resultado['registros_sin_cambios']}")
     
     return resultado
 
@@ -0,0 +1,35 @@
+"""
+Punto de entrada WSGI de la API DGII para servidores de producción.
+
+Uso:
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+app.py no se puede importar como módulo "app" porque ese nombre corresponde al
+paquete app/, por lo que se carga desde su ruta.
+"""
+import os
+import sys
+import importlib.util
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+def _cargar_modulo_api():
+    """Carga app.py una sola vez como el módulo dgii_api."""
+    if 'dgii_api' in sys.modules:
+        return sys.modules['dgii_api']
+    spec = importlib.util.spec_from_file_location('dgii_api', os.path.join(BASE_DIR, 'app.py'))
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules['dgii_api'] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+api = _cargar_modulo_api()
+
+# Crear las tablas, columnas e índices que no existan (igual que app.run())
+with api.app.app_context():
+    api.actualizar_esquema(api.db)
+    api.logger.info("Base de datos inicializada correctamente")
+
+application = api.app